@@ -2,13 +2,15 @@ import streamlit as st
 import os
 import time
 import uuid
-from utils.audio_utils import save_uploaded_file, extract_audio
-from utils.transcription import transcribe_audio
+from utils.audio_utils import ingest_upload
 from utils.subtitle_utils import (
-    generate_srt, save_srt, burn_subtitles_to_video,
-    merge_short_segments, PRESET_STYLES,
+    generate_srt, merge_short_segments, render_style_preview,
+    DEFAULT_PROFILE, ENCODE_PROFILES, PRESET_STYLES,
 )
-from utils.translation import translate_chunks, TRANSLATION_LANGUAGES
+from utils.translation import translate_chunks, same_language, TRANSLATION_LANGUAGES
+from utils.jobs import JobQueue, start_workers, QUEUED, FAILED, FINISHED
+from utils.model_server import DEFAULT_ADDRESS, start_server_process
+from utils.artifacts import SESSION_HEARTBEAT_S, get_artifact_store
 
 # ── Page config ───────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -245,6 +247,13 @@ def _init_session():
         "burned_video_path": None,
         "original_chunks":   None,
         "active_language":   "Original",
+        "source_language":   None,     # language of original_chunks, e.g. "en"
+        "language_bundle":   None,
+        "language_job":      None,     # id of a running multi-language export
+        "language_error":    None,
+        "pipeline_job":      None,
+        "burn_job":          None,     # {"id", "style"} of a re-burn still running
+        "burn_error":        None,     # first line of the last failed re-burn
         # style
         "active_preset":  "subtle",
         "font_size":      18,
@@ -257,6 +266,12 @@ def _init_session():
         "shadow":         0,
         "position":       "bottom",
         "text_case":      "original",
+        "output_mode":    "burn",     # "burn" (hardcoded) | "soft" (subtitle track)
+        "burned_style":   None,       # _burn_signature() of the video on screen
+        "encode_profile": DEFAULT_PROFILE,   # draft | balanced | archival
+        "last_encode":    None,       # stats of the last burn (fps, frames, …)
+        "model_tier":     "small",    # tiny | base | small | medium | "auto" (opt-in)
+        "whisper_task":   "transcribe",   # "transcribe" | "translate" (→ English)
         # pipeline
         "steps": {k: False for k in ["upload","extract","transcribe","subtitle","burn"]},
         "stats": {},
@@ -271,6 +286,28 @@ _init_session()
 
 SUPPORTED_FORMATS = ["mp4", "mov"]
 MAX_FILE_MB = 200
+# >1 on big CPU-only hosts: transcribe overlapping windows in a process pool
+TRANSCRIBE_WORKERS = int(os.environ.get("SUBLYZE_TRANSCRIBE_WORKERS", "1"))
+# Background pipeline workers shared by every session on this server
+JOB_WORKERS = int(os.environ.get("SUBLYZE_JOB_WORKERS", "2"))
+# Background jobs are polled in slices of this length, with a rerun in between
+_JOB_POLL_S = 20.0
+# Memory the warm model pool may use for resident Whisper models
+MODEL_BUDGET_MB = int(os.environ.get("SUBLYZE_MODEL_BUDGET_MB", "4000"))
+# Windows decoded together across concurrent uploads (utils.batch_decode).
+# Opt-in: 1 = off. Only prompt-free calls are batched (batch_decode.batchable).
+MODEL_BATCH_SIZE = int(os.environ.get("SUBLYZE_MODEL_BATCH", "1"))
+_PIPELINE_STAGES = ["extract", "transcribe", "subtitle", "burn"]
+# Whisper sizes offered in the uploader; "auto" lets the worker pick from
+# the video's duration and the current queue depth (utils.transcription),
+# which may choose a smaller model than the default for long videos.
+MODEL_TIER_LABELS = {
+    "small":  "🎯 Accurate (small, default)",
+    "medium": "🔬 Most accurate (medium)",
+    "base":   "🏃 Fast (base)",
+    "tiny":   "⚡ Fastest (tiny)",
+    "auto":   "⚖️ Auto (faster, may be less accurate on long videos)",
+}
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -305,6 +342,8 @@ def _stats_html() -> str:
     if not s: return ""
     items = [(s.get("segments","—"),"Segments"),(s.get("words","—"),"Words"),
              (s.get("duration","—"),"Duration"),(s.get("proc_time","—"),"Processed in")]
+    if s.get("language"): items.append((s["language"],"Language"))
+    if s.get("model"): items.append((s["model"],"Model"))
     html = '<div class="stats-row">'
     for v,l in items:
         html += f'<div class="stat-card"><div class="stat-val">{v}</div><div class="stat-lbl">{l}</div></div>'
@@ -320,11 +359,46 @@ def _apply_style_from_preset(pid: str):
         st.session_state[k] = p[k]
 
 
-def _do_burn():
-    """Trigger a burn with current session style settings."""
-    return burn_subtitles_to_video(
-        st.session_state.video_path,
-        st.session_state.chunks,
+@st.cache_resource(show_spinner=False)
+def _model_server():
+    """Start the warm Whisper pool with the app, unless one is configured.
+
+    Runs before the job workers are spawned so they inherit
+    SUBLYZE_MODEL_SERVER and send transcription to the preloaded model.
+    """
+    if os.environ.get("SUBLYZE_MODEL_SERVER"):
+        return None   # external server, or "off" for in-process models
+    proc = start_server_process(DEFAULT_ADDRESS, MODEL_BUDGET_MB, preload=["small"],
+                                quantized=os.environ.get("SUBLYZE_QUANTIZE", "0") == "1",
+                                batch_size=MODEL_BATCH_SIZE)
+    os.environ["SUBLYZE_MODEL_SERVER"] = f"{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}"
+    return proc
+
+
+@st.cache_resource(show_spinner=False)
+def _artifacts():
+    """Server-wide artifact index; its TTL/quota sweeper starts on first use."""
+    store = get_artifact_store()
+    store.start_sweeper()
+    return store
+
+
+def _release_session():
+    """Free this session's files now instead of waiting for the TTL sweeper."""
+    _artifacts().release_session(st.session_state.session_id)
+
+
+@st.cache_resource(show_spinner=False)
+def _job_queue() -> JobQueue:
+    """Server-wide job queue; its worker processes start on first use."""
+    _model_server()
+    start_workers(JOB_WORKERS)
+    return JobQueue()
+
+
+def _style_kwargs() -> dict:
+    """Current session style as burn_subtitles_to_video keyword arguments."""
+    return dict(
         fontsize      = st.session_state.font_size,
         color         = st.session_state.color,
         bg_color      = st.session_state.bg_color,
@@ -334,11 +408,117 @@ def _do_burn():
         stroke_width  = st.session_state.stroke_width,
         shadow        = st.session_state.shadow,
         position      = st.session_state.position,
-        text_case     = st.session_state.text_case,
-        session_id    = st.session_state.session_id,
     )
 
 
+def _burn_signature() -> tuple:
+    """Everything about the session style that changes burned pixels."""
+    return (tuple(sorted(_style_kwargs().items())), st.session_state.text_case,
+            st.session_state.encode_profile)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _style_preview(video_path: str, chunks: tuple, style: tuple, text_case: str) -> list:
+    """PNG frames of the style as libass will burn it (see render_style_preview)."""
+    return render_style_preview(
+        video_path, [{"timestamp": (s, e), "text": t} for s, e, t in chunks],
+        text_case=text_case, **dict(style),
+    )
+
+
+def _wait_for_job(job_id: str, on_update=None, poll_s: float = 0.5,
+                  timeout_s: float = _JOB_POLL_S) -> dict:
+    """Poll a background job until it finishes, calling on_update(job) each time.
+
+    Raises TimeoutError if the job is still queued or running after
+    timeout_s; callers then st.rerun() and poll again on the next run, so
+    the script never holds a session for the length of a job. Jobs of dead
+    workers are requeued or failed by the worker supervisor (utils.jobs),
+    so a wait never depends on a crashed process.
+    """
+    queue    = _job_queue()
+    deadline = time.monotonic() + timeout_s
+    while True:
+        job = queue.get(job_id)
+        if job is None:
+            raise RuntimeError("Job not found — it may have been cleaned up.")
+        if on_update:
+            on_update(job)
+        if job["status"] in FINISHED:
+            return job
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Job {job_id} did not finish within {timeout_s:.0f} s.")
+        time.sleep(poll_s)
+
+
+def _do_burn():
+    """Queue a burn with the current session style settings.
+
+    The burn runs on the shared worker pool; this call only submits it and
+    records the job in st.session_state.burn_job. Call st.rerun() next: the
+    burn block above the results polls the job and swaps in the new video
+    when it is done.
+
+    Burns are incremental and parallel: chunks are encoded across all cores,
+    and the session keeps them, so a text edit only re-encodes the few
+    seconds around the edited lines. In soft-subtitle mode the captions are
+    muxed as a track instead, which stream-copies the video and skips the
+    re-encode entirely.
+    """
+    job_id = _job_queue().submit("burn", {
+        "video_path":  st.session_state.video_path,
+        "chunks":      st.session_state.chunks,
+        "text_case":   st.session_state.text_case,
+        "session_id":  st.session_state.session_id,
+        "output_mode": st.session_state.output_mode,
+        "encode_profile": st.session_state.encode_profile,
+        "style":       _style_kwargs(),
+    })
+    st.session_state.burn_job   = {"id": job_id, "style": _burn_signature()}
+    st.session_state.burn_error = None
+
+
+@st.fragment(run_every=2.0)
+def _language_job_progress():
+    """Progress of the multi-language export; loads its bundle when done.
+
+    A fragment, so only this bar reruns while the languages are exported
+    and the rest of the page stays usable.
+    """
+    job_id = st.session_state.language_job
+    if not job_id:
+        return
+    job = _job_queue().get(job_id)
+    if job is None or job["status"] in FINISHED:
+        st.session_state.language_job = None
+        if job is not None and job["status"] != FAILED:
+            st.session_state.language_bundle = job["result"]
+        else:
+            st.session_state.language_error = (
+                job["error"].splitlines()[0] if job else "Job not found — it may have been cleaned up."
+            )
+        st.rerun()
+    n = len(job["params"]["codes"])
+    st.progress(min(1.0, job["progress"] or 0.0),
+                text=f"🌍 Exporting {n} languages… {job['progress'] or 0.0:.0%}"
+                     if job["status"] != QUEUED else "⏳ Waiting for a free worker…")
+
+
+# Warm the model server and worker pool with the first page load, not the
+# first upload — later sessions hit the cached resources.
+_job_queue()
+
+
+@st.fragment(run_every=SESSION_HEARTBEAT_S)
+def _session_heartbeat():
+    """Keep an open tab's files at the back of the LRU order, even while idle."""
+    if st.session_state.video_path:
+        _artifacts().touch(st.session_state.session_id)
+
+
+_session_heartbeat()
+
+
 # ── Sidebar (navigation only) ─────────────────────────────────────────────────
 with st.sidebar:
     # ── Brand ────────────────────────────────────────────────────────────────
@@ -806,6 +986,26 @@ if not st.session_state.steps["upload"]:
   <div class="feat-card"><div class="feat-icon">📥</div><div class="feat-name">Export Anywhere</div><div class="feat-desc">Download subtitled MP4 or .SRT file for any video editor or player.</div></div>
 </div>""", unsafe_allow_html=True)
 
+if not st.session_state.steps["upload"]:
+    st.session_state.model_tier = st.selectbox(
+        "Transcription accuracy",
+        list(MODEL_TIER_LABELS),
+        index=list(MODEL_TIER_LABELS).index(st.session_state.model_tier),
+        format_func=MODEL_TIER_LABELS.get, key="sb_model",
+        help="Bigger models catch more words but take longer. "
+             "Auto picks the most accurate one that still finishes in about two "
+             "minutes, so long videos get a smaller model.",
+    )
+    st.session_state.whisper_task = st.radio(
+        "Subtitle language",
+        ["transcribe", "translate"],
+        index=["transcribe", "translate"].index(st.session_state.whisper_task),
+        horizontal=True, key="rd_task",
+        format_func=lambda x: {"transcribe": "🗣️ As spoken", "translate": "🇬🇧 English"}[x],
+        help="English translates the speech while transcribing — one pass, "
+             "no separate translation step.",
+    )
+
 uploaded_file = st.file_uploader(
     "📤 Drop your video here or click to browse",
     type=SUPPORTED_FORMATS,
@@ -821,14 +1021,31 @@ if any(st.session_state.steps.values()):
 def _reset_pipeline():
     """Reset pipeline state while preserving style preferences and page."""
     for k in ["video_path","audio_path","srt_path","srt_content",
-              "chunks","transcript","burned_video_path","uploaded_file_id"]:
+              "chunks","transcript","burned_video_path","uploaded_file_id",
+              "language_bundle","pipeline_job","source_language",
+              "burn_job","burn_error","language_job","language_error"]:
         st.session_state[k] = None
     st.session_state.stats = {}
     st.session_state.steps = {k: False for k in ["upload","extract","transcribe","subtitle","burn"]}
+    st.query_params.clear()
 
 _new_fid = f"{uploaded_file.name}:{uploaded_file.size}" if uploaded_file else None
 
-if uploaded_file is None and st.session_state.steps["upload"]:
+# Browser refresh: re-attach to the pipeline job named in the URL
+if (uploaded_file is None and not st.session_state.steps["upload"]
+        and not st.session_state.pipeline_job and "job" in st.query_params):
+    _job = _job_queue().get(st.query_params["job"])
+    if _job and _job["kind"] == "pipeline":
+        st.session_state.pipeline_job = _job["id"]
+        st.session_state.session_id   = _job["params"]["session_id"]
+        st.session_state.video_path   = _job["params"]["video_path"]
+        st.session_state.steps["upload"] = True
+    else:
+        st.query_params.clear()
+
+# Only files that came through the uploader this session can be "removed"
+if (uploaded_file is None and st.session_state.steps["upload"]
+        and st.session_state.uploaded_file_id):
     # User removed the file — wipe pipeline so uploader is ready for next upload
     _reset_pipeline()
     st.rerun()
@@ -840,6 +1057,8 @@ if (uploaded_file and st.session_state.steps["upload"]
     st.rerun()
 
 # ── Processing pipeline ───────────────────────────────────────────────────────
+# The heavy lifting runs as a background job (utils.jobs); this script only
+# submits it and polls. The job id lives in the URL, so a refresh re-attaches.
 if uploaded_file and not st.session_state.steps["upload"]:
     file_ext = os.path.splitext(uploaded_file.name)[-1][1:].lower()
     file_mb  = uploaded_file.size / (1024*1024)
@@ -848,76 +1067,145 @@ if uploaded_file and not st.session_state.steps["upload"]:
     if file_mb > MAX_FILE_MB:
         st.error(f"❌ File too large ({file_mb:.1f} MB). Max {MAX_FILE_MB} MB."); st.stop()
 
-    t_start = time.time()
     pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
 
-    video_path = save_uploaded_file(uploaded_file)
+    # Streamed into the shared content store; the hash doubles as the cache key
+    video_path, fingerprint = ingest_upload(uploaded_file)
+    # Tracked before the job is even queued: a deduplicated store file can
+    # be old enough for the sweeper to treat it as an untracked leftover
+    _artifacts().register(st.session_state.session_id, video_path, "upload")
     st.session_state.video_path = video_path
     st.session_state.uploaded_file_id = _new_fid
     st.session_state.steps["upload"] = True
     pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
 
-    with st.spinner("🔊 Extracting audio…"):
-        audio_path = extract_audio(video_path)
-        st.session_state.audio_path = audio_path
-        st.session_state.steps["extract"] = True
-    pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
-
-    with st.spinner("🎧 Listening to every word so you don't have to… hang tight!"):
-        transcript, chunks = transcribe_audio(audio_path)
+    queue_depth = _job_queue().depth()
+    job_id = _job_queue().submit("pipeline", {
+        "video_path":  video_path,
+        # Same bytes as an earlier upload (e.g. after a refresh) → cached transcript
+        "fingerprint": fingerprint,
+        "session_id":  st.session_state.session_id,
+        "text_case":   st.session_state.text_case,
+        "output_mode": st.session_state.output_mode,
+        "encode_profile": st.session_state.encode_profile,
+        "style":       _style_kwargs(),
+        "transcribe_workers": TRANSCRIBE_WORKERS,
+        "model_tier":  st.session_state.model_tier,
+        "task":        st.session_state.whisper_task,
+        "queue_depth": queue_depth,
+    })
+    st.session_state.pipeline_job = job_id
+    st.query_params["job"] = job_id
+
+if st.session_state.pipeline_job and not st.session_state.steps["subtitle"]:
+    stage_lbl = {
+        None:         "⏳ Waiting for a free worker…",
+        "extract":    "🔊 Extracting audio…",
+        "transcribe": "🎧 Listening to every word so you don't have to… hang tight!",
+        "subtitle":   "📝 Generating subtitle file…",
+        "burn":       "🔥 Burning subtitles into video…",
+    }
+    job_bar = st.progress(0.0, text=stage_lbl[None])
+
+    def _on_pipeline_update(job):
+        stage = job["stage"] if job["status"] != QUEUED else None
+        if stage:
+            for k in _PIPELINE_STAGES[:_PIPELINE_STAGES.index(stage)]:
+                st.session_state.steps[k] = True
+        pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
+        frac = job["progress"] if stage == "transcribe" else 0.0
+        job_bar.progress(min(1.0, frac), text=f"{stage_lbl[stage]} {frac:.0%}" if frac else stage_lbl[stage])
+
+    try:
+        job = _wait_for_job(st.session_state.pipeline_job, _on_pipeline_update)
+    except TimeoutError:
+        # Still working: hand control back to Streamlit and pick up on the rerun
+        st.rerun()
+    job_bar.empty()
+
+    if job["status"] == FAILED:
+        st.error(f"❌ Processing failed: {job['error'].splitlines()[0]}")
+        if st.button("🔁 Try Again"):
+            st.session_state.clear(); st.query_params.clear(); st.rerun()
+        st.stop()
 
+    result     = job["result"]
+    transcript = result["transcript"]
     if not transcript.strip():
         st.error("❌ No speech detected. Please upload a video with spoken audio.")
         if st.button("🔁 Try a Different Video"):
-            st.session_state.clear(); st.rerun()
+            st.session_state.clear(); st.query_params.clear(); st.rerun()
         st.stop()
 
-    # Auto-merge very short segments for readable subtitles
-    chunks = merge_short_segments(chunks, min_duration=1.5, min_words=2)
+    chunks = [{"timestamp": tuple(c["timestamp"]), "text": c["text"]} for c in result["chunks"]]
     st.session_state.transcript     = transcript
     st.session_state.chunks         = chunks
     st.session_state.original_chunks = chunks
     st.session_state.active_language = "Original"
-    st.session_state.steps["transcribe"] = True
-
+    st.session_state.source_language = result.get("language")
+    st.session_state.srt_path    = result["srt_path"]
+    st.session_state.srt_content = result["srt_content"]
+    st.session_state.burned_video_path = result["burned_video_path"]
+    for k in ["extract", "transcribe", "subtitle"]:
+        st.session_state.steps[k] = True
+    st.session_state.steps["burn"] = bool(result["burned_video_path"])
+    st.session_state.burned_style = _burn_signature()
+    st.session_state.last_encode  = result.get("encode")
+
+    elapsed = job["updated"] - job["created"]
     dur_s = chunks[-1]["timestamp"][1] if chunks else 0
     st.session_state.stats = {
         "segments":  len(chunks),
         "words":     len(transcript.split()),
         "duration":  fmt_dur(dur_s),
-        "proc_time": "",
+        "proc_time": f"{elapsed:.0f} s",
+        "model":     result.get("model"),
+        "language":  (result.get("spoken_language") or "").upper(),
     }
     pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
 
-    with st.spinner("📝 Generating subtitle file…"):
-        os.makedirs("data", exist_ok=True)
-        srt_text = generate_srt(chunks, text_case=st.session_state.text_case)
-        srt_path = save_srt(srt_text, f"data/subtitles_{st.session_state.session_id}.srt")
-        st.session_state.srt_path    = srt_path
-        st.session_state.srt_content = srt_text
-        st.session_state.steps["subtitle"] = True
-    pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
-
-    with st.spinner("🔥 Burning subtitles into video…"):
-        try:
-            burned = _do_burn()
-            st.session_state.burned_video_path = burned
-            st.session_state.steps["burn"] = True
-        except Exception as err:
-            st.error(f"⚠️ Burn failed: {err}\n\nYou can still download the .SRT file.")
-    pipeline_ph.markdown(_pipeline_html(), unsafe_allow_html=True)
-
-    elapsed = time.time() - t_start
-    st.session_state.stats["proc_time"] = f"{elapsed:.0f} s"
     if st.session_state.steps["burn"]:
         st.success(f"✅ Done in **{elapsed:.1f} s** — your subtitled video is ready!")
     else:
+        st.error(f"⚠️ Burn failed: {result['burn_error']}\n\nYou can still download the .SRT file.")
         st.warning("⚠️ Burning failed — subtitle file (.SRT) is still available below.")
 
 
+# ── Re-burns ──────────────────────────────────────────────────────────────────
+# Style, language and edit re-burns are jobs too (see _do_burn): poll the
+# running one in slices and rerun in between, like the pipeline above.
+if st.session_state.burn_job:
+    with st.spinner("🔥 Exporting video…"):
+        try:
+            job = _wait_for_job(st.session_state.burn_job["id"])
+        except TimeoutError:
+            st.rerun()
+        except RuntimeError as err:
+            job = {"status": FAILED, "error": str(err)}
+    if job["status"] == FAILED:
+        st.session_state.burn_error = job["error"].splitlines()[0]
+        st.error(f"Burn failed: {st.session_state.burn_error}")
+    else:
+        st.session_state.burned_video_path = job["result"]["path"]
+        st.session_state.burned_style      = st.session_state.burn_job["style"]
+        st.session_state.last_encode       = job["result"]["encode"]
+    st.session_state.burn_job = None
+
+
 # ── Results ───────────────────────────────────────────────────────────────────
 if st.session_state.steps["burn"] and st.session_state.burned_video_path:
 
+    # The burn cache evicts by its own LRU budget; re-burn rather than
+    # pointing the player and download at a file that is gone
+    if not os.path.exists(st.session_state.burned_video_path):
+        if st.session_state.burn_error:
+            # A failed re-export would fail again on every rerun: ask first
+            st.error(f"Export failed: {st.session_state.burn_error}")
+            if st.button("🔁 Retry Export", key="retry_export"):
+                _do_burn(); st.rerun()
+            st.stop()
+        _do_burn(); st.rerun()
+
     sh = _stats_html()
     if sh: st.markdown(sh, unsafe_allow_html=True)
 
@@ -928,6 +1216,29 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
     with col_style:
         st.markdown("### 🎨 Subtitle Style")
 
+        output_mode = st.radio(
+            "Output",
+            ["burn", "soft"],
+            index=["burn", "soft"].index(st.session_state.output_mode),
+            horizontal=True, key="rd_out",
+            format_func=lambda x: {"burn": "🔥 Burned-in", "soft": "⚡ Soft subtitles"}[x],
+            help="Soft subtitles are added as a track players can toggle — "
+                 "near-instant, but players render them with their own style.",
+        )
+        if output_mode == "burn":
+            st.session_state.encode_profile = st.selectbox(
+                "Export quality",
+                list(ENCODE_PROFILES),
+                index=list(ENCODE_PROFILES).index(st.session_state.encode_profile),
+                format_func=lambda x: f"{ENCODE_PROFILES[x]['label']} — {ENCODE_PROFILES[x]['desc']}",
+                key="sb_profile",
+                help="Takes effect with the next burn (Apply & Re-burn).",
+            )
+
+        if output_mode != st.session_state.output_mode:
+            st.session_state.output_mode = output_mode
+            _do_burn(); st.rerun()
+
         # Preset gallery
         st.markdown('<div class="style-section">Quick Presets</div>', unsafe_allow_html=True)
         preset_ids = list(PRESET_STYLES.keys())
@@ -947,18 +1258,13 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
                     unsafe_allow_html=True,
                 )
                 if st.button(f"Apply", key=f"preset_{pid}", use_container_width=True):
+                    # Preview only; the burn runs when the user confirms it
                     _apply_style_from_preset(pid)
-                    with st.spinner(f"Applying {p['label']} style…"):
-                        try:
-                            burned = _do_burn()
-                            st.session_state.burned_video_path = burned
-                            st.session_state.srt_content = generate_srt(
-                                st.session_state.chunks,
-                                text_case=st.session_state.text_case,
-                            )
-                            st.rerun()
-                        except Exception as err:
-                            st.error(f"Burn failed: {err}")
+                    st.session_state.srt_content = generate_srt(
+                        st.session_state.chunks,
+                        text_case=st.session_state.text_case,
+                    )
+                    st.rerun()
 
         # ── Font & Text ───────────────────────────────────────────────────────
         with st.expander("✏️  Font & Text", expanded=False):
@@ -1043,20 +1349,19 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
                         st.session_state.original_chunks,
                         text_case=st.session_state.text_case,
                     )
-                    with st.spinner("Re-burning with original subtitles…"):
-                        try:
-                            burned = _do_burn()
-                            st.session_state.burned_video_path = burned
-                            st.rerun()
-                        except Exception as err:
-                            st.error(f"Burn failed: {err}")
-
-            if translate_clicked:
+                    _do_burn(); st.rerun()
+
+            if translate_clicked and same_language(st.session_state.source_language,
+                                                   TRANSLATION_LANGUAGES[selected_lang]):
+                st.info(f"Your subtitles are already in {selected_lang} — nothing to translate.")
+            elif translate_clicked:
                 lang_code = TRANSLATION_LANGUAGES[selected_lang]
                 src_chunks = st.session_state.original_chunks or st.session_state.chunks
                 with st.spinner(f"Translating to {selected_lang}… ✍️"):
                     try:
-                        translated = translate_chunks(src_chunks, lang_code)
+                        translated = translate_chunks(
+                            src_chunks, lang_code, source_lang=st.session_state.source_language,
+                        )
                         st.session_state.chunks = translated
                         st.session_state.active_language = selected_lang
                         st.session_state.srt_content = generate_srt(
@@ -1065,26 +1370,62 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
                     except Exception as err:
                         st.error(f"Translation failed: {err}")
                         st.stop()
-                with st.spinner(f"Burning {selected_lang} subtitles…"):
-                    try:
-                        burned = _do_burn()
-                        st.session_state.burned_video_path = burned
-                        st.rerun()
-                    except Exception as err:
-                        st.error(f"Burn failed: {err}")
-
-        # Live preview box
-        pr_rgb  = tuple(int(bg_color.lstrip("#")[i:i+2],16) for i in (0,2,4))
-        pr_rgba = f"rgba({pr_rgb[0]},{pr_rgb[1]},{pr_rgb[2]},{bg_opacity})" if bstyle_opt=="box" else "transparent"
-        pr_outline = f"2px solid {stroke_color}" if bstyle_opt=="outline" else "none"
-        preview_text = {"original":"Sample subtitle text","upper":"SAMPLE SUBTITLE TEXT","lower":"sample subtitle text"}[text_case]
-        st.markdown(
-            f"<div style='margin-top:10px;padding:10px 16px;border-radius:10px;"
-            f"background:{pr_rgba};color:{color};font-size:{font_size}px;"
-            f"text-align:center;font-weight:700;outline:{pr_outline};'>"
-            f"{preview_text}</div>",
-            unsafe_allow_html=True,
-        )
+                _do_burn(); st.rerun()
+
+            # ── Several languages at once ─────────────────────────────────────
+            st.markdown(
+                "<small style='color:#505075'>Need several versions? Pick them all — "
+                "they're translated in parallel and exported side by side.</small>",
+                unsafe_allow_html=True,
+            )
+            multi_langs = st.multiselect(
+                "Languages to export",
+                lang_names,
+                key="multi_lang_select",
+                label_visibility="collapsed",
+            )
+            verb = "Burn" if st.session_state.output_mode == "burn" else "Export"
+            if multi_langs and st.button(
+                f"🌍 Translate & {verb} {len(multi_langs)} Languages",
+                use_container_width=True,
+                key="translate_multi",
+                disabled=bool(st.session_state.language_job),
+            ):
+                # Runs on the worker pool; _language_job_progress polls it
+                st.session_state.language_job = _job_queue().submit("languages", {
+                    "video_path":  st.session_state.video_path,
+                    "chunks":      st.session_state.original_chunks or st.session_state.chunks,
+                    "codes":       [TRANSLATION_LANGUAGES[name] for name in multi_langs],
+                    "session_id":  st.session_state.session_id,
+                    "source_lang": st.session_state.source_language,
+                    "text_case":   st.session_state.text_case,
+                    "output_mode": st.session_state.output_mode,
+                    "encode_profile": st.session_state.encode_profile,
+                    "style":       _style_kwargs(),
+                })
+                st.session_state.language_bundle = None
+                st.session_state.language_error  = None
+            _language_job_progress()
+            if st.session_state.language_error:
+                st.error(f"Export failed: {st.session_state.language_error}")
+
+            bundle = st.session_state.language_bundle or {}
+            for code, entry in bundle.items():
+                st.markdown(f"**{entry['language']}**")
+                if entry["error"]:
+                    st.caption(entry["error"])
+                b_vid, b_srt = st.columns(2)
+                with b_vid:
+                    if entry["video_path"] and os.path.exists(entry["video_path"]):
+                        with open(entry["video_path"], "rb") as f:
+                            st.download_button("📥 Video", f, file_name=f"sublyze_{code}.mp4",
+                                               mime="video/mp4", key=f"dl_vid_{code}",
+                                               use_container_width=True)
+                with b_srt:
+                    if entry["srt_content"]:
+                        st.download_button("📄 SRT", entry["srt_content"],
+                                           file_name=f"sublyze_{code}.srt", mime="text/plain",
+                                           key=f"dl_srt_{code}", use_container_width=True)
 
         # Track whether user changed something (button rendered in video column)
         changed = (
@@ -1099,17 +1440,28 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
             shadow      != st.session_state.shadow      or
             position    != st.session_state.position
         )
+        # A preset applied since the last burn is also waiting to be burned
+        pending = changed or _burn_signature() != st.session_state.burned_style
 
     # ── RIGHT: Video ──────────────────────────────────────────────────────────
     with col_video:
         st.markdown("### 🎬 Preview")
         st.video(st.session_state.burned_video_path, format="video/mp4")
+        enc = st.session_state.last_encode
+        if enc and enc.get("cached"):
+            st.caption(f"⚡ {ENCODE_PROFILES[enc['profile']]['label']} · reused an earlier identical burn")
+        elif enc and enc.get("encode_fps"):
+            st.caption(f"🎞️ {ENCODE_PROFILES[enc['profile']]['label']} · "
+                       f"{enc['frames']} frames in {enc['seconds']:.1f} s · {enc['encode_fps']} fps")
 
         dl_a, dl_b, dl_c = st.columns(3)
         with dl_a:
-            with open(st.session_state.burned_video_path, "rb") as f:
-                st.download_button("📥 Video", f, file_name="sublyze_output.mp4",
-                                   mime="video/mp4", key="dl_vid", use_container_width=True)
+            try:
+                with open(st.session_state.burned_video_path, "rb") as f:
+                    st.download_button("📥 Video", f, file_name="sublyze_output.mp4",
+                                       mime="video/mp4", key="dl_vid", use_container_width=True)
+            except FileNotFoundError:   # evicted since the check above: re-burn on rerun
+                st.rerun()
         with dl_b:
             if st.session_state.srt_content:
                 st.download_button("📄 SRT", st.session_state.srt_content,
@@ -1117,9 +1469,31 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
                                    key="dl_srt", use_container_width=True)
         with dl_c:
             if st.button("🔄 New Video", key="start_over", use_container_width=True):
-                st.session_state.clear(); st.rerun()
+                _release_session()
+                st.session_state.clear(); st.query_params.clear(); st.rerun()
+
+        if pending and st.session_state.output_mode == "burn":
+            # Real frames through the burn's own libass path, in well under a second
+            st.markdown("##### 🖼️ Style preview")
+            try:
+                frames = _style_preview(
+                    st.session_state.video_path,
+                    tuple((c["timestamp"][0], c["timestamp"][1], c["text"])
+                          for c in st.session_state.chunks),
+                    tuple(sorted(dict(
+                        fontsize=font_size, color=color, bg_color=bg_color,
+                        bg_opacity=bg_opacity, border_style=bstyle_opt,
+                        stroke_color=stroke_color, stroke_width=stroke_width,
+                        shadow=shadow, position=position,
+                    ).items())),
+                    text_case,
+                )
+                for frame_col, png in zip(st.columns(max(1, len(frames))), frames):
+                    frame_col.image(png, use_container_width=True)
+            except Exception as err:
+                st.caption(f"Preview unavailable: {err}")
 
-        if changed:
+        if pending:
             if st.button("🔥 Apply & Re-burn", use_container_width=True, key="apply_custom"):
                 st.session_state.font_size    = font_size
                 st.session_state.text_case    = text_case
@@ -1131,14 +1505,9 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
                 st.session_state.stroke_width = stroke_width
                 st.session_state.shadow       = shadow
                 st.session_state.position     = position
-                st.session_state.active_preset = "custom"
-                with st.spinner("Burning with custom style…"):
-                    try:
-                        burned = _do_burn()
-                        st.session_state.burned_video_path = burned
-                        st.rerun()
-                    except Exception as err:
-                        st.error(f"Burn failed: {err}")
+                if changed:
+                    st.session_state.active_preset = "custom"
+                _do_burn(); st.rerun()
 
     # ── Subtitle Editor (full-width, below) ───────────────────────────────────
     st.markdown("---")
@@ -1192,18 +1561,11 @@ if st.session_state.steps["burn"] and st.session_state.burned_video_path:
         if edited:
             st.markdown("---")
             if st.button("🔥 Re-burn with Edits", key="reburn_edits", use_container_width=False):
-                with st.spinner("Re-burning with edited subtitles…"):
-                    try:
-                        st.session_state.chunks      = updated_chunks
-                        st.session_state.srt_content = generate_srt(
-                            updated_chunks, text_case=st.session_state.text_case
-                        )
-                        burned = _do_burn()
-                        st.session_state.burned_video_path = burned
-                        st.success("✅ Video updated!")
-                        st.rerun()
-                    except Exception as err:
-                        st.error(f"Re-burn failed: {err}")
+                st.session_state.chunks      = updated_chunks
+                st.session_state.srt_content = generate_srt(
+                    updated_chunks, text_case=st.session_state.text_case
+                )
+                _do_burn(); st.rerun()
 
 elif st.session_state.steps["subtitle"] and not st.session_state.steps["burn"]:
     if st.session_state.srt_content:
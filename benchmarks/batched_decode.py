@@ -0,0 +1,57 @@
+"""Throughput of the model pool under concurrent load, with and without batching.
+
+    python -m benchmarks.batched_decode clip.mp4 --clients 8 --batch-size 8
+
+Starts `clients` threads that each transcribe the same clip through one
+ModelPool, first with per-model locking (batch-of-one decoding), then with
+cross-request batching (utils.batch_decode). Reports wall time, clips per
+minute, and the mean batch size that was actually achieved. Both variants
+decode with condition_on_previous_text=False, since only such calls are
+batched (batch_decode.batchable).
+"""
+import argparse
+import sys
+import threading
+import time
+
+from utils.audio_utils import load_audio_array
+from utils.model_server import ModelPool
+
+
+def _load(pool: ModelPool, audio, model_name: str, clients: int) -> float:
+    threads = [threading.Thread(target=pool.transcribe, args=(audio, model_name),
+                                kwargs={"condition_on_previous_text": False})
+               for _ in range(clients)]
+    t = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return time.perf_counter() - t
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cross-request batched decoding.")
+    parser.add_argument("clip", help="a short clip; every client transcribes it")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    audio = load_audio_array(args.clip)
+    print(f"{args.clients} concurrent clients · {args.model} · {len(audio) / 16000:.1f} s clip")
+    for label, batch_size in (("locked", 0), ("batched", args.batch_size)):
+        pool = ModelPool(budget_mb=100_000, batch_size=batch_size,
+                         batch_wait_ms=args.batch_wait_ms)
+        pool.preload([args.model])
+        pool.transcribe(audio[:16000], args.model)     # warm-up
+        wall = _load(pool, audio, args.model, args.clients)
+        batching = pool.stats()["batching"].get(args.model, {})
+        print(f"{label:<8} {wall:7.1f} s  {args.clients * 60 / wall:6.1f} clips/min"
+              + (f"  mean batch {batching['mean_batch']}" if batching else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""fp32 vs int8-quantized Whisper on one fixed clip: wall time, resident memory, WER.
+
+    python -m benchmarks.quantization clip.mp4 --model small --runs 3
+    python -m benchmarks.quantization clip.mp4 --reference clip.txt --json out.json
+
+Each variant runs in its own fresh process, so nothing is shared between
+the runs. Memory is the process's current RSS right after the model has
+loaded, and the model's share of it (RSS after the load minus RSS
+before). Peak RSS would also count the transient fp32 weights an int8
+model is quantized from. WER is measured against
+--reference (a plain-text transcript) when given, otherwise against the
+fp32 output — then it reads as "how much does int8 change the transcript".
+"""
+import argparse
+import json
+import gc
+import multiprocessing
+import os
+import re
+import resource
+import statistics
+import sys
+import time
+
+
+def _words(text: str) -> list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(substitutions + deletions + insertions) / reference words."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        row = [i]
+        for j, h in enumerate(hyp, 1):
+            row.append(min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (r != h)))
+        prev = row
+    return prev[-1] / len(ref)
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_variant(clip: str, model_name: str, quantized: bool, runs: int, threads: int, out):
+    """Child process: load one model, transcribe the clip `runs` times, report."""
+    import torch
+
+    from utils.audio_utils import load_audio_array
+    from utils.transcription import load_model
+
+    if threads:
+        torch.set_num_threads(threads)
+    audio = load_audio_array(clip)
+
+    gc.collect()
+    rss_before = _rss_mb()
+    t = time.perf_counter()
+    model = load_model(model_name, quantized)
+    load_s = time.perf_counter() - t
+    gc.collect()
+    rss_loaded = _rss_mb()
+
+    walls, text = [], ""
+    for _ in range(runs):
+        t = time.perf_counter()
+        result = model.transcribe(audio, verbose=False, fp16=False, temperature=0.0)
+        walls.append(time.perf_counter() - t)
+        text = result["text"].strip()
+
+    out.put({
+        "variant":      "int8" if quantized else "fp32",
+        "load_s":       round(load_s, 2),
+        "wall_s":       round(statistics.median(walls), 2),
+        "rtf":          round(statistics.median(walls) / (len(audio) / 16000), 3),
+        "rss_mb":       round(rss_loaded, 1),
+        "model_mb":     round(rss_loaded - rss_before, 1),
+        "text":         text,
+    })
+
+
+def benchmark(clip: str, model_name: str = "small", runs: int = 3,
+              threads: int = 0, reference: str = None) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for quantized in (False, True):
+        out = ctx.Queue()
+        proc = ctx.Process(target=_run_variant,
+                           args=(clip, model_name, quantized, runs, threads, out))
+        proc.start()
+        rows.append(out.get())
+        proc.join()
+        if proc.exitcode:
+            raise RuntimeError(f"{'int8' if quantized else 'fp32'} run exited with {proc.exitcode}")
+
+    ref_text = reference if reference is not None else rows[0]["text"]
+    for row in rows:
+        row["wer"] = round(word_error_rate(ref_text, row["text"]), 4)
+    fp32, int8 = rows
+    return {
+        "clip":       clip,
+        "model":      model_name,
+        "runs":       runs,
+        "wer_vs":     "reference" if reference is not None else "fp32",
+        "variants":   rows,
+        "speedup":    round(fp32["wall_s"] / int8["wall_s"], 2) if int8["wall_s"] else None,
+        "rss_saved_mb": round(fp32["model_mb"] - int8["model_mb"], 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark int8-quantized Whisper against fp32.")
+    parser.add_argument("clip", help="audio or video file (fixed clip, same for every run)")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--runs", type=int, default=3, help="timed transcribes per variant (median)")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0: torch default)")
+    parser.add_argument("--reference", help="text file with the true transcript")
+    parser.add_argument("--json", help="also write the full result here")
+    args = parser.parse_args(argv)
+
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = f.read()
+    report = benchmark(args.clip, args.model, args.runs, args.threads, reference)
+
+    print(f"{args.model} on {args.clip} — median of {args.runs}, WER vs {report['wer_vs']}")
+    print(f"{'variant':<8}{'load s':>9}{'wall s':>9}{'RTF':>8}{'RSS MB':>10}{'model MB':>10}{'WER':>8}")
+    for row in report["variants"]:
+        print(f"{row['variant']:<8}{row['load_s']:>9}{row['wall_s']:>9}{row['rtf']:>8}"
+              f"{row['rss_mb']:>10}{row['model_mb']:>10}{row['wer']:>8.2%}")
+    print(f"speedup ×{report['speedup']} · model uses {report['rss_saved_mb']} MB less RSS")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
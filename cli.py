@@ -0,0 +1,201 @@
+"""Headless batch mode: subtitle every video in a folder or manifest.
+
+    python cli.py videos/ --out subtitled/ --style bold
+    python cli.py manifest.txt --out subtitled/ --lang es --summary run.json
+
+Files are pipelined through utils.pipeline: decoding, transcription and
+burning overlap across files, each stage with its own worker count. A JSON
+summary with per-file, per-stage timings and each stage's utilization is
+printed (or written to --summary) so the worker counts can be tuned.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from utils.pipeline import build_subtitle_pipeline
+from utils.subtitle_utils import DEFAULT_PROFILE, ENCODE_PROFILES, PRESET_STYLES
+from utils.translation import TRANSLATION_LANGUAGES
+
+VIDEO_EXTENSIONS = (".mp4", ".mov")
+
+
+# ── Inputs ────────────────────────────────────────────────────────────────────
+def collect_inputs(source: str) -> list:
+    """Video paths from a directory (recursive) or a manifest file.
+
+    A manifest is either a JSON list of paths or a text file with one path
+    per line (blank lines and # comments ignored). Relative paths are
+    resolved against the manifest's directory.
+    """
+    if os.path.isdir(source):
+        found = []
+        for root, _, files in os.walk(source):
+            found += [os.path.join(root, f) for f in files
+                      if f.lower().endswith(VIDEO_EXTENSIONS)]
+        return sorted(found)
+
+    with open(source, encoding="utf-8") as f:
+        raw = f.read()
+    try:
+        entries = json.loads(raw)
+    except ValueError:
+        entries = [line.strip() for line in raw.splitlines()
+                   if line.strip() and not line.lstrip().startswith("#")]
+    base = os.path.dirname(os.path.abspath(source))
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in entries]
+
+
+def output_names(inputs: list, root: str = None) -> dict:
+    """Map each input to its output name: its path relative to root, minus the extension.
+
+    root defaults to the inputs' common directory, so a/clip.mp4 and
+    b/clip.mp4 become a/clip and b/clip under --out instead of both
+    writing clip.srt. Raises ValueError if two inputs still map to the same
+    name (clip.mp4 next to clip.mov), rather than letting one overwrite
+    the other.
+    """
+    if root is None:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in inputs])
+    names, seen = {}, {}
+    for path in inputs:
+        rel  = os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+        name = os.path.splitext(rel)[0]
+        key  = os.path.normcase(name).lower()   # case-insensitive filesystems
+        if key in seen:
+            raise ValueError(f"{path} and {seen[key]} would both write {name}.srt")
+        seen[key], names[path] = path, name
+    return names
+
+
+def _style_kwargs(preset: str) -> dict:
+    p = PRESET_STYLES[preset]
+    return {
+        "fontsize": p["font_size"], "color": p["color"],
+        "bg_color": p["bg_color"], "bg_opacity": p["bg_opacity"],
+        "border_style": p["border_style"], "stroke_color": p["stroke_color"],
+        "stroke_width": p["stroke_width"], "shadow": p["shadow"],
+        "position": p["position"],
+    }
+
+
+def _text_case(args) -> str:
+    return args.text_case or PRESET_STYLES[args.style]["text_case"]
+
+
+# ── Batch driver ──────────────────────────────────────────────────────────────
+def run_batch(inputs: list, args, names: dict = None) -> dict:
+    """Stream every input through the extract → transcribe → burn scheduler.
+
+    names maps inputs to output paths relative to args.out (see
+    output_names); by default they are computed from the inputs.
+    """
+    names = names or output_names(inputs)
+    os.makedirs(args.out, exist_ok=True)
+    options = {
+        "style":         _style_kwargs(args.style),
+        "text_case":     _text_case(args),
+        "lang":          args.lang,
+        "soft":          args.soft,
+        "no_burn":       args.no_burn,
+        "chunk_workers": args.chunk_workers,
+        "model":         args.model,
+        "task":          "translate" if args.english else "transcribe",
+        "profile":       args.profile,
+    }
+    scheduler = build_subtitle_pipeline(
+        extract_workers    = args.extract_workers,
+        transcribe_workers = args.transcribe_workers,
+        burn_workers       = args.burn_workers,
+    )
+    t_start = time.perf_counter()
+    items = scheduler.run(
+        {"input": path, "out_dir": args.out, "name": names[path], "options": options,
+         "timings": {}, "error": None}
+        for path in inputs
+    )
+    order   = {path: i for i, path in enumerate(inputs)}
+    results = []
+    for item in sorted(items, key=lambda it: order[it["input"]]):
+        if item["error"]:
+            print(f"✗ {item['input']}: {item['error']}", file=sys.stderr)
+        results.append({
+            "input":   item["input"],
+            "srt":     item.get("srt"),
+            "video":   item.get("video"),
+            "model":   item.get("model"),
+            "language": item.get("language"),
+            "encode":  item.get("encode"),
+            "timings": {k: round(v, 3) for k, v in item["timings"].items()},
+            "error":   item["error"],
+        })
+
+    totals = {}
+    for entry in results:
+        for stage, secs in entry["timings"].items():
+            totals[stage] = totals.get(stage, 0.0) + secs
+    return {
+        "files":        results,
+        "succeeded":    sum(1 for e in results if not e["error"]),
+        "failed":       sum(1 for e in results if e["error"]),
+        "stage_totals": {k: round(v, 3) for k, v in totals.items()},
+        "utilization":  scheduler.utilization(),
+        "wall_time":    round(time.perf_counter() - t_start, 3),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch-subtitle a folder or manifest of videos.")
+    parser.add_argument("source", help="directory of .mp4/.mov files, or a manifest file")
+    parser.add_argument("--out", default="subtitled", help="output directory")
+    parser.add_argument("--style", default="subtle", choices=sorted(PRESET_STYLES))
+    parser.add_argument("--text-case", choices=["original", "upper", "lower"],
+                        help="override the preset's text case")
+    parser.add_argument("--lang", choices=sorted(set(TRANSLATION_LANGUAGES.values())),
+                        help="translate subtitles to this language code")
+    parser.add_argument("--model", default="small",
+                        choices=["auto", "tiny", "base", "small", "medium"],
+                        help="Whisper size (default small); auto trades accuracy for "
+                             "speed per file, based on its duration")
+    parser.add_argument("--english", action="store_true",
+                        help="have Whisper translate speech to English while transcribing")
+    parser.add_argument("--soft", action="store_true",
+                        help="mux a subtitle track instead of burning (no re-encode)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(ENCODE_PROFILES),
+                        help="encode profile: draft (fast 480p), balanced, archival")
+    parser.add_argument("--no-burn", action="store_true", help="only write .srt files")
+    parser.add_argument("--extract-workers", type=int, default=2,
+                        help="audio decode threads")
+    parser.add_argument("--transcribe-workers", type=int, default=1,
+                        help="Whisper processes (one model each)")
+    parser.add_argument("--burn-workers", type=int, default=2,
+                        help="files burning at the same time")
+    parser.add_argument("--chunk-workers", type=int, default=1,
+                        help="parallel chunk encodes per burn (default: 1, a single "
+                             "ffmpeg pass; files already burn side by side)")
+    parser.add_argument("--summary", help="write the JSON summary here instead of stdout")
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        print(f"No videos found in {args.source}", file=sys.stderr)
+        return 1
+    try:
+        names = output_names(inputs, args.source if os.path.isdir(args.source) else None)
+    except ValueError as err:
+        print(f"Output name collision: {err}", file=sys.stderr)
+        return 1
+
+    summary = run_batch(inputs, args, names)
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0 if not summary["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
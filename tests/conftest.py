@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app runs from the repository root (streamlit run app.py), so utils/ is
+# imported as a top-level package; do the same here.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+
+from utils.artifacts import ArtifactStore
+
+
+@pytest.fixture
+def data(tmp_path):
+    directory = tmp_path / "data"
+    (directory / "store").mkdir(parents=True)
+    return directory
+
+
+def _file(directory, name, size=10):
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def _age(store, session_id, seconds):
+    with store._connect() as conn:
+        conn.execute("UPDATE artifacts SET accessed=accessed-? WHERE session=?",
+                     (seconds, session_id))
+
+
+def test_register_and_usage(tmp_path, data):
+    store = ArtifactStore(str(tmp_path / "a.sqlite"), quota_bytes=None)
+    store.register("s1", _file(data, "subs_s1.srt", 10), "subs")
+    store.register("s1", str(data / "missing.mp4"))             # ignored
+    store.register("s2", _file(data, "burned_s2.mp4", 30), "burned")
+
+    metrics = store.metrics()
+    assert (metrics["sessions"], metrics["files"], metrics["bytes"]) == (2, 2, 40)
+    assert metrics["bytes_by_kind"] == {"subs": 10, "burned": 30}
+
+
+def test_shared_upload_outlives_one_session(tmp_path, data):
+    store  = ArtifactStore(str(tmp_path / "a.sqlite"), quota_bytes=None)
+    upload = _file(data / "store", "abc.mp4")
+    store.register("s1", upload, "upload")
+    store.register("s2", upload, "upload")
+    assert store.usage_bytes() == 10      # counted once
+
+    assert store.release_session("s1") == 0
+    assert os.path.exists(upload)
+    assert store.release_session("s2") == 10
+    assert not os.path.exists(upload)
+
+
+def test_quota_evicts_idle_sessions_oldest_first(tmp_path, data):
+    store = ArtifactStore(str(tmp_path / "a.sqlite"), quota_bytes=25, protect_s=60)
+    old   = _file(data, "burned_old.mp4")
+    mid   = _file(data, "burned_mid.mp4")
+    store.register("old", old)
+    store.register("mid", mid)
+    _age(store, "old", 300)
+    _age(store, "mid", 200)
+    live = _file(data, "burned_live.mp4")
+    store.register("live", live)        # 30 bytes > 25: evicts "old" only
+
+    assert not os.path.exists(old)
+    assert os.path.exists(mid) and os.path.exists(live)
+    assert store.metrics()["evicted_sessions"] == 1
+
+
+def test_quota_never_evicts_a_live_session(tmp_path, data):
+    store = ArtifactStore(str(tmp_path / "a.sqlite"), quota_bytes=5, protect_s=60)
+    path  = _file(data, "burned_s1.mp4")
+    store.register("s1", path)
+    _age(store, "s1", 300)
+    store.touch("s1")                   # heartbeat
+    store.enforce_quota()
+
+    assert os.path.exists(path)
+
+
+def test_sweep_expires_sessions_and_old_leftovers(tmp_path, data):
+    store = ArtifactStore(str(tmp_path / "a.sqlite"), quota_bytes=None, ttl_s=3600)
+    expired = _file(data, "burned_gone.mp4")
+    kept    = _file(data, "burned_kept.mp4")
+    store.register("gone", expired)
+    store.register("kept", kept)
+    _age(store, "gone", 7200)
+
+    stale_leftover = _file(data, "subs_crashed.srt")
+    fresh_leftover = _file(data / "store", "new.mp4")
+    unrelated      = _file(data, "notes.txt")
+    old = time.time() - 7200
+    for path in (stale_leftover, unrelated):
+        os.utime(path, (old, old))
+
+    assert store.sweep(str(data), str(data / "store")) == 1
+    assert not os.path.exists(expired) and not os.path.exists(stale_leftover)
+    assert os.path.exists(kept) and os.path.exists(fresh_leftover) and os.path.exists(unrelated)
@@ -0,0 +1,116 @@
+import io
+import os
+import stat
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+from utils.audio_utils import (
+    SAMPLE_RATE, ingest_upload, iter_audio_blocks, pack_regions, split_on_silence,
+)
+
+
+def _tone(seconds, amp=0.5):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amp * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def _seconds(regions):
+    return [(round(s / SAMPLE_RATE, 1), round(e / SAMPLE_RATE, 1)) for s, e in regions]
+
+
+def test_speech_is_found_between_silences():
+    audio = np.concatenate([_silence(1), _tone(2), _silence(2), _tone(1), _silence(1)])
+    assert _seconds(split_on_silence(audio)) == [(0.8, 3.2), (4.8, 6.2)]   # padded by 0.2 s
+
+
+def test_short_pauses_are_bridged_and_blips_dropped():
+    audio = np.concatenate([_silence(1), _tone(1), _silence(0.3), _tone(1),
+                            _silence(2), _tone(0.1), _silence(1)])
+    assert _seconds(split_on_silence(audio)) == [(0.8, 3.5)]
+
+
+def test_long_speech_is_cut_below_max_piece():
+    audio  = np.concatenate([_tone(150), _silence(1)])
+    pieces = split_on_silence(audio, max_piece_s=60.0)
+
+    assert len(pieces) >= 3
+    assert pieces[0][0] == 0 and pieces[-1][1] >= 150 * SAMPLE_RATE
+    assert all(e - s <= 60.2 * SAMPLE_RATE for s, e in pieces)    # plus the end padding
+    assert all(a[1] == b[0] for a, b in zip(pieces, pieces[1:]))     # no gaps at forced cuts
+
+
+def test_empty_audio_has_no_regions():
+    assert split_on_silence(np.zeros(0, dtype=np.float32)) == []
+
+
+def test_regions_are_packed_into_windows():
+    sec     = SAMPLE_RATE
+    regions = [(0, 5 * sec), (6 * sec, 10 * sec), (12 * sec, 28 * sec),
+               (30 * sec, 31 * sec), (40 * sec, 100 * sec)]
+    assert pack_regions(regions, max_s=29.0) == [
+        (0, 28 * sec), (30 * sec, 31 * sec), (40 * sec, 100 * sec),   # too long: alone
+    ]
+    assert pack_regions([]) == []
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data, name="clip.MP4", fail_after=None):
+        super().__init__(data)
+        self.name, self._fail_after = name, fail_after
+
+    def read(self, size=-1):
+        if self._fail_after is not None and self.tell() >= self._fail_after:
+            raise ConnectionResetError("upload interrupted")
+        return super().read(size)
+
+
+def test_identical_uploads_share_one_stored_file(tmp_path):
+    first, digest = ingest_upload(_Upload(b"video bytes"), str(tmp_path))
+    again, same   = ingest_upload(_Upload(b"video bytes", name="copy.mp4"), str(tmp_path))
+    other, _      = ingest_upload(_Upload(b"other bytes"), str(tmp_path))
+
+    assert (again, same) == (first, digest)
+    assert os.path.basename(first) == f"{digest}.mp4"
+    assert other != first
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(first), os.path.basename(other)])
+
+
+def test_failed_upload_leaves_no_temp_file(tmp_path):
+    with pytest.raises(ConnectionResetError):
+        ingest_upload(_Upload(b"x" * (3 << 20), fail_after=1 << 20), str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def _fake_ffmpeg(tmp_path, monkeypatch, body):
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport sys\n{body}\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_chatty_stderr_does_not_stall_the_decode(tmp_path, monkeypatch):
+    # 1 MB of warnings before any audio: far more than a pipe buffer holds
+    _fake_ffmpeg(tmp_path, monkeypatch,
+                 "sys.stderr.write('warning: odd timestamp\\n' * 40000); sys.stderr.flush()\n"
+                 f"sys.stdout.buffer.write(bytes({2 * SAMPLE_RATE}))")
+    blocks = []
+    reader = threading.Thread(target=lambda: blocks.extend(iter_audio_blocks("in.mp4")),
+                              daemon=True)
+    reader.start()
+    reader.join(20)
+
+    assert not reader.is_alive()
+    assert sum(len(b) for b in blocks) == SAMPLE_RATE
+
+
+def test_decode_errors_carry_ffmpegs_message(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, "sys.stderr.write('in.mp4: Invalid data'); sys.exit(1)")
+    with pytest.raises(RuntimeError, match="Invalid data"):
+        list(iter_audio_blocks("in.mp4"))
@@ -0,0 +1,81 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.audio_utils import SAMPLE_RATE
+from utils.batch_decode import BatchingTranscriber, _parse_segments, _split_unfinished, batchable
+
+
+class _Tokenizer:
+    timestamp_begin = 1000
+
+    def decode(self, tokens):
+        return " ".join(f"w{t}" for t in tokens)
+
+
+def _ts(seconds):
+    return 1000 + int(round(seconds / 0.02))
+
+
+def test_batchable_calls():
+    window, long = np.zeros(10 * SAMPLE_RATE), np.zeros(60 * SAMPLE_RATE)
+
+    assert batchable(window, {})
+    assert batchable(long, {"condition_on_previous_text": False})
+    assert not batchable(long, {})                              # would condition across windows
+    assert not batchable(window, {"initial_prompt": "Earlier text"})
+    assert not batchable("clip.wav", {})
+
+
+def test_segments_split_at_timestamp_tokens():
+    tokens = [_ts(0.0), 1, 2, _ts(1.0), _ts(1.0), 3, _ts(2.5)]
+    assert _parse_segments(tokens, _Tokenizer(), offset_s=10.0, length_s=20.0) == [
+        {"start": 10.0, "end": 11.0, "text": "w1 w2"},
+        {"start": 11.0, "end": 12.5, "text": "w3"},
+    ]
+
+
+def test_trailing_text_runs_to_the_window_end():
+    tokens = [_ts(0.0), 1, _ts(29.9), 2]       # last timestamp beyond the 5 s of audio
+    segments = _parse_segments([_ts(3.0), 1, 2], _Tokenizer(), offset_s=0.0, length_s=5.0)
+
+    assert segments == [{"start": 3.0, "end": 5.0, "text": "w1 w2"}]
+    assert _parse_segments(tokens, _Tokenizer(), 0.0, 5.0)[0]["end"] == 5.0
+
+
+def test_complete_windows_are_kept_whole():
+    done = [_ts(0.0), 1, _ts(1.0), _ts(1.0), 2, _ts(2.0)]
+    assert _split_unfinished(done, _Tokenizer(), 20.0) == (done, None)
+    assert _split_unfinished([_ts(0.0), 1, 2], _Tokenizer(), 20.0) == ([_ts(0.0), 1, 2], None)
+
+
+def test_a_decode_that_stopped_early_resumes_at_the_last_pair():
+    tokens = [_ts(0.0), 1, _ts(4.0), _ts(4.0), 2, 3]           # unfinished tail
+    assert _split_unfinished(tokens, _Tokenizer(), 20.0) == (tokens[:3], 4.0)
+    ends_on_pair = [_ts(0.0), 1, _ts(6.0), _ts(6.0)]
+    assert _split_unfinished(ends_on_pair, _Tokenizer(), 20.0) == (ends_on_pair[:3], 6.0)
+    assert _split_unfinished(ends_on_pair, _Tokenizer(), 6.0)[1] is None   # nothing left
+
+
+def test_transcribe_redecodes_the_rest_of_an_unfinished_window():
+    batcher = BatchingTranscriber.__new__(BatchingTranscriber)
+    batcher._whisper, batcher._tokenizer = None, lambda language, task: _Tokenizer()
+    submitted = []
+
+    def submit(samples, task="transcribe", language=None):
+        submitted.append(round(len(samples) / SAMPLE_RATE, 1))
+        tokens = ([_ts(0.0), 1, _ts(4.0), _ts(4.0), 2] if len(submitted) == 1
+                  else [_ts(0.0), 3, _ts(2.0)])
+        fut = Future()
+        fut.set_result(SimpleNamespace(tokens=tokens, language="en", no_speech_prob=0.0,
+                                       avg_logprob=-0.2))
+        return fut
+
+    batcher.submit = submit
+    audio  = np.full(10 * SAMPLE_RATE, 0.5, dtype=np.float32)
+    result = batcher.transcribe(audio)
+
+    assert len(submitted) == 2 and submitted[1] == round(submitted[0] - 4.0, 1)
+    assert [seg["text"] for seg in result["segments"]] == ["w1", "w3"]
+    assert result["segments"][1]["start"] == result["segments"][0]["end"]
@@ -0,0 +1,94 @@
+import os
+import time
+
+from utils.burn_cache import BurnCache, burn_key
+from utils.cache import DiskCache, content_key
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path / "c.sqlite"))
+    cache.set("a", {"text": "héllo", "n": [1, 2]})
+
+    assert cache.get("a") == {"text": "héllo", "n": [1, 2]}
+    assert cache.get("missing", "dflt") == "dflt"
+    assert cache.get_many(["a", "missing", "a"]) == {"a": {"text": "héllo", "n": [1, 2]}}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 1)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "c.sqlite"), max_entries=2)
+    cache.set("a", 1)
+    time.sleep(0.01)
+    cache.set("b", 2)
+    time.sleep(0.01)
+    cache.get("a")          # a is now more recent than b
+    time.sleep(0.01)
+    cache.set("c", 3)
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+
+def test_disk_cache_byte_budget(tmp_path):
+    cache = DiskCache(str(tmp_path / "c.sqlite"), max_bytes=25)
+    for key in "abc":
+        cache.set(key, "x" * 8)       # 10 bytes of JSON each
+        time.sleep(0.01)
+
+    assert set(cache.get_many("abc")) == {"b", "c"}
+    assert cache.stats()["bytes"] <= 25
+
+
+def test_content_key_separates_parts():
+    assert content_key("ab", "c") != content_key("a", "bc")
+    assert content_key("a", 1) == content_key("a", "1")
+
+
+def _burned(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"v" * size)
+    return str(path)
+
+
+def test_burn_cache_put_and_get(tmp_path):
+    cache = BurnCache(str(tmp_path / "burns"), max_bytes=1000)
+    key = burn_key("video", "[Script Info]", ["-c:v", "libx264"])
+
+    assert cache.get(key) is None
+    path = cache.put(key, _burned(tmp_path, "out.mp4", 10))
+    assert cache.get(key) == path
+    assert not os.path.exists(tmp_path / "out.mp4")   # moved, not copied
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_burn_key_covers_script_and_encoder():
+    base = burn_key("video", "script", ["-crf", "20"])
+    assert base != burn_key("video", "script2", ["-crf", "20"])
+    assert base != burn_key("video", "script", ["-crf", "23"])
+    assert base != burn_key("video2", "script", ["-crf", "20"])
+
+
+def test_burn_cache_evicts_lru_but_keeps_newest(tmp_path):
+    cache = BurnCache(str(tmp_path / "burns"), max_bytes=25)
+    first  = cache.put("first", _burned(tmp_path, "1.mp4", 10))
+    time.sleep(0.01)
+    second = cache.put("second", _burned(tmp_path, "2.mp4", 10))
+    time.sleep(0.01)
+    cache.get("first")
+    time.sleep(0.01)
+    cache.put("third", _burned(tmp_path, "3.mp4", 10))
+
+    assert os.path.exists(first) and not os.path.exists(second)
+    assert cache.get("second") is None
+
+    huge = cache.put("huge", _burned(tmp_path, "4.mp4", 100))
+    assert os.path.exists(huge)                       # over budget on its own, still kept
+    assert cache.stats()["entries"] == 1
+
+
+def test_burn_cache_forgets_files_removed_behind_its_back(tmp_path):
+    cache = BurnCache(str(tmp_path / "burns"), max_bytes=1000)
+    os.remove(cache.put("k", _burned(tmp_path, "out.mp4", 10)))
+
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+from cli import collect_inputs, output_names
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return str(path)
+
+
+def test_directories_are_walked_for_videos(tmp_path):
+    videos = [_touch(tmp_path / "b.MOV"), _touch(tmp_path / "a" / "clip.mp4")]
+    _touch(tmp_path / "notes.txt")
+
+    assert collect_inputs(str(tmp_path)) == sorted(videos)
+
+
+def test_text_manifest(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("# talks\nday1/keynote.mp4\n\n/abs/other.mov\n", encoding="utf-8")
+
+    assert collect_inputs(str(manifest)) == [
+        os.path.join(str(tmp_path), "day1/keynote.mp4"), "/abs/other.mov",
+    ]
+
+
+def test_json_manifest(tmp_path):
+    manifest = tmp_path / "list.json"
+    manifest.write_text(json.dumps(["x.mp4", "/abs/y.mp4"]), encoding="utf-8")
+
+    assert collect_inputs(str(manifest)) == [os.path.join(str(tmp_path), "x.mp4"), "/abs/y.mp4"]
+
+
+def test_outputs_mirror_the_source_tree(tmp_path):
+    inputs = [str(tmp_path / "a" / "clip.mp4"), str(tmp_path / "b" / "clip.mp4"),
+              str(tmp_path / "top.mov")]
+
+    assert output_names(inputs, str(tmp_path)) == {
+        inputs[0]: os.path.join("a", "clip"),
+        inputs[1]: os.path.join("b", "clip"),
+        inputs[2]: "top",
+    }
+    # Manifests have no source directory: names are relative to the common one
+    assert output_names(inputs[:2]) == {inputs[0]: os.path.join("a", "clip"),
+                                        inputs[1]: os.path.join("b", "clip")}
+
+
+def test_colliding_outputs_are_refused(tmp_path):
+    with pytest.raises(ValueError, match="would both write"):
+        output_names([str(tmp_path / "clip.mp4"), str(tmp_path / "Clip.mov")])
@@ -0,0 +1,104 @@
+import pytest
+
+from utils import jobs
+from utils.jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_jobs_run_in_submission_order(queue):
+    first  = queue.submit("pipeline", {"n": 1})
+    second = queue.submit("burn", {"n": 2})
+    assert queue.depth() == 2
+
+    job = queue.claim(worker=11)
+    assert (job["id"], job["status"], job["worker"], job["params"]) == (first, RUNNING, 11, {"n": 1})
+    assert job["attempts"] == 1
+    assert queue.claim(worker=12)["id"] == second
+    assert queue.claim(worker=13) is None
+
+
+def test_progress_result_and_failure(queue):
+    ok, bad = queue.submit("pipeline", {}), queue.submit("pipeline", {})
+    queue.claim(1)
+    queue.claim(2)
+
+    queue.report(ok, "transcribe", 0.5)
+    assert (queue.get(ok)["stage"], queue.get(ok)["progress"]) == ("transcribe", 0.5)
+    assert queue.finish(ok, {"srt": "1\n"}, worker=1)
+    assert queue.fail(bad, "boom", worker=2)
+
+    assert queue.get(ok)["status"] == DONE and queue.get(ok)["result"] == {"srt": "1\n"}
+    assert queue.get(bad)["status"] == FAILED and queue.get(bad)["error"] == "boom"
+    assert queue.depth() == 0
+    assert queue.get("nope") is None
+
+
+def test_live_leases_are_left_alone(queue):
+    job_id = queue.submit("pipeline", {})
+    queue.claim(1)
+    queue.heartbeat(job_id, 1)
+
+    assert queue.requeue_expired() == 0
+    assert queue.get(job_id)["status"] == RUNNING
+
+
+def test_expired_lease_is_requeued_then_failed(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "LEASE_S", -1.0)    # every lease is already over
+    job_id = queue.submit("pipeline", {})
+
+    for attempt in range(1, 3):
+        assert queue.claim(worker=attempt)["attempts"] == attempt
+        assert queue.requeue_expired(max_attempts=3) == 1
+        assert queue.get(job_id)["status"] == QUEUED
+
+    queue.claim(worker=3)
+    queue.requeue_expired(max_attempts=3)
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and "stopped responding" in job["error"]
+
+
+def test_heartbeat_from_another_worker_is_ignored(queue, monkeypatch):
+    job_id = queue.submit("pipeline", {})
+    monkeypatch.setattr(jobs, "LEASE_S", -1.0)
+    queue.claim(worker=1)
+    monkeypatch.setattr(jobs, "LEASE_S", 60.0)
+    queue.heartbeat(job_id, worker=2)
+
+    assert queue.requeue_expired() == 1
+
+
+def test_stale_worker_cannot_overwrite_a_requeued_job(queue, monkeypatch):
+    job_id = queue.submit("pipeline", {})
+    monkeypatch.setattr(jobs, "LEASE_S", -1.0)
+    queue.claim(worker=1)
+    queue.requeue_expired()
+    monkeypatch.setattr(jobs, "LEASE_S", 60.0)
+    queue.claim(worker=2)
+
+    assert not queue.finish(job_id, {"from": 1}, worker=1)
+    assert not queue.fail(job_id, "late", worker=1)
+    assert queue.get(job_id)["status"] == RUNNING
+    assert queue.finish(job_id, {"from": 2}, worker=2)
+    assert queue.get(job_id)["result"] == {"from": 2}
+    assert not queue.fail(job_id, "after done", worker=2)
+
+
+def test_tables_from_before_leases_are_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+            " stage TEXT, progress REAL NOT NULL DEFAULT 0,"
+            " params TEXT NOT NULL, result TEXT, error TEXT,"
+            " worker INTEGER, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+    queue = JobQueue(path)
+    queue.submit("pipeline", {})
+    assert queue.claim(1)["attempts"] == 1
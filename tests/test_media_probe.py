@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from utils import media_probe
+from utils.media_probe import probe_streams
+
+
+@pytest.fixture
+def ffprobe_output(monkeypatch, tmp_path):
+    """Make ffprobe print the given streams for a fresh file; returns its path."""
+    def _set(streams):
+        path = tmp_path / f"v{len(list(tmp_path.iterdir()))}.mp4"
+        path.write_bytes(b"")
+        monkeypatch.setattr(media_probe, "_ffprobe",
+                            lambda args, timeout=60: json.dumps({"streams": streams}))
+        return str(path)
+    return _set
+
+
+def test_first_video_and_audio_streams(ffprobe_output):
+    path = ffprobe_output([
+        {"codec_type": "video", "codec_name": "h264", "pix_fmt": "yuv420p",
+         "width": 1920, "height": 1080, "r_frame_rate": "30000/1001",
+         "avg_frame_rate": "30000/1001"},
+        {"codec_type": "audio", "codec_name": "aac", "sample_rate": "48000", "channels": 2},
+        {"codec_type": "audio", "codec_name": "ac3", "sample_rate": "48000", "channels": 6},
+        {"codec_type": "subtitle", "codec_name": "mov_text"},
+    ])
+    info = probe_streams(path)
+
+    assert info["audio"] == {"codec": "aac", "sample_rate": 48000, "channels": 2}
+    video = info["video"]
+    assert (video["codec"], video["width"], video["height"]) == ("h264", 1920, 1080)
+    assert video["fps"] == pytest.approx(29.97, abs=0.01)
+    assert video["constant_fps"] is True
+
+
+def test_rotated_phone_video_and_variable_frame_rate(ffprobe_output):
+    path = ffprobe_output([
+        {"codec_type": "video", "codec_name": "hevc", "width": 1920, "height": 1080,
+         "r_frame_rate": "30/1", "avg_frame_rate": "2997/100",
+         "side_data_list": [{"rotation": -90}]},
+    ])
+    info = probe_streams(path)
+
+    assert info["audio"] is None
+    assert (info["video"]["width"], info["video"]["height"]) == (1080, 1920)
+    assert info["video"]["fps"] == pytest.approx(29.97)
+    assert info["video"]["constant_fps"] is False
+
+
+def test_callers_cannot_change_the_cached_result(ffprobe_output):
+    path = ffprobe_output([{"codec_type": "audio", "codec_name": "mp3",
+                            "sample_rate": "44100", "channels": 1}])
+    probe_streams(path)["audio"]["codec"] = "changed"
+    assert probe_streams(path)["audio"]["codec"] == "mp3"
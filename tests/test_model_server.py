@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from utils import transcription
+from utils.model_server import ModelPool
+
+
+class _Model:
+    def __init__(self, name):
+        self.name = name
+
+    def transcribe(self, audio, **options):
+        return {"text": self.name, "segments": []}
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    names = []
+
+    def fake_load(name, quantized):
+        names.append(name)
+        return _Model(name)
+
+    monkeypatch.setattr(transcription, "load_model", fake_load)
+    return names
+
+
+def test_int8_load_is_budgeted_at_fp32_size(loads):
+    pool = ModelPool(budget_mb=1200, quantized=True)
+    pool.get("base")
+    pool.get("small")   # 175 MB resident + 1100 MB of fp32 weights while loading
+
+    assert pool.stats()["loaded"] == ["small"]
+    assert pool.stats()["resident_mb"] == 550
+
+
+def test_a_slow_load_does_not_block_resident_models(monkeypatch):
+    release, started, loads = threading.Event(), threading.Event(), []
+
+    def slow_load(name, quantized):
+        loads.append(name)
+        if name == "small":
+            started.set()
+            release.wait(5)
+        return _Model(name)
+
+    monkeypatch.setattr(transcription, "load_model", slow_load)
+    pool = ModelPool(budget_mb=4000)
+    pool.get("base")
+    waiters = [threading.Thread(target=pool.get, args=("small",)) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    assert started.wait(5)
+
+    t0 = time.monotonic()
+    assert pool.get("base")[0].name == "base"
+    assert pool.stats()["loading"] == ["small"]
+    assert time.monotonic() - t0 < 1.0
+
+    release.set()
+    for t in waiters:
+        t.join(5)
+    assert loads.count("small") == 1                  # one load, shared by all waiters
+    assert pool.stats()["loaded"] == ["base", "small"]
+
+
+def test_a_failed_load_lets_the_next_caller_retry(monkeypatch):
+    attempts = []
+
+    def flaky_load(name, quantized):
+        attempts.append(name)
+        if len(attempts) == 1:
+            raise OSError("download interrupted")
+        return _Model(name)
+
+    monkeypatch.setattr(transcription, "load_model", flaky_load)
+    pool = ModelPool()
+    with pytest.raises(OSError):
+        pool.get("tiny")
+    assert pool.get("tiny")[0].name == "tiny" and pool.stats()["loading"] == []
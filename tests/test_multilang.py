@@ -0,0 +1,42 @@
+import pytest
+
+from utils import multilang
+
+
+@pytest.fixture
+def stubs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = {"mux": [], "burn": []}
+    monkeypatch.setattr(multilang, "translate_chunks",
+                        lambda chunks, code, source_lang=None:
+                        [{"timestamp": c["timestamp"], "text": f"{code}:{c['text']}"} for c in chunks])
+    monkeypatch.setattr(multilang, "mux_subtitles_to_video",
+                        lambda video, chunks, text_case, session_id:
+                        calls["mux"].append(session_id) or f"data/muxed_{session_id}.mp4")
+    monkeypatch.setattr(multilang, "ProcessPoolExecutor",
+                        lambda *a, **k: pytest.fail("soft mode must not start a burn pool"))
+    return calls
+
+
+CHUNKS = [{"timestamp": (0.0, 1.5), "text": "hello"}]
+
+
+def test_soft_mode_muxes_each_language_without_burning(stubs):
+    seen = []
+    bundle = multilang.fan_out_languages(
+        "in.mp4", CHUNKS, ["de", "fr"], session_id="s1", output_mode="soft",
+        on_progress=lambda code, stage, f: seen.append((code, stage)),
+    )
+
+    assert sorted(stubs["mux"]) == ["s1_de", "s1_fr"]
+    assert bundle["de"]["video_path"] == "data/muxed_s1_de.mp4"
+    assert "de:hello" in bundle["de"]["srt_content"] and bundle["fr"]["error"] is None
+    assert ("de", "done") in seen and ("fr", "done") in seen
+
+
+def test_srt_only_and_bad_mode(stubs):
+    bundle = multilang.fan_out_languages("in.mp4", CHUNKS, ["de"], session_id="s2", burn=False)
+    assert bundle["de"]["video_path"] is None and bundle["de"]["srt_path"]
+    assert stubs["mux"] == []
+    with pytest.raises(ValueError):
+        multilang.fan_out_languages("in.mp4", CHUNKS, ["de"], output_mode="hls")
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import pytest
+
+from utils import subtitle_utils
+from utils.pipeline import PipelineScheduler, Stage, burn_stage
+
+
+def _step(name, delay=0.0):
+    def fn(item):
+        time.sleep(delay)
+        if item.get("fail") == name:
+            raise ValueError("bad input")
+        item["trail"] = item.get("trail", []) + [name]
+        return item
+    return fn
+
+
+def test_every_item_passes_every_stage_in_order():
+    scheduler = PipelineScheduler([
+        Stage("a", _step("a"), workers=2),
+        Stage("b", _step("b")),
+        Stage("c", _step("c"), workers=3),
+    ])
+    items = scheduler.run({"n": n} for n in range(10))
+
+    assert sorted(item["n"] for item in items) == list(range(10))
+    assert all(item["trail"] == ["a", "b", "c"] for item in items)
+    assert {name: r["items"] for name, r in scheduler.utilization().items()} == \
+        {"a": 10, "b": 10, "c": 10}
+
+
+def test_a_failing_item_skips_the_remaining_stages():
+    scheduler = PipelineScheduler([Stage("a", _step("a")), Stage("b", _step("b"))])
+    items = {item["n"]: item for item in scheduler.run(
+        [{"n": 0}, {"n": 1, "fail": "a"}, {"n": 2}]
+    )}
+
+    assert items[1]["error"] == "a: ValueError: bad input"
+    assert "trail" not in items[1]
+    assert items[0]["trail"] == items[2]["trail"] == ["a", "b"]
+
+
+def test_stages_overlap_across_items():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def slow(item):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return item
+
+    PipelineScheduler([Stage("a", slow), Stage("b", slow)]).run({"n": n} for n in range(4))
+    assert peak[0] == 2       # one item in each stage at the same time
+
+
+def test_process_stages_run_in_a_pool():
+    scheduler = PipelineScheduler([Stage("copy", dict, kind="process", workers=2)])
+    items = scheduler.run({"n": n} for n in range(3))
+    assert sorted(item["n"] for item in items) == [0, 1, 2]
+    assert scheduler.utilization()["copy"]["kind"] == "process"
+
+
+def test_unknown_stage_kind():
+    with pytest.raises(ValueError):
+        Stage("x", dict, kind="gpu")
+
+
+def test_burn_stage_links_the_output_and_drops_work_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def fake_burn(video, chunks, session_id, workers, **kwargs):
+        calls.append(workers)
+        os.makedirs(f"data/segments_{session_id}")
+        open(f"data/subs_{session_id}.ass", "w").close()
+        os.makedirs("data/burn_cache", exist_ok=True)
+        with open("data/burn_cache/k.mp4", "w") as f:
+            f.write("video")
+        return "data/burn_cache/k.mp4"
+
+    monkeypatch.setattr(subtitle_utils, "burn_subtitles_to_video", fake_burn)
+    item = {"input": "clip.mp4", "out_dir": "out", "chunks": [], "timings": {},
+            "options": {"text_case": "original", "style": {}}}
+    burn_stage(item)
+
+    assert calls == [1]                                     # single pass by default
+    assert os.path.samefile(item["video"], "data/burn_cache/k.mp4")
+    assert sorted(os.listdir("data")) == ["burn_cache"]     # no segments_/subs_ left
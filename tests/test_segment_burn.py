@@ -0,0 +1,50 @@
+import pytest
+
+from utils import segment_burn
+from utils.segment_burn import _chunks_in_range, plan_segments
+
+
+@pytest.fixture
+def probe(monkeypatch):
+    def _probe(duration, keyframes):
+        monkeypatch.setattr(segment_burn, "probe_duration", lambda path: duration)
+        monkeypatch.setattr(segment_burn, "probe_keyframes", lambda path: keyframes)
+    return _probe
+
+
+def test_segments_start_on_keyframes(probe):
+    probe(100.0, [0.0, 4.0, 11.0, 19.5, 24.0, 31.0, 47.0, 52.0, 97.0])
+    # Each cut is the first keyframe at least 20 s after the previous one
+    assert plan_segments("v.mp4", target_s=20.0) == [(0.0, 24.0), (24.0, 47.0), (47.0, 100.0)]
+
+
+def test_short_tail_is_folded_into_the_last_segment(probe):
+    probe(100.0, [0.0, 30.0, 60.0, 95.0])
+    # 95 s would leave a 5 s segment (< target/2), so it is not a cut
+    assert plan_segments("v.mp4", target_s=30.0) == [(0.0, 30.0), (30.0, 60.0), (60.0, 100.0)]
+
+
+def test_no_keyframes_falls_back_to_even_ranges(probe):
+    probe(65.0, [])
+    assert plan_segments("v.mp4", target_s=20.0) == [(0.0, 20.0), (20.0, 40.0), (40.0, 65.0)]
+
+
+def test_unknown_duration_is_an_error(probe):
+    probe(0.0, [])
+    with pytest.raises(RuntimeError):
+        plan_segments("v.mp4")
+
+
+def test_chunks_are_clipped_and_shifted_into_the_range():
+    chunks = [
+        {"timestamp": (1.0, 4.0), "text": "before"},
+        {"timestamp": (9.0, 12.0), "text": "straddles start"},
+        {"timestamp": (15.0, 15.1), "text": "short"},
+        {"timestamp": (19.0, 25.0), "text": "straddles end"},
+        {"timestamp": (20.0, 22.0), "text": "after"},
+    ]
+    assert _chunks_in_range(chunks, 10.0, 20.0) == [
+        {"timestamp": (0.0, 2.0), "text": "straddles start"},
+        {"timestamp": (5.0, 5.5), "text": "short"},           # stretched to 0.5 s
+        {"timestamp": (9.0, 10.0), "text": "straddles end"},
+    ]
@@ -0,0 +1,100 @@
+import pytest
+
+from utils import subtitle_utils
+from utils.cache import DiskCache
+from utils.subtitle_utils import (
+    _audio_encode_args, _text_em, _wrap_ass_text, compile_ass, generate_ass,
+)
+
+
+def _dialogues(script):
+    return [line for line in script.splitlines() if line.startswith("Dialogue:")]
+
+
+def test_short_caption_is_left_alone():
+    assert _wrap_ass_text("Hello there", max_em=20) == "Hello there"
+
+
+def test_long_caption_breaks_into_balanced_lines():
+    text  = "the quick brown fox jumps over the lazy dog and keeps on running far away"
+    lines = _wrap_ass_text(text, max_em=20).split("\\N")
+
+    assert len(lines) == -(-_text_em(text) // 20)     # as few lines as fit
+    assert " ".join(lines) == text
+    widths = [_text_em(line) for line in lines]
+    assert max(widths) <= 20 and max(widths) - min(widths) < 5
+
+
+def test_text_without_spaces_still_breaks():
+    text  = "日本語の字幕はスペースなしで書かれます。とても長い一文です"
+    lines = _wrap_ass_text(text, max_em=12).split("\\N")
+
+    assert len(lines) > 1 and "".join(lines) == text
+    assert all(_text_em(line) <= 12 for line in lines)
+    assert not any(line.startswith("。") for line in lines)   # punctuation closes its line
+
+
+def test_full_width_characters_count_double():
+    assert _text_em("字幕") == 2.0
+    assert _text_em("ab") < 1.2
+    assert _text_em("AB", upper=True) > _text_em("ab")
+
+
+def test_script_header_and_canvas():
+    script = generate_ass([{"timestamp": (0.0, 1.0), "text": "Hi"}], video_size=(1920, 1080))
+
+    assert "PlayResX: 1920" in script and "PlayResY: 1080" in script
+    assert "WrapStyle: 0" in script                      # libass still wraps what doesn't fit
+    assert "Style: Default," in script and "Style: Subtle," in script
+
+
+def test_dialogue_timing_case_and_escaping():
+    chunks = [
+        {"timestamp": (1.0, 1.2), "text": "short {\\b1}tag"},
+        {"timestamp": (3725.5, 3727.25), "text": "  later  "},
+        {"timestamp": (5.0, 6.0), "text": "   "},
+        {"timestamp": (None, 2.0), "text": "no start"},
+    ]
+    lines = _dialogues(generate_ass(chunks, text_case="upper"))
+
+    assert len(lines) == 2
+    assert lines[0].startswith("Dialogue: 0,0:00:01.00,0:00:01.50,Default,")   # 0.5 s minimum
+    assert "{" not in lines[0] and "\\b1" not in lines[0]
+    assert lines[0].endswith("SHORT (∖B1)TAG")
+    assert lines[1].startswith("Dialogue: 0,1:02:05.50,1:02:07.25,Default,")
+    assert lines[1].endswith(",LATER")
+
+
+def test_narrow_video_gets_more_line_breaks():
+    text  = [{"timestamp": (0.0, 2.0), "text": "a fairly long caption that needs wrapping on phones"}]
+    wide  = _dialogues(generate_ass(text, video_size=(1920, 1080)))[0]
+    tall  = _dialogues(generate_ass(text, video_size=(608, 1080)))[0]
+    assert tall.count("\\N") > wide.count("\\N")
+
+
+@pytest.mark.parametrize("codec, copied", [
+    ("aac", True), ("mp3", True), ("ac3", False), ("eac3", False), ("alac", False),
+    ("pcm_s16le", False),
+])
+def test_only_browser_playable_audio_is_copied(monkeypatch, codec, copied):
+    monkeypatch.setattr(subtitle_utils, "probe_streams",
+                        lambda path: {"audio": {"codec": codec}, "video": None})
+    args = _audio_encode_args("balanced", "in.mov")
+    assert (args == ["-c:a", "copy"]) == copied
+    assert copied or args[:2] == ["-c:a", "aac"]
+
+
+def test_compiled_scripts_are_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(subtitle_utils, "_ass_cache", DiskCache(str(tmp_path / "ass.sqlite")))
+    compiled = []
+    monkeypatch.setattr(subtitle_utils, "generate_ass",
+                        lambda chunks, **kw: compiled.append(kw) or generate_ass(chunks, **kw))
+    chunks = [{"timestamp": (0.0, 2.0), "text": "Hello there"}]
+
+    first = compile_ass(chunks, fontsize=20, video_size=(1920, 1080))
+    again = compile_ass([{"timestamp": [0, 2], "text": "Hello there"}],   # as loaded from JSON
+                        video_size=(1920, 1080), fontsize=20)
+    assert first == again and len(compiled) == 1
+
+    compile_ass(chunks, fontsize=24, video_size=(1920, 1080))
+    assert len(compiled) == 2
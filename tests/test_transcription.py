@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+from utils import transcription
+from utils.transcription import (
+    MODEL_NAME, _merge_repeat, _stitch_windows, choose_model_tier, resolve_model_tier,
+)
+
+
+def _chunk(start, end, text):
+    return {"timestamp": (start, end), "text": text}
+
+
+def test_repeated_speech_across_a_seam_is_merged():
+    previous = _chunk(55.0, 61.0, "and that is why we")
+    chunk    = _chunk(58.0, 63.0, "that is why we built it")
+
+    assert _merge_repeat(previous, chunk) == _chunk(55.0, 63.0, "and that is why we built it")
+
+
+def test_distinct_or_disjoint_chunks_are_not_merged():
+    assert _merge_repeat(_chunk(0.0, 2.0, "hello"), _chunk(2.0, 3.0, "hello")) is None
+    assert _merge_repeat(_chunk(0.0, 2.0, "hello world"), _chunk(1.0, 3.0, "goodbye moon")) is None
+
+
+def test_windows_hand_over_at_the_boundary():
+    windows = [
+        [_chunk(0.0, 20.0, "first"), _chunk(54.0, 58.0, "we built the thing"),
+         _chunk(59.0, 60.0, "cut o")],                     # past the boundary: dropped
+        [_chunk(55.0, 56.5, "built"),                      # before the boundary: dropped
+         _chunk(56.0, 60.0, "the thing works"), _chunk(70.0, 75.0, "second")],
+    ]
+    stitched = _stitch_windows(windows, boundaries=[57.5])
+
+    assert stitched == [
+        _chunk(0.0, 20.0, "first"),
+        _chunk(54.0, 60.0, "we built the thing works"),   # seam duplicate folded
+        _chunk(70.0, 75.0, "second"),
+    ]
+
+
+def test_single_window_passes_through():
+    chunks = [_chunk(0.0, 1.0, "a"), _chunk(1.0, 2.0, "b")]
+    assert _stitch_windows([chunks], []) == chunks
+
+
+@pytest.mark.parametrize("duration, depth, tier", [
+    (60, 0, "medium"),      # 60 s × 1.1 fits in 120 s
+    (300, 0, "small"),
+    (300, 2, "base"),       # three jobs share the CPU
+    (1200, 0, "tiny"),
+    (36000, 0, "tiny"),     # nothing fits: fastest tier
+])
+def test_choose_model_tier(duration, depth, tier):
+    assert choose_model_tier(duration, queue_depth=depth) == tier
+
+
+def test_resolve_model_tier():
+    assert resolve_model_tier(None, 60) == MODEL_NAME
+    assert resolve_model_tier("", 60) == MODEL_NAME
+    assert resolve_model_tier("tiny", 60) == "tiny"
+    assert resolve_model_tier("auto", 60) == "medium"
+    with pytest.raises(ValueError):
+        resolve_model_tier("large", 60)
+
+
+class _Server:
+    def __init__(self, quantized):
+        self.quantized = quantized
+
+    def stats(self):
+        return {"quantized": self.quantized}
+
+    def transcribe(self, audio, model_name, **options):
+        return {"text": "", "segments": [], "variant": transcription.model_variant(
+            model_name, self.quantized)}
+
+
+@pytest.fixture
+def server_env(monkeypatch):
+    monkeypatch.setenv("SUBLYZE_MODEL_SERVER", "127.0.0.1:1")
+    monkeypatch.setattr(transcription, "QUANTIZE", False)
+    monkeypatch.setattr(transcription, "_server_quantized", None)
+    monkeypatch.setattr(transcription, "connect_model_server",
+                        lambda *a, **k: pytest.fail("a lookup must not connect"))
+
+
+def test_variant_lookup_never_connects(server_env, monkeypatch):
+    monkeypatch.setattr(transcription, "connected_model_server", lambda: None)
+    assert transcription.whisper_variant("small") == "small"      # local guess
+
+    monkeypatch.setattr(transcription, "connected_model_server", lambda: _Server(True))
+    assert transcription.whisper_variant("small") == "small-int8"
+    monkeypatch.setattr(transcription, "connected_model_server", lambda: _Server(False))
+    assert transcription.whisper_variant("small") == "small-int8"  # cached per process
+
+
+def test_server_results_teach_the_variant(server_env, monkeypatch):
+    monkeypatch.setattr(transcription, "_model_server", lambda: _Server(True))
+    monkeypatch.setattr(transcription, "connected_model_server", lambda: None)
+
+    assert transcription._run_whisper(None, "base")["variant"] == "base-int8"
+    assert transcription.whisper_variant("base") == "base-int8"
+
+
+class _InlinePool:
+    """ProcessPoolExecutor stand-in that runs tasks at submit time."""
+    created = []
+
+    def __init__(self, **kwargs):
+        from concurrent.futures import Future
+        self._future, self.kwargs, self.closed = Future, kwargs, False
+        _InlinePool.created.append(self)
+
+    def submit(self, fn, *args):
+        fut = self._future()
+        fut.set_result(fn(*args))
+        return fut
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.closed = True
+
+
+@pytest.fixture
+def inline_pool(monkeypatch):
+    _InlinePool.created = []
+    monkeypatch.setattr(transcription, "ProcessPoolExecutor", _InlinePool)
+    monkeypatch.setattr(transcription, "_parallel_pool", None)
+    monkeypatch.setattr(transcription, "_detect_window_language", lambda samples: "de")
+    monkeypatch.setattr(transcription, "_transcribe_window",
+                        lambda samples, offset_s, task="transcribe", language=None:
+                        [_chunk(offset_s + 30, offset_s + 31, f"hi {language}")])
+    return np.zeros(transcription.SAMPLE_RATE * 10, dtype="float32")
+
+
+def test_parallel_pool_is_kept_between_calls(inline_pool):
+    transcription.transcribe_parallel(inline_pool, workers=2, model_name="base")
+    transcription.transcribe_parallel(inline_pool, workers=2, model_name="base")
+    assert len(_InlinePool.created) == 1
+
+    transcription.transcribe_parallel(inline_pool, workers=2, model_name="tiny")
+    first, second = _InlinePool.created
+    assert first.closed and not second.closed
+    assert second.kwargs["initargs"][0] == "tiny"
+
+
+def test_parallel_windows_share_the_first_windows_language(inline_pool):
+    info = {}
+    audio = np.concatenate([inline_pool] * 14)              # 140 s: three windows
+    _, chunks = transcription.transcribe_parallel(audio, workers=2, info=info)
+
+    assert len(chunks) == 3 and {c["text"] for c in chunks} == {"hi de"}
+    assert info["language"] == "de"
@@ -0,0 +1,100 @@
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import translation
+from utils.cache import DiskCache
+
+
+class _StubTranslate(BaseHTTPRequestHandler):
+    """Stands in for the translate endpoint: "<tl>" + text, line by line.
+
+    server.merge_lines makes it answer a batch with one joined line, the way
+    the real endpoint sometimes merges short segments.
+    """
+
+    def do_POST(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        body  = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        text  = urllib.parse.parse_qs(body)["q"][0]
+        lang  = query["tl"][0]
+        self.server.requests.append(text)
+        lines = text.split("\n")
+        if self.server.merge_lines and len(lines) > 1:
+            lines = [" ".join(lines)]
+        parts = [[f"<{lang}>{line}" + ("\n" if i < len(lines) - 1 else ""), line]
+                 for i, line in enumerate(lines)]
+        payload = json.dumps([parts, None, "en"]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubTranslate)
+    server.requests, server.merge_lines = [], False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(translation, "_ENDPOINT", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(translation, "_cache", DiskCache(str(tmp_path / "translations.sqlite")))
+    monkeypatch.setattr(translation, "_bucket", translation._TokenBucket(1000.0, capacity=100))
+    yield server
+    server.shutdown()
+
+
+def _chunks(n):
+    return [{"timestamp": (float(i), i + 1.0), "text": f"line {i}"} for i in range(n)]
+
+
+def test_batches_map_back_to_timestamps(stub):
+    chunks = _chunks(40)
+    out = translation.translate_chunks(chunks, "es")
+
+    assert [c["timestamp"] for c in out] == [c["timestamp"] for c in chunks]
+    assert [c["text"] for c in out] == [f"<es>line {i}" for i in range(40)]
+    # 40 segments in batches of _BATCH_SIZE, not one request per segment
+    assert len(stub.requests) == -(-40 // translation._BATCH_SIZE)
+
+
+def test_cached_segments_skip_the_endpoint(stub):
+    translation.translate_chunks(_chunks(5), "fr")
+    stub.requests.clear()
+
+    out = translation.translate_chunks(_chunks(7), "fr")
+    assert [c["text"] for c in out] == [f"<fr>line {i}" for i in range(7)]
+    assert stub.requests == ["line 5\nline 6"]
+
+
+def test_merged_batch_falls_back_to_single_segments(stub):
+    stub.merge_lines = True
+    out = translation.translate_chunks(_chunks(3), "de")
+
+    assert [c["text"] for c in out] == ["<de>line 0", "<de>line 1", "<de>line 2"]
+    assert stub.requests == ["line 0\nline 1\nline 2", "line 0", "line 1", "line 2"]
+
+
+def test_failed_requests_keep_the_original_text(stub, monkeypatch):
+    monkeypatch.setattr(translation, "_ENDPOINT", "http://127.0.0.1:9/")   # nothing listens
+    out = translation.translate_chunks(_chunks(2), "es")
+    assert [c["text"] for c in out] == ["line 0", "line 1"]
+    assert translation.get_translation_cache().stats()["entries"] == 0
+
+
+def test_same_language_is_returned_untouched(stub):
+    out = translation.translate_chunks(_chunks(2), "zh-CN", source_lang="zh")
+    assert [c["text"] for c in out] == ["line 0", "line 1"]
+    assert stub.requests == []
+
+
+def test_make_batches_respects_the_character_budget(monkeypatch):
+    monkeypatch.setattr(translation, "_BATCH_MAX_CHARS", 25)
+    batches = translation._make_batches([(i, "x" * 10) for i in range(5)])
+    assert [[i for i, _ in b] for b in batches] == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,285 @@
+"""Per-session artifact index with a global disk quota and a TTL sweeper.
+
+Every file a session leaves in data/ (the stored upload, SRTs, burned or
+muxed videos, segment-burn work directories) is recorded in a small sqlite
+index together with its session, size and last access. Two policies keep
+disk usage bounded:
+
+* quota: when the tracked total exceeds the quota, whole sessions are
+  evicted least recently used first. Sessions touched in the last
+  protect_s seconds are left alone: an open browser tab touches its
+  session every SESSION_HEARTBEAT_S, and so does a worker running one of
+  its jobs, so only abandoned sessions are evicted;
+* TTL: a background sweeper releases sessions idle for longer than ttl_s,
+  and removes untracked leftovers older than ttl_s.
+
+Uploads in the content store can belong to several sessions; such a file is
+deleted only when no session references it any more.
+
+    python -m utils.artifacts --stats
+    python -m utils.artifacts --sweep
+"""
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.audio_utils import STORE_DIR, cleanup_session_files
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS_DB = os.environ.get("SUBLYZE_ARTIFACTS_DB", os.path.join("data", "artifacts.sqlite"))
+DISK_QUOTA_BYTES = int(float(os.environ.get("SUBLYZE_DISK_QUOTA_MB", "5000")) * 1024 * 1024)
+SESSION_TTL_S    = float(os.environ.get("SUBLYZE_SESSION_TTL_S", str(6 * 3600)))
+SESSION_HEARTBEAT_S = 60.0   # how often live sessions (open tabs, running jobs) call touch()
+# A session that missed this many heartbeats is treated as abandoned by the quota
+_PROTECT_S       = 5 * SESSION_HEARTBEAT_S
+
+_DATA_DIR = "data"
+# Names the app, jobs and burns write per session ("<prefix>_<sid>…"); only
+# these (and the content store) are ever swept when untracked.
+_SESSION_PREFIXES = ("burned_", "muxed_", "subs_", "subtitles_", "segments_")
+
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                with contextlib.suppress(OSError):
+                    total += os.path.getsize(os.path.join(root, name))
+        return total
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+class ArtifactStore:
+    """sqlite index of session files, enforcing a disk quota and a TTL.
+
+    Safe to share between the app and worker processes: every call opens
+    its own short-lived connection, as utils.jobs.JobQueue does.
+    """
+
+    def __init__(
+        self,
+        path: str         = ARTIFACTS_DB,
+        quota_bytes: int  = DISK_QUOTA_BYTES,
+        ttl_s: float      = SESSION_TTL_S,
+        protect_s: float  = _PROTECT_S,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path        = path
+        self.quota_bytes = quota_bytes
+        self.ttl_s       = ttl_s
+        self.protect_s   = protect_s
+        self._counters   = {"evicted_sessions": 0, "expired_sessions": 0,
+                            "freed_bytes": 0, "swept_untracked": 0}
+        self._counter_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " session TEXT NOT NULL, path TEXT NOT NULL, kind TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL,"
+                " PRIMARY KEY (session, path))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_path ON artifacts(path)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _count(self, **deltas):
+        with self._counter_lock:
+            for key, value in deltas.items():
+                self._counters[key] += value
+
+    # ── Recording ─────────────────────────────────────────────────────────────
+    def register(self, session_id: str, path: str, kind: str = "file"):
+        """Track path (a file or a directory) as belonging to session_id."""
+        if not session_id or not path or not os.path.exists(path):
+            return
+        path, now = os.path.abspath(path), time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO artifacts (session, path, kind, size, created, accessed)"
+                " VALUES (?,?,?,?,?,?) ON CONFLICT(session, path)"
+                " DO UPDATE SET size=excluded.size, accessed=excluded.accessed",
+                (session_id, path, kind, _path_size(path), now, now),
+            )
+        self.enforce_quota()
+
+    def collect(self, session_id: str, data_dir: str = _DATA_DIR):
+        """Register every "<prefix>_<sid>*" file or directory in data_dir.
+
+        Burns and subtitle writers name their outputs after the session, so
+        this picks up everything a job produced without each writer having
+        to report its own files.
+        """
+        for prefix in _SESSION_PREFIXES:
+            for path in glob.glob(os.path.join(data_dir, f"{prefix}{glob.escape(session_id)}*")):
+                self.register(session_id, path, prefix.rstrip("_"))
+
+    def touch(self, session_id: str):
+        """Mark a session as in use, moving it to the back of the eviction order.
+
+        Live sessions call this every SESSION_HEARTBEAT_S; protect_s must
+        stay well above that interval.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE artifacts SET accessed=? WHERE session=?",
+                         (time.time(), session_id))
+
+    # ── Releasing ─────────────────────────────────────────────────────────────
+    def release_session(self, session_id: str) -> int:
+        """Forget a session and delete its files not shared with others; returns bytes freed."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT path, size FROM artifacts WHERE session=?", (session_id,)
+            ).fetchall()
+            conn.execute("DELETE FROM artifacts WHERE session=?", (session_id,))
+            orphaned = [
+                (path, size) for path, size in rows
+                if conn.execute("SELECT 1 FROM artifacts WHERE path=? LIMIT 1",
+                                (path,)).fetchone() is None
+            ]
+            conn.execute("COMMIT")
+        cleanup_session_files(*(path for path, _ in orphaned))
+        freed = sum(size for _, size in orphaned)
+        self._count(freed_bytes=freed)
+        return freed
+
+    def _sessions_by_age(self) -> list:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT session, MAX(accessed) AS last FROM artifacts"
+                " GROUP BY session ORDER BY last ASC"
+            ).fetchall()
+
+    def usage_bytes(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM"
+                " (SELECT path, MAX(size) AS size FROM artifacts GROUP BY path)"
+            ).fetchone()[0]
+
+    def enforce_quota(self) -> int:
+        """Evict least-recently-used idle sessions until usage fits the quota."""
+        if self.quota_bytes is None or self.usage_bytes() <= self.quota_bytes:
+            return 0
+        evicted, cutoff = 0, time.time() - self.protect_s
+        for session_id, last in self._sessions_by_age():
+            if last >= cutoff or self.usage_bytes() <= self.quota_bytes:
+                break
+            self.release_session(session_id)
+            evicted += 1
+        self._count(evicted_sessions=evicted)
+        return evicted
+
+    def sweep(self, data_dir: str = _DATA_DIR, store_dir: str = STORE_DIR) -> int:
+        """Release sessions idle past the TTL, then remove untracked leftovers.
+
+        A leftover is a session-named file in data_dir, or an upload in the
+        content store, that no session tracks and that has not been modified
+        for ttl_s (e.g. files from before the index existed, or from a crash
+        between writing and registering).
+        """
+        cutoff  = time.time() - self.ttl_s
+        expired = [sid for sid, last in self._sessions_by_age() if last < cutoff]
+        for session_id in expired:
+            self.release_session(session_id)
+        self._count(expired_sessions=len(expired))
+
+        candidates = [p for prefix in _SESSION_PREFIXES
+                      for p in glob.glob(os.path.join(data_dir, f"{prefix}*"))]
+        candidates += glob.glob(os.path.join(store_dir, "*"))
+        with self._connect() as conn:
+            tracked = {row[0] for row in conn.execute("SELECT DISTINCT path FROM artifacts")}
+        stale = []
+        for path in candidates:
+            path = os.path.abspath(path)
+            with contextlib.suppress(OSError):
+                if path not in tracked and os.path.getmtime(path) < cutoff:
+                    stale.append(path)
+        cleanup_session_files(*stale)
+        self._count(swept_untracked=len(stale))
+        return len(expired)
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+    def metrics(self) -> dict:
+        with self._connect() as conn:
+            sessions, files = conn.execute(
+                "SELECT COUNT(DISTINCT session), COUNT(DISTINCT path) FROM artifacts"
+            ).fetchone()
+            by_kind = dict(conn.execute(
+                "SELECT kind, SUM(size) FROM"
+                " (SELECT path, kind, MAX(size) AS size FROM artifacts GROUP BY path)"
+                " GROUP BY kind"
+            ).fetchall())
+        used = self.usage_bytes()
+        with self._counter_lock:
+            counters = dict(self._counters)
+        return {
+            "sessions":    sessions,
+            "files":       files,
+            "bytes":       used,
+            "quota_bytes": self.quota_bytes,
+            "usage":       round(used / self.quota_bytes, 3) if self.quota_bytes else None,
+            "bytes_by_kind": by_kind,
+            **counters,
+        }
+
+    # ── Background sweeper ────────────────────────────────────────────────────
+    def start_sweeper(self, interval_s: float = 300.0) -> threading.Thread:
+        """Run sweep() and enforce_quota() every interval_s on a daemon thread."""
+        def _loop():
+            while True:
+                try:
+                    self.sweep()
+                    self.enforce_quota()
+                except (OSError, sqlite3.Error) as err:
+                    logger.warning("artifact sweep failed: %s", err)
+                time.sleep(interval_s)
+
+        thread = threading.Thread(target=_loop, daemon=True, name="sublyze-artifact-sweeper")
+        thread.start()
+        return thread
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide ArtifactStore on ARTIFACTS_DB."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArtifactStore()
+    return _store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clean Sublyze session artifacts.")
+    parser.add_argument("--db", default=ARTIFACTS_DB)
+    parser.add_argument("--sweep", action="store_true", help="run one TTL sweep and quota pass")
+    parser.add_argument("--stats", action="store_true", help="print usage metrics as JSON")
+    args = parser.parse_args()
+    store = ArtifactStore(args.db)
+    if args.sweep:
+        store.sweep()
+        store.enforce_quota()
+    print(json.dumps(store.metrics(), indent=2))
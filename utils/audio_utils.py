@@ -1,6 +1,32 @@
+import hashlib
 import os
+import shutil
+import subprocess
+import tempfile
 import uuid
 import ffmpeg
+import numpy as np
+
+SAMPLE_RATE = 16000                      # what Whisper expects
+_BYTES_PER_SAMPLE = 2                    # s16le
+
+# Content-addressed upload store: one file per distinct upload, named by hash
+STORE_DIR = os.environ.get("SUBLYZE_STORE_DIR", os.path.join("data", "store"))
+_COPY_BLOCK = 1 << 20                    # 1 MiB per read while streaming uploads
+
+
+def _upload_ext(uploaded_file) -> str:
+    return os.path.splitext(getattr(uploaded_file, "name", ""))[-1].lower() or ".mp4"
+
+
+def _stream_to(fileobj, dst, block_size: int = _COPY_BLOCK, hasher=None):
+    """Copy fileobj into the open file dst block by block, optionally hashing."""
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(block_size), b""):
+        if hasher is not None:
+            hasher.update(block)
+        dst.write(block)
 
 
 def save_uploaded_file(uploaded_file, save_dir="data"):
@@ -8,15 +34,61 @@ def save_uploaded_file(uploaded_file, save_dir="data"):
 
     The original code always forced a .mp4 extension, which caused subtle bugs
     when processing .mov files (the audio-path replace logic silently failed).
+    Streamlit already holds the upload in memory, and getbuffer() would be a
+    zero-copy view of it; the 1 MiB block copy is only shared with
+    ingest_upload, which hashes the same blocks as it writes them.
     """
     os.makedirs(save_dir, exist_ok=True)
-    original_ext = os.path.splitext(uploaded_file.name)[-1].lower() or ".mp4"
-    file_path = os.path.join(save_dir, f"{uuid.uuid4()}{original_ext}")
+    file_path = os.path.join(save_dir, f"{uuid.uuid4()}{_upload_ext(uploaded_file)}")
     with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        _stream_to(uploaded_file, f)
     return file_path
 
 
+def ingest_upload(uploaded_file, store_dir: str = STORE_DIR) -> tuple:
+    """Stream an upload into the shared content store; returns (path, sha256).
+
+    The bytes are read in fixed 1 MiB blocks, hashed and written to a temp
+    file in the store in the same pass, so the upload is never read a
+    second time just to fingerprint it. The temp file is then
+    renamed to <sha256><ext>. If that name already exists, the upload is a
+    duplicate: the temp file is dropped and every session shares the one
+    stored copy.
+
+    Stored files are immutable and may be shared between sessions. Hand the
+    path straight to FFmpeg, but never edit or delete it per session, and
+    register it with the session's ArtifactStore entry right away.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    ext    = _upload_ext(uploaded_file)
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            _stream_to(uploaded_file, f, hasher=hasher)
+        digest = hasher.hexdigest()
+        path   = os.path.join(store_dir, f"{digest}{ext}")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)   # fresh mtime: the sweeper skips it until it is registered
+        else:
+            os.replace(tmp_path, path)   # atomic: readers never see a partial file
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, digest
+
+
+def file_fingerprint(path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's bytes, read in 1 MiB blocks (constant memory)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
 def extract_audio(video_path, audio_path=None):
     """Extract mono 16 kHz PCM WAV audio from a video file using FFmpeg.
 
@@ -36,15 +108,142 @@ def extract_audio(video_path, audio_path=None):
     return audio_path
 
 
+def iter_audio_blocks(video_path, block_seconds: float = 30.0):
+    """Stream mono 16 kHz audio out of a video as float32 NumPy blocks.
+
+    FFmpeg decodes straight to s16le on stdout, so nothing touches the disk
+    and the caller can start working on the first block while the rest of
+    the file is still being decoded. Samples are scaled to [-1, 1), the same
+    normalisation whisper.load_audio applies. The final block may be short.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", video_path,
+        "-vn", "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    block_bytes = int(block_seconds * SAMPLE_RATE) * _BYTES_PER_SAMPLE
+    # stderr goes to a file, not a pipe: nobody reads it until stdout is
+    # done, and a full stderr pipe would stall FFmpeg (and us) for good
+    errors = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+    try:
+        while True:
+            raw = proc.stdout.read(block_bytes)
+            if not raw:
+                break
+            raw = raw[: len(raw) - len(raw) % _BYTES_PER_SAMPLE]
+            yield np.frombuffer(raw, np.int16).astype(np.float32) / 32768.0
+        if proc.wait() != 0:
+            errors.seek(0)
+            stderr = errors.read().decode("utf-8", "replace")
+            raise RuntimeError(
+                f"FFmpeg audio decode failed (exit {proc.returncode}).\n\n{stderr[-2000:]}"
+            )
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        errors.close()
+
+
+def load_audio_array(video_path) -> np.ndarray:
+    """Decode a video's whole audio track into one float32 array (no WAV on disk)."""
+    blocks = list(iter_audio_blocks(video_path))
+    return np.concatenate(blocks) if blocks else np.zeros(0, np.float32)
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    frame_ms: int        = 30,
+    min_silence_s: float = 0.6,
+    min_speech_s: float  = 0.25,
+    max_piece_s: float   = 60.0,
+    pad_s: float         = 0.2,
+) -> list:
+    """Energy-based VAD: return (start, end) sample ranges that contain speech.
+
+    Frame energy is measured in dBFS and compared against a threshold set
+    between the clip's noise floor (10th percentile) and its loud level
+    (90th percentile), so it adapts to quiet and loud recordings alike.
+    Gaps shorter than min_silence_s are bridged, ranges are padded by pad_s,
+    and anything longer than max_piece_s is split at its quietest frame.
+    """
+    frame = max(1, SAMPLE_RATE * frame_ms // 1000)
+    n     = len(audio) // frame
+    if n == 0:
+        return []
+    rms = np.sqrt((audio[: n * frame].reshape(n, frame) ** 2).mean(axis=1) + 1e-12)
+    db  = 20 * np.log10(rms)
+    floor, loud = np.percentile(db, 10), np.percentile(db, 90)
+    threshold   = max(-60.0, min(floor + 10.0, loud - 15.0))
+    speech      = db > threshold
+
+    # Runs of speech frames → [start_frame, end_frame)
+    edges  = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends   = np.flatnonzero(edges == -1)
+
+    gap_frames = int(min_silence_s * 1000 / frame_ms)
+    regions = []
+    for s, e in zip(starts, ends):
+        if regions and s - regions[-1][1] < gap_frames:
+            regions[-1][1] = e
+        else:
+            regions.append([s, e])
+
+    min_frames = int(min_speech_s * 1000 / frame_ms)
+    pad        = int(pad_s * SAMPLE_RATE)
+    max_frames = max(1, int(max_piece_s * 1000 / frame_ms))
+    pieces = []
+    for s, e in regions:
+        if e - s < min_frames:
+            continue
+        start = int(max(0, s * frame - pad))
+        while e - s > max_frames:
+            lo  = s + max_frames // 2
+            cut = lo + int(np.argmin(db[lo:s + max_frames]))
+            pieces.append((start, int(cut * frame)))   # no padding across a forced cut
+            s, start = cut, int(cut * frame)
+        pieces.append((start, int(min(len(audio), e * frame + pad))))
+    return pieces
+
+
+def pack_regions(regions: list, max_s: float = 29.0) -> list:
+    """Group consecutive speech regions into windows of at most max_s.
+
+    split_on_silence only bridges pauses shorter than min_silence_s, so
+    ordinary speech comes out as many short regions. Whisper pads every
+    call to a full 30 s window and loses the previous sentence as context,
+    so sending each region alone costs more and transcribes worse. Packing
+    keeps the short pauses inside one window; only the gaps between
+    windows are skipped. A region longer than max_s stays a window of its
+    own.
+    """
+    limit   = int(max_s * SAMPLE_RATE)
+    windows = []
+    for start, end in regions:
+        if windows and end - windows[-1][0] <= limit:
+            windows[-1][1] = end
+        else:
+            windows.append([start, end])
+    return [(start, end) for start, end in windows]
+
+
 def cleanup_session_files(*paths):
     """Delete temporary per-session files (WAV audio, intermediate SRT).
 
-    Call after the burned video has been confirmed and served, to prevent
-    unbounded disk growth on the server.
+    Directories (e.g. segment-burn work dirs) are removed with their
+    contents. utils.artifacts calls this when a session is evicted or
+    expires, to prevent unbounded disk growth on the server.
     """
     for path in paths:
         if path and os.path.exists(path):
             try:
-                os.remove(path)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
             except OSError:
                 pass
\ No newline at end of file
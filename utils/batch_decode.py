@@ -0,0 +1,286 @@
+"""Cross-request batched Whisper decoding.
+
+model.transcribe encodes one 30 s window at a time, so N users uploading
+short clips at once cost N sequential batch-of-one encoder passes. A
+BatchingTranscriber sits in front of one model instead: callers cut their
+audio into ≤30 s windows and turn each into a log-mel spectrogram on their
+own thread, then queue it. A single decode thread waits a few milliseconds
+for windows from other callers, stacks up to max_batch of them, and runs the
+encoder and decoder once on the whole batch with whisper.decode. Results go
+back to each caller through a Future and are parsed into timestamped
+segments, so the return value has the same shape as model.transcribe.
+
+Batched windows are decoded independently: there is no initial_prompt and
+no conditioning on the previous window's text. Callers that rely on either
+must use model.transcribe; batchable() tells the two apart. A window whose
+decode stops partway is re-decoded from its last complete segment, the same
+seek model.transcribe makes (see _split_unfinished).
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.audio_utils import SAMPLE_RATE, pack_regions, split_on_silence
+
+_WINDOW_S = 29.0   # pieces stay under Whisper's 30 s input, leaving room for padding
+_TIME_PRECISION = 0.02   # seconds per timestamp token
+_FALLBACK_TEMPERATURES = (0.2, 0.4, 0.6, 0.8, 1.0)
+_STOP = object()
+
+
+def batchable(audio, options: dict) -> bool:
+    """Whether a transcribe call loses nothing by going through a batcher.
+
+    That holds when it has no initial_prompt and either opts out of
+    condition_on_previous_text or fits in one window, where there is no
+    previous text to condition on.
+    """
+    if options.get("initial_prompt"):
+        return False
+    if options.get("condition_on_previous_text", True) is False:
+        return True
+    return not isinstance(audio, str) and len(audio) <= int(_WINDOW_S * SAMPLE_RATE)
+
+
+# ── Token parsing ─────────────────────────────────────────────────────────────
+def _parse_segments(tokens, tokenizer, offset_s: float, length_s: float) -> list:
+    """Split a decoded window into segments at its timestamp tokens.
+
+    Whisper brackets each segment as <|t0|> text <|t1|>, and a new segment
+    reopens with the same timestamp as the one just closed. Text after the
+    last timestamp runs to the end of the window.
+    """
+    ts_begin = tokenizer.timestamp_begin
+    segments, start, text = [], None, []
+
+    def _close(end):
+        words = tokenizer.decode(text).strip()
+        if words:
+            segments.append({
+                "start": offset_s + min(start or 0.0, length_s),
+                "end":   offset_s + min(end, length_s),
+                "text":  words,
+            })
+
+    for tok in tokens:
+        if tok >= ts_begin:
+            t = (tok - ts_begin) * _TIME_PRECISION
+            if start is not None and text:
+                _close(t)
+                start, text = None, []
+            else:
+                start = t
+        else:
+            text.append(tok)
+    if text:
+        _close(length_s)
+    return segments
+
+
+def _split_unfinished(tokens, tokenizer, length_s: float) -> tuple:
+    """(finished tokens, resume_s) for one decoded window.
+
+    Output ending on a single timestamp (text <|t|>) covers the whole
+    window, and resume_s is None. Otherwise, if it contains a pair of
+    consecutive timestamps (<|t|><|t|>), the decoder stopped partway. The
+    segment after the last pair is unfinished and there may be speech after
+    it. model.transcribe drops that tail and seeks to the pair's timestamp;
+    this returns the tokens up to the pair and that timestamp, so the
+    caller can do the same. Output without such a pair is kept as it is.
+    """
+    ts_begin = tokenizer.timestamp_begin
+    is_ts = [tok >= ts_begin for tok in tokens]
+    if is_ts[-2:] == [False, True]:
+        return list(tokens), None
+    pairs = [i for i in range(len(tokens) - 1) if is_ts[i] and is_ts[i + 1]]
+    if not pairs:
+        return list(tokens), None
+    cut      = pairs[-1] + 1
+    resume_s = (tokens[pairs[-1]] - ts_begin) * _TIME_PRECISION
+    if not 0.0 < resume_s < length_s:
+        return list(tokens[:cut]), None
+    return list(tokens[:cut]), resume_s
+
+
+def _needs_fallback(result) -> bool:
+    # Same quality gates model.transcribe applies before retrying hotter.
+    return result.compression_ratio > 2.4 or result.avg_logprob < -1.0
+
+
+def _is_silence(result) -> bool:
+    return result.no_speech_prob > 0.6 and result.avg_logprob < -1.0
+
+
+# ── Service ───────────────────────────────────────────────────────────────────
+class BatchingTranscriber:
+    """Batch 30 s windows from concurrent transcribe calls on one model.
+
+    The decode thread takes the first waiting window, then keeps collecting
+    until it has max_batch windows or max_wait_ms has passed, so a lone
+    request only ever waits max_wait_ms extra. Windows are grouped by
+    (task, language) because whisper.decode takes one set of options per
+    batch; language=None batches freely and detects per window.
+
+    initial_prompt is not supported: a prompt is shared by the whole batch,
+    so per-request prompts would stop windows from different users batching.
+    Windows that fail Whisper's compression/log-prob checks are re-decoded
+    alone at rising temperatures, as model.transcribe does.
+    """
+
+    def __init__(self, model, max_batch: int = 8, max_wait_ms: float = 50.0):
+        import whisper
+
+        self.model       = model
+        self.max_batch   = max(1, int(max_batch))
+        self.max_wait_s  = max_wait_ms / 1000.0
+        self._whisper    = whisper
+        self._inbox      = queue.Queue()
+        self._closed     = False
+        self._stats      = {"windows": 0, "batches": 0}
+        self._stats_lock = threading.Lock()
+        self._thread     = threading.Thread(target=self._loop, daemon=True,
+                                            name="whisper-batch-decode")
+        self._thread.start()
+
+    # -- caller side --------------------------------------------------------
+    def _mel(self, samples: np.ndarray):
+        whisper = self._whisper
+        padded  = whisper.pad_or_trim(samples.astype(np.float32))
+        return whisper.log_mel_spectrogram(padded, self.model.dims.n_mels)
+
+    def submit(self, samples: np.ndarray, task: str = "transcribe", language: str = None) -> Future:
+        """Queue one ≤30 s window; the Future resolves to its DecodingResult."""
+        if self._closed:
+            raise RuntimeError("BatchingTranscriber is closed")
+        fut = Future()
+        self._inbox.put(((task, language), self._mel(samples), fut))
+        return fut
+
+    def transcribe(self, audio, language: str = None, task: str = "transcribe", **_ignored) -> dict:
+        """Drop-in for model.transcribe: {"text", "segments", "language"}.
+
+        The audio is cut at pauses (split_on_silence) and the speech is
+        packed into ≤29 s pieces (pack_regions). Every piece is submitted at
+        once, so a single long upload also fills a batch. A piece whose
+        decode stopped partway is resubmitted from its last complete segment
+        (_split_unfinished), and the rest of it joins a later batch. Options
+        other than language and task are ignored; route calls that need a
+        prompt or cross-window conditioning elsewhere (see batchable).
+        """
+        if isinstance(audio, str):
+            audio = self._whisper.load_audio(audio)
+        pieces  = pack_regions(split_on_silence(audio, max_piece_s=_WINDOW_S), _WINDOW_S)
+        pending = collections.deque(
+            (start, end, self.submit(audio[start:end], task, language)) for start, end in pieces
+        )
+
+        segments, detected = [], None
+        while pending:
+            start, end, fut = pending.popleft()
+            result = fut.result()
+            if _is_silence(result):
+                continue
+            detected  = detected or result.language
+            tokenizer = self._tokenizer(result.language, task)
+            length_s  = (end - start) / SAMPLE_RATE
+            tokens, resume_s = _split_unfinished(result.tokens, tokenizer, length_s)
+            if resume_s is not None:
+                rest = start + int(resume_s * SAMPLE_RATE)
+                pending.appendleft((rest, end, self.submit(audio[rest:end], task,
+                                                           language or result.language)))
+            segments += _parse_segments(tokens, tokenizer, start / SAMPLE_RATE, length_s)
+        for i, seg in enumerate(segments):
+            seg["id"] = i
+        return {
+            "text":     " ".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": detected or language,
+        }
+
+    def _tokenizer(self, language, task):
+        return self._whisper.tokenizer.get_tokenizer(
+            self.model.is_multilingual, num_languages=self.model.num_languages,
+            language=language, task=task,
+        )
+
+    # -- decode thread ------------------------------------------------------
+    def _collect(self) -> list:
+        """Block for one window, then gather more until full or the wait expires."""
+        first = self._inbox.get()
+        if first is _STOP:
+            return None
+        batch    = [first]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._inbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._inbox.put(_STOP)    # finish this batch, stop on the next loop
+                break
+            batch.append(item)
+        return batch
+
+    def _decode(self, key, mels):
+        import torch
+
+        task, language = key
+        options = self._whisper.DecodingOptions(
+            task=task, language=language, temperature=0.0, fp16=False,
+        )
+        with torch.no_grad():
+            results = self._whisper.decode(self.model, torch.stack(mels), options)
+            for i, result in enumerate(results):
+                if _is_silence(result) or not _needs_fallback(result):
+                    continue
+                for temperature in _FALLBACK_TEMPERATURES:
+                    retry = self._whisper.decode(
+                        self.model, mels[i],
+                        self._whisper.DecodingOptions(task=task, language=language,
+                                                      temperature=temperature, fp16=False),
+                    )
+                    results[i] = retry
+                    if not _needs_fallback(retry):
+                        break
+        return results
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            groups = {}
+            for key, mel, fut in batch:
+                groups.setdefault(key, []).append((mel, fut))
+            for key, items in groups.items():
+                try:
+                    results = self._decode(key, [mel for mel, _ in items])
+                except Exception as err:
+                    for _, fut in items:
+                        fut.set_exception(err)
+                    continue
+                for (_, fut), result in zip(items, results):
+                    fut.set_result(result)
+            with self._stats_lock:
+                self._stats["windows"] += len(batch)
+                self._stats["batches"] += 1
+
+    def close(self):
+        """Stop accepting windows; queued ones are still decoded first."""
+        self._closed = True
+        self._inbox.put(_STOP)
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            windows, batches = self._stats["windows"], self._stats["batches"]
+        return {"windows": windows, "batches": batches,
+                "mean_batch": round(windows / batches, 2) if batches else 0.0}
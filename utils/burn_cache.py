@@ -0,0 +1,134 @@
+"""Content-addressed cache of burned videos, shared by every session.
+
+Burning is the slowest step, and the same video is often burned again with
+the same captions and style (a refresh, a style change reverted, two users
+with one clip). burn_key() identifies an output by the source content, the
+exact ASS script and the encoder arguments, so such a burn is a file copy
+away instead of a full encode.
+
+The cache lives in data/cache/burns and has its own budget
+(SUBLYZE_BURN_CACHE_MB), separate from the per-session disk quota in
+utils.artifacts (SUBLYZE_DISK_QUOTA_MB). Its files belong to no session, so
+the session quota neither counts nor deletes them. Plan disk space for the
+sum of the two budgets. Because eviction here ignores sessions, a session
+may find the burn it was showing gone; callers re-burn in that case (see
+app.py).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from utils.cache import CACHE_DIR, content_key
+
+BURN_CACHE_DIR       = os.path.join(CACHE_DIR, "burns")
+BURN_CACHE_MAX_BYTES = int(float(os.environ.get("SUBLYZE_BURN_CACHE_MB", "2000")) * 1024 * 1024)
+
+
+def burn_key(video_hash: str, ass_text: str, encode_args: list) -> str:
+    """Cache key for one burned output: source content, exact ASS script (captions and look)."""
+    return content_key("burn", video_hash, ass_text, " ".join(encode_args))
+
+
+class BurnCache:
+    """Content-addressed store of burned videos with size-bounded LRU eviction.
+
+    Each output lives at <dir>/<key>.mp4 and is never overwritten, so a path
+    handed to the UI stays valid until it is evicted. A sqlite index records
+    the sizes and access times of the files, in the same way as DiskCache.
+    After each put, the least recently used files are deleted until the
+    total fits within max_bytes. The newest entry is always kept, even when
+    it alone exceeds the budget.
+    """
+
+    def __init__(self, directory: str = BURN_CACHE_DIR, max_bytes: int = BURN_CACHE_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite"),
+                                     timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS burns ("
+                " key TEXT PRIMARY KEY, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+
+    def path_for(self, key: str) -> str:
+        return os.path.abspath(os.path.join(self.directory, f"{key}.mp4"))
+
+    def get(self, key: str):
+        """Path of the cached burn for key, or None. Refreshes its LRU position."""
+        path = self.path_for(key)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT 1 FROM burns WHERE key=?", (key,)).fetchone()
+            if row is not None and os.path.exists(path):
+                self._conn.execute("UPDATE burns SET accessed=? WHERE key=?", (time.time(), key))
+                self.hits += 1
+                return path
+            if row is not None:   # file removed behind our back
+                self._conn.execute("DELETE FROM burns WHERE key=?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key: str, produced_path: str) -> str:
+        """Move a finished burn into the cache and return its cached path."""
+        path = self.path_for(key)
+        os.replace(produced_path, path)   # same filesystem under data/: atomic rename
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO burns (key, size, accessed) VALUES (?,?,?)",
+                (key, os.path.getsize(path), time.time()),
+            )
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM burns").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM burns WHERE key != ? ORDER BY accessed ASC", (keep,)
+        ):
+            if total <= self.max_bytes:
+                break
+            doomed.append(key)
+            total -= size
+        self._conn.executemany("DELETE FROM burns WHERE key=?", [(k,) for k in doomed])
+        for key in doomed:
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM burns"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "hit_rate":  (self.hits / lookups) if lookups else 0.0,
+            "entries":   entries,
+            "bytes":     size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_burn_cache = None
+_burn_cache_lock = threading.Lock()
+
+
+def get_burn_cache() -> BurnCache:
+    """Process-wide BurnCache (one per worker process; they share the index)."""
+    global _burn_cache
+    with _burn_cache_lock:
+        if _burn_cache is None:
+            _burn_cache = BurnCache()
+    return _burn_cache
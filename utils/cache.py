@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_DIR = os.environ.get("SUBLYZE_CACHE_DIR", os.path.join("data", "cache"))
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def content_key(*parts) -> str:
+    """Stable SHA-256 hex digest of the given parts (joined with NUL)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class DiskCache:
+    """Small sqlite-backed key/value store with LRU eviction.
+
+    Values are stored as JSON. Every read refreshes the entry's access time,
+    and after each write the least-recently-used entries are dropped until
+    the table fits inside both max_entries and max_bytes. The database runs
+    in WAL mode, so several Streamlit sessions (or processes) can share it.
+    """
+
+    def __init__(self, path: str, max_entries: int = None, max_bytes: int = None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path        = path
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.hits        = 0
+        self.misses      = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)")
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys) -> dict:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock, self._conn:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                marks = ",".join("?" * len(batch))
+                rows  = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({marks})", batch
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET accessed=? WHERE key=?", [(now, k) for k in found]
+                )
+            self.hits   += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+    def set(self, key: str, value):
+        self.set_many({key: value})
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+        now  = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = json.dumps(value, ensure_ascii=False)
+            rows.append((key, blob, len(blob.encode("utf-8")), now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?,?,?,?)",
+                rows,
+            )
+            self._evict()
+
+    def _evict(self):
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                freed = 0
+                doomed = []
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed ASC"
+                ):
+                    if total - freed <= self.max_bytes:
+                        break
+                    doomed.append((key,))
+                    freed += size
+                self._conn.executemany("DELETE FROM entries WHERE key=?", doomed)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries":  entries,
+            "bytes":    size,
+        }
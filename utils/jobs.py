@@ -0,0 +1,442 @@
+import argparse
+import atexit
+import contextlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = os.environ.get("SUBLYZE_JOBS_DB", os.path.join("data", "jobs.sqlite"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+LEASE_S          = float(os.environ.get("SUBLYZE_JOB_LEASE_S", "60"))  # heartbeat deadline
+MAX_ATTEMPTS     = 3       # claims per job before a crashing job is failed for good
+_SUPERVISE_S     = 5.0     # how often dead workers are restarted and leases checked
+
+
+# ── Queue ─────────────────────────────────────────────────────────────────────
+class JobQueue:
+    """Durable job table in sqlite, shared by the UI and the worker processes.
+
+    A job is a kind (see JOB_HANDLERS), JSON params, and — once a worker has
+    picked it up — a stage, a progress fraction, and finally a JSON result
+    or an error. Everything lives on disk, so a browser refresh or a
+    Streamlit restart never loses finished work and can re-attach to jobs
+    that are still running.
+
+    A running job holds a lease that its worker renews (heartbeat) every
+    few seconds. If the worker dies, the lease runs out and
+    requeue_expired() puts the job back in the queue. After MAX_ATTEMPTS
+    claims the job is failed instead, so a job that keeps killing its
+    worker cannot loop forever.
+    """
+
+    def __init__(self, path: str = JOBS_DB):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL,"
+                " stage TEXT, progress REAL NOT NULL DEFAULT 0,"
+                " params TEXT NOT NULL, result TEXT, error TEXT,"
+                " worker INTEGER, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease" not in columns:       # tables created before leases existed
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease REAL")
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads
+        # and processes; sqlite serialises the writers.
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created, updated) VALUES (?,?,?,?,?,?)",
+                (job_id, kind, QUEUED, json.dumps(params), now, now),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> dict:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim(self, worker: int) -> dict:
+        """Atomically move the oldest queued job to running, leased to worker."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status=? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status=?, worker=?, updated=?, lease=?,"
+                        " attempts=attempts+1 WHERE id=?",
+                        (RUNNING, worker, now, now + LEASE_S, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0]) if row is not None else None
+
+    def heartbeat(self, job_id: str, worker: int):
+        """Extend the lease of a job this worker is still running."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease=? WHERE id=? AND worker=? AND status=?",
+                (time.time() + LEASE_S, job_id, worker, RUNNING),
+            )
+
+    def report(self, job_id: str, stage: str, progress: float):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage=?, progress=?, updated=? WHERE id=?",
+                (stage, float(progress), time.time(), job_id),
+            )
+
+    def finish(self, job_id: str, result: dict, worker: int) -> bool:
+        """Record a result for a job worker still owns.
+
+        Returns False (and changes nothing) when the job's lease ran out and
+        it was requeued or handed to another worker in the meantime — that
+        worker's outcome wins.
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status=?, progress=1, result=?, updated=?"
+                " WHERE id=? AND worker=? AND status=?",
+                (DONE, json.dumps(result), time.time(), job_id, worker, RUNNING),
+            ).rowcount > 0
+
+    def fail(self, job_id: str, error: str, worker: int) -> bool:
+        """Record an error for a job worker still owns; see finish()."""
+        with self._connect() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status=?, error=?, updated=?"
+                " WHERE id=? AND worker=? AND status=?",
+                (FAILED, error, time.time(), job_id, worker, RUNNING),
+            ).rowcount > 0
+
+    def depth(self) -> int:
+        """Jobs waiting or running — the load signal for schedulers and the UI."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+
+    def requeue_expired(self, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Requeue running jobs whose lease ran out; fail those out of attempts.
+
+        Returns the number of jobs taken back from dead workers.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, attempts FROM jobs WHERE status=? AND COALESCE(lease, 0) < ?",
+                    (RUNNING, now),
+                ).fetchall()
+                for job_id, attempts in rows:
+                    if attempts >= max_attempts:
+                        conn.execute(
+                            "UPDATE jobs SET status=?, worker=NULL, error=?, updated=? WHERE id=?",
+                            (FAILED, f"The worker running this job stopped responding "
+                                     f"({attempts} attempts).", now, job_id),
+                        )
+                    else:
+                        conn.execute(
+                            "UPDATE jobs SET status=?, worker=NULL, lease=NULL, updated=? WHERE id=?",
+                            (QUEUED, now, job_id),
+                        )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+
+# ── Job handlers ──────────────────────────────────────────────────────────────
+def _run_pipeline(params: dict, report) -> dict:
+    """Upload → transcript → SRT → burn for one saved video.
+
+    params: video_path, fingerprint, session_id, text_case, output_mode,
+    transcribe_workers, model_tier (a Whisper size, default "small", or the
+    opt-in "auto"), queue_depth
+    (jobs ahead at submit time, for the auto policy), task ("transcribe",
+    or "translate" for one-pass English subtitles), encode_profile (see
+    subtitle_utils.ENCODE_PROFILES) and style (burn_subtitles_to_video
+    keyword arguments).
+    """
+    from utils.artifacts import get_artifact_store
+    from utils.audio_utils import load_audio_array
+    from utils.media_probe import probe_duration
+    from utils.subtitle_utils import generate_srt, merge_short_segments, save_srt
+    from utils.transcription import (
+        MODEL_NAME, find_cached_transcript, iter_transcribe_video, resolve_model_tier,
+        subtitle_language, transcribe_parallel,
+    )
+
+    video_path  = params["video_path"]
+    session_id  = params["session_id"]
+    fingerprint = params.get("fingerprint")
+    task        = params.get("task", "transcribe")
+    info        = {}
+    on_progress = lambda f: report("transcribe", f)
+    get_artifact_store().register(session_id, video_path, "upload")
+
+    report("extract", 0.0)
+    requested = params.get("model_tier", MODEL_NAME)
+    model, cached = find_cached_transcript(fingerprint, requested, task, info)
+    if cached is None:
+        model = resolve_model_tier(requested, probe_duration(video_path),
+                                   params.get("queue_depth", 0))
+    if cached is not None:
+        chunks = cached[1]
+    elif params.get("transcribe_workers", 1) > 1:
+        audio = load_audio_array(video_path)
+        _, chunks = transcribe_parallel(audio, workers=params["transcribe_workers"],
+                                        model_name=model, on_progress=on_progress,
+                                        fingerprint=fingerprint, task=task, info=info)
+    else:
+        chunks = list(iter_transcribe_video(video_path, on_progress=on_progress,
+                                            fingerprint=fingerprint, model_name=model,
+                                            task=task, info=info))
+    transcript = " ".join(c["text"] for c in chunks)
+    if not transcript.strip():
+        return {"transcript": "", "chunks": [], "model": model,
+                "language": None, "spoken_language": info.get("language")}
+
+    # Auto-merge very short segments for readable subtitles
+    chunks = merge_short_segments(chunks, min_duration=1.5, min_words=2)
+    report("subtitle", 0.0)
+    os.makedirs("data", exist_ok=True)
+    srt_text = generate_srt(chunks, text_case=params.get("text_case", "original"))
+    srt_path = save_srt(srt_text, os.path.join("data", f"subtitles_{session_id}.srt"))
+
+    result = {
+        "transcript":  transcript,
+        "chunks":      chunks,
+        "srt_path":    srt_path,
+        "srt_content": srt_text,
+        "model":       model,
+        "language":    subtitle_language(info, task),   # language of the subtitle text
+        "spoken_language": info.get("language"),
+        "burned_video_path": None,
+        "burn_error":  None,
+        "encode":      None,
+    }
+    report("burn", 0.0)
+    try:
+        burned = _run_burn({**params, "chunks": chunks}, report)
+        result["burned_video_path"], result["encode"] = burned["path"], burned["encode"]
+    except Exception as err:
+        result["burn_error"] = str(err)
+    return result
+
+
+def _run_burn(params: dict, report) -> dict:
+    """Burn (or soft-mux) params['chunks'] into params['video_path'].
+
+    Returns {"path", "encode"}: encode holds burn_subtitles_to_video's
+    stats (profile, frames, seconds, encode_fps), or None for a soft mux.
+    """
+    from utils.artifacts import get_artifact_store
+    from utils.subtitle_utils import burn_subtitles_to_video, mux_subtitles_to_video
+
+    report("burn", 0.0)
+    encode = None
+    try:
+        if params.get("output_mode") == "soft":
+            path = mux_subtitles_to_video(
+                params["video_path"], params["chunks"],
+                text_case=params.get("text_case", "original"),
+                session_id=params["session_id"],
+            )
+        else:
+            encode = {}
+            path = burn_subtitles_to_video(
+                params["video_path"], params["chunks"],
+                text_case=params.get("text_case", "original"),
+                session_id=params["session_id"],
+                incremental=True, workers=None,
+                profile=params.get("encode_profile", "balanced"), stats=encode,
+                **params.get("style", {}),
+            )
+    finally:
+        # Track whatever was written (SRT, outputs, segment work dir), even on failure
+        get_artifact_store().collect(params["session_id"])
+    return {"path": path, "encode": encode}
+
+
+def _run_languages(params: dict, report) -> dict:
+    """Translate params['chunks'] into several languages and export each one.
+
+    params: video_path, chunks, codes (translation language codes),
+    session_id, source_lang, text_case, output_mode, encode_profile and
+    style, as for _run_burn. Returns the fan_out_languages bundle keyed by
+    language code; progress is the mean over all languages.
+    """
+    from utils.artifacts import get_artifact_store
+    from utils.multilang import fan_out_languages
+
+    progress = dict.fromkeys(params["codes"], 0.0)
+
+    def _on_progress(code, stage, fraction):
+        progress[code] = fraction
+        report("languages", sum(progress.values()) / len(progress))
+
+    report("languages", 0.0)
+    try:
+        return fan_out_languages(
+            params["video_path"], params["chunks"], params["codes"],
+            style       = params.get("style", {}),
+            text_case   = params.get("text_case", "original"),
+            session_id  = params["session_id"],
+            on_progress = _on_progress,
+            source_lang = params.get("source_lang"),
+            profile     = params.get("encode_profile", "balanced"),
+            output_mode = params.get("output_mode", "burn"),
+        )
+    finally:
+        get_artifact_store().collect(params["session_id"])
+
+
+JOB_HANDLERS = {
+    "pipeline":  _run_pipeline,
+    "burn":      _run_burn,
+    "languages": _run_languages,
+}
+
+
+# ── Workers ───────────────────────────────────────────────────────────────────
+def worker_loop(db_path: str = JOBS_DB, poll_interval: float = 0.5):
+    """Claim and run jobs forever. Runs in its own process (see start_workers)."""
+    queue = JobQueue(db_path)
+    me = os.getpid()
+    while True:
+        job = queue.claim(me)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            queue.fail(job["id"], f"Unknown job kind {job['kind']!r}", me)
+            continue
+        done = threading.Event()
+        threading.Thread(target=_heartbeat,
+                         args=(queue, job["id"], me, done, job["params"].get("session_id")),
+                         daemon=True, name="sublyze-job-heartbeat").start()
+        try:
+            result = handler(job["params"], lambda stage, f, _id=job["id"]: queue.report(_id, stage, f))
+            queue.finish(job["id"], result, me)
+        except Exception as err:
+            queue.fail(job["id"], f"{err}\n\n{traceback.format_exc(limit=5)}", me)
+        finally:
+            done.set()
+
+
+def _heartbeat(queue: JobQueue, job_id: str, worker: int, done: threading.Event,
+               session_id: str = None):
+    """Renew a job's lease until done is set; stops by itself if the process dies.
+
+    Also keeps the job's session alive in the artifact index, so the disk
+    quota never evicts the files a running job is reading or writing.
+    """
+    from utils.artifacts import SESSION_HEARTBEAT_S, get_artifact_store
+
+    interval = min(LEASE_S / 4, SESSION_HEARTBEAT_S)
+    while not done.wait(interval):
+        try:
+            queue.heartbeat(job_id, worker)
+            if session_id:
+                get_artifact_store().touch(session_id)
+        except sqlite3.Error as err:    # a missed beat is retried; the lease has slack
+            logger.warning("job %s heartbeat failed: %s", job_id, err)
+
+
+def start_workers(n: int, db_path: str = JOBS_DB, supervise_s: float = _SUPERVISE_S) -> list:
+    """Start n supervised worker processes.
+
+    A supervisor thread checks every supervise_s seconds. It restarts any
+    worker process that has exited, and it requeues (or fails) jobs whose
+    lease has expired, which covers jobs left by workers of an earlier run.
+
+    Workers are non-daemonic because burns and parallel transcription open
+    process pools of their own; they are terminated when this process exits.
+    The returned list always holds the current worker processes.
+    """
+    ctx   = multiprocessing.get_context("spawn")
+    queue = JobQueue(db_path)
+
+    def _spawn(i):
+        proc = ctx.Process(target=worker_loop, args=(db_path,), name=f"sublyze-worker-{i}")
+        proc.start()
+        return proc
+
+    procs    = [_spawn(i) for i in range(n)]
+    stopping = threading.Event()
+
+    def _supervise():
+        while not stopping.wait(supervise_s):
+            for i, proc in enumerate(procs):
+                if not proc.is_alive() and not stopping.is_set():
+                    logger.warning("%s exited with %s; restarting", proc.name, proc.exitcode)
+                    procs[i] = _spawn(i)
+            try:
+                queue.requeue_expired()
+            except sqlite3.Error as err:
+                logger.warning("job lease check failed: %s", err)
+
+    queue.requeue_expired()
+    threading.Thread(target=_supervise, daemon=True, name="sublyze-worker-supervisor").start()
+
+    def _stop():
+        stopping.set()
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+    atexit.register(_stop)
+    return procs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Sublyze pipeline workers.")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--db", default=JOBS_DB)
+    args = parser.parse_args()
+    start_workers(args.workers, args.db)
+    while True:              # the supervisor thread keeps the workers running
+        time.sleep(3600)
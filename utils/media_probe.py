@@ -0,0 +1,138 @@
+import functools
+import hashlib
+import json
+import os
+import subprocess
+
+
+def _file_signature(path: str) -> tuple:
+    """(absolute path, size, mtime) — changes whenever the file is replaced."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def _ffprobe(args: list, timeout: float = 60) -> str:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", *args],
+        capture_output=True, text=True, timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffprobe failed (exit {result.returncode}).\n\n{result.stderr[-2000:]}"
+        )
+    return result.stdout
+
+
+@functools.lru_cache(maxsize=256)
+def _content_hash(sig: tuple) -> str:
+    h = hashlib.sha256()
+    with open(sig[0], "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _duration(sig: tuple) -> float:
+    out = _ffprobe(["-show_entries", "format=duration", "-of", "json", sig[0]])
+    return float(json.loads(out).get("format", {}).get("duration") or 0.0)
+
+
+@functools.lru_cache(maxsize=64)
+def _keyframes(sig: tuple) -> tuple:
+    # Reading packet flags needs no decode, so this stays fast on long files.
+    out = _ffprobe(
+        ["-select_streams", "v:0", "-show_entries", "packet=pts_time,flags",
+         "-of", "csv=p=0", sig[0]],
+        timeout=120,
+    )
+    times = []
+    for line in out.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            times.append(float(pts))
+    return tuple(sorted(set(times)))
+
+
+def _rate(value: str):
+    """ffprobe "30000/1001" → 29.97; None for missing or "0/0"."""
+    num, _, den = (value or "").partition("/")
+    try:
+        rate = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return rate if rate > 0 else None
+
+
+@functools.lru_cache(maxsize=256)
+def _streams(sig: tuple) -> dict:
+    out = _ffprobe([
+        "-show_entries",
+        "stream=codec_type,codec_name,pix_fmt,width,height,r_frame_rate,avg_frame_rate,"
+        "sample_rate,channels:stream_tags=rotate:stream_side_data=rotation",
+        "-of", "json", sig[0],
+    ])
+    info = {"video": None, "audio": None}
+    for stream in json.loads(out).get("streams", []):
+        kind = stream.get("codec_type")
+        if kind not in info or info[kind] is not None:
+            continue      # first video and first audio stream only
+        if kind == "audio":
+            info["audio"] = {
+                "codec":       stream.get("codec_name"),
+                "sample_rate": int(stream.get("sample_rate") or 0),
+                "channels":    int(stream.get("channels") or 0),
+            }
+            continue
+        rotation = stream.get("tags", {}).get("rotate")
+        for side in stream.get("side_data_list", []):
+            rotation = side.get("rotation", rotation)
+        width, height = int(stream.get("width") or 0), int(stream.get("height") or 0)
+        if int(float(rotation or 0)) % 180:
+            width, height = height, width     # players show rotated video on its side
+        info["video"] = {
+            "codec":      stream.get("codec_name"),
+            "pix_fmt":    stream.get("pix_fmt"),
+            "width":      width,
+            "height":     height,
+            "frame_rate": stream.get("r_frame_rate"),
+            "fps":        _rate(stream.get("avg_frame_rate")) or _rate(stream.get("r_frame_rate")),
+            # r_frame_rate is the timebase-derived rate; it matches the average only for CFR
+            "constant_fps": (_rate(stream.get("r_frame_rate")) is not None and
+                             stream.get("r_frame_rate") == stream.get("avg_frame_rate")),
+        }
+    return info
+
+
+def probe_streams(path: str) -> dict:
+    """First video and audio stream of a file, cached per file version.
+
+    Returns {"video": {...} or None, "audio": {...} or None}. video holds
+    codec, pix_fmt, width and height (as displayed, i.e. swapped for
+    90°-rotated phone footage), frame_rate (ffprobe's "num/den" string),
+    fps and constant_fps; audio holds codec, sample_rate and channels.
+    """
+    info = _streams(_file_signature(path))
+    return {kind: dict(stream) if stream else None for kind, stream in info.items()}
+
+
+def probe_duration(path: str) -> float:
+    """Container duration in seconds (0.0 if unknown). Cached per file version."""
+    return _duration(_file_signature(path))
+
+
+def probe_keyframes(path: str) -> list:
+    """Sorted presentation times (seconds) of the video keyframes."""
+    return list(_keyframes(_file_signature(path)))
+
+
+def probe_content_hash(path: str) -> str:
+    """SHA-256 of the file's bytes, computed once per file version.
+
+    Uploads in the content store (audio_utils.ingest_upload) are already
+    named by this hash, so for them it is read off the file name.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return stem
+    return _content_hash(_file_signature(path))
@@ -0,0 +1,327 @@
+"""Warm pool of Whisper models, served to other processes over local IPC.
+
+    python -m utils.model_server --preload small base --budget-mb 4000
+
+Models are loaded eagerly at startup, so no user ever waits for a load or a
+download. Set SUBLYZE_MODEL_SERVER=host:port in the app and workers and
+utils.transcription sends its transcribe calls here instead of loading a
+model in every process.
+
+The manager protocol is pickle-based, so only holders of the server's
+authkey may talk to it. Each server start generates a random key, unless
+SUBLYZE_MODEL_SERVER_KEY is already set. The key is exported in that
+variable, which child processes such as the job workers inherit. It is
+also written to KEY_FILE (mode 0600) for clients started separately.
+"""
+import argparse
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50507)
+KEY_ENV  = "SUBLYZE_MODEL_SERVER_KEY"
+KEY_FILE = os.environ.get("SUBLYZE_MODEL_SERVER_KEY_FILE", os.path.join("data", "model_server.key"))
+_RETRY_S = 30.0     # after a failed connect, run in-process this long before trying again
+
+# Approximate resident size of each fp32 model on CPU, used for budgeting
+# before a model is loaded (weights plus working buffers).
+_MODEL_MB = {
+    "tiny": 200, "base": 350, "small": 1100,
+    "medium": 3200, "large": 6500, "turbo": 3500,
+}
+
+
+def parse_address(value: str) -> tuple:
+    host, _, port = (value or "").rpartition(":")
+    return (host or DEFAULT_ADDRESS[0], int(port or DEFAULT_ADDRESS[1]))
+
+
+# ── Pool ──────────────────────────────────────────────────────────────────────
+class ModelPool:
+    """Resident Whisper models within a memory budget, evicting the least recently used.
+
+    Each model has its own lock: whisper installs decoding hooks on the
+    model's modules for the length of a transcribe call, so two calls must
+    not share one model at the same time. Different models run concurrently.
+
+    _pool_lock only guards the bookkeeping dicts. Loads and the wait for
+    an evicted model's in-flight calls happen outside it, so a slow load
+    never holds up callers of models that are already resident. A load in
+    progress is marked by an Event in _loading; other callers for the same
+    model wait on it instead of loading a second copy.
+
+    With batch_size > 1, batchable calls do not take turns on the lock.
+    These are calls without a prompt or cross-window conditioning (see
+    batch_decode.batchable). They go through a BatchingTranscriber per
+    model, which stacks 30 s windows from concurrent callers into one
+    encoder/decoder pass. All other calls still use model.transcribe.
+    """
+
+    def __init__(self, budget_mb: int = 4000, quantized: bool = False,
+                 batch_size: int = 0, batch_wait_ms: float = 50.0):
+        self.budget_mb = budget_mb
+        self.quantized = quantized
+        self.batch_size    = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self._models   = {}        # name → model
+        self._locks    = {}        # name → Lock guarding transcribe calls
+        self._batchers = {}        # name → BatchingTranscriber (batch_size > 1)
+        self._used     = {}        # name → last use (monotonic)
+        self._loading  = {}        # name → Event, set when its load ends
+        self._pool_lock = threading.Lock()
+
+    def _size_mb(self, name: str) -> int:
+        """Resident size of a loaded model (int8 Linear weights: about half)."""
+        mb = _MODEL_MB.get(name, 1500)
+        return mb // 2 if self.quantized else mb
+
+    def _load_mb(self, name: str) -> int:
+        """Room a load needs: an int8 model is quantized from full fp32 weights."""
+        return _MODEL_MB.get(name, 1500)
+
+    def _resident_mb(self) -> int:
+        return sum(self._size_mb(name) for name in self._models)
+
+    def _evict_for(self, name: str) -> list:
+        """Drop least recently used models until name fits; call under _pool_lock.
+
+        Other loads in flight count against the budget too. Returns the
+        victims' (lock, batcher) pairs, which the caller drains after
+        releasing _pool_lock.
+        """
+        need = sum(self._load_mb(n) for n in self._loading)
+        victims = []
+        while self._models and self._resident_mb() + need > self.budget_mb:
+            victim = min(self._used, key=self._used.get)
+            victims.append((self._locks.pop(victim), self._batchers.pop(victim, None)))
+            del self._models[victim], self._used[victim]
+        return victims
+
+    def get(self, name: str):
+        """Return (model, lock), loading the model — and evicting others — if needed."""
+        from utils.transcription import load_model
+
+        while True:
+            with self._pool_lock:
+                if name in self._models:
+                    self._used[name] = time.monotonic()
+                    return self._models[name], self._locks[name]
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = threading.Event()
+                    victims = self._evict_for(name)
+                    break
+            loading.wait()              # someone else is loading it; look again
+
+        try:
+            for lock, batcher in victims:
+                with lock:              # wait for in-flight calls
+                    if batcher is not None:
+                        batcher.close()     # decodes what is already queued
+            model, lock, batcher = load_model(name, self.quantized), threading.Lock(), None
+            if self.batch_size > 1:
+                from utils.batch_decode import BatchingTranscriber
+                batcher = BatchingTranscriber(model, self.batch_size, self.batch_wait_ms)
+            with self._pool_lock:
+                self._models[name], self._locks[name] = model, lock
+                if batcher is not None:
+                    self._batchers[name] = batcher
+                self._used[name] = time.monotonic()
+            return model, lock
+        finally:
+            with self._pool_lock:
+                del self._loading[name]
+            loading.set()
+
+    def preload(self, names):
+        for name in names:
+            self.get(name)
+
+    def transcribe(self, audio, model_name: str = "small", **options) -> dict:
+        """model.transcribe on a pooled model; returns Whisper's result dict.
+
+        result["variant"] names the weights that ran (transcription.model_variant),
+        so clients key their caches on this server's --quantize, not their own.
+        """
+        from utils.transcription import model_variant
+
+        result = self._transcribe(audio, model_name, **options)
+        result["variant"] = model_variant(model_name, self.quantized)
+        return result
+
+    def _transcribe(self, audio, model_name: str, **options) -> dict:
+        from utils.batch_decode import batchable
+
+        model, lock = self.get(model_name)
+        batcher = self._batchers.get(model_name)
+        if batcher is not None and batchable(audio, options):
+            try:
+                return batcher.transcribe(audio, **options)
+            except RuntimeError:
+                if model_name in self._batchers:
+                    raise
+                # Evicted between get() and submit: reload and go again.
+                self.get(model_name)
+                return self._batchers[model_name].transcribe(audio, **options)
+        options.setdefault("fp16", False)
+        with lock:
+            return model.transcribe(audio, **options)
+
+    def stats(self) -> dict:
+        """Snapshot for monitoring; never waits on _pool_lock, so never on a load.
+
+        Copying a dict is atomic under the GIL, so each field is consistent
+        on its own, though a load finishing mid-call may show in one field
+        and not yet in another.
+        """
+        loaded   = sorted(dict(self._models))
+        batchers = dict(self._batchers)
+        return {
+            "loaded":      loaded,
+            "loading":     sorted(dict(self._loading)),
+            "resident_mb": sum(self._size_mb(name) for name in loaded),
+            "budget_mb":   self.budget_mb,
+            "quantized":   self.quantized,
+            "batching":    {name: b.stats() for name, b in batchers.items()},
+        }
+
+
+# ── Authentication ────────────────────────────────────────────────────────────
+def new_authkey() -> str:
+    """Generate a random server key and publish it to KEY_ENV and KEY_FILE."""
+    key = os.urandom(32).hex()
+    os.environ[KEY_ENV] = key
+    os.makedirs(os.path.dirname(os.path.abspath(KEY_FILE)), exist_ok=True)
+    tmp = f"{KEY_FILE}.{os.getpid()}.tmp"
+    fd  = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    os.replace(tmp, KEY_FILE)
+    return key
+
+
+def _authkey() -> bytes:
+    """The key clients present: KEY_ENV, else KEY_FILE; None if neither exists."""
+    key = os.environ.get(KEY_ENV)
+    if not key:
+        try:
+            with open(KEY_FILE, encoding="utf-8") as f:
+                key = f.read().strip()
+        except OSError:
+            return None
+    return key.encode("utf-8") if key else None
+
+
+# ── IPC ───────────────────────────────────────────────────────────────────────
+class _ModelServerManager(BaseManager):
+    pass
+
+
+def _preload(pool: ModelPool, names, address):
+    pool.preload(names)
+    print(f"Model server on {address[0]}:{address[1]} · loaded {pool.stats()['loaded']}", flush=True)
+
+
+def serve(address=DEFAULT_ADDRESS, budget_mb: int = 4000, preload=("small",),
+          quantized: bool = False, batch_size: int = 0, batch_wait_ms: float = 50.0):
+    """Bind, load the preload models in the background, and serve until killed.
+
+    The socket is bound before any model loads, so clients that arrive
+    early connect at once. Their calls then wait on the pool lock for the
+    preload to finish, instead of giving up and loading a second copy of
+    the model in their own process. The manager serves every client
+    connection on its own thread, so with batch_size > 1 concurrent
+    requests meet in the same decode batches.
+    """
+    key  = os.environ.get(KEY_ENV) or new_authkey()
+    pool = ModelPool(budget_mb, quantized, batch_size, batch_wait_ms)
+    _ModelServerManager.register("pool", callable=lambda: pool)
+    manager = _ModelServerManager(address=address, authkey=key.encode("utf-8"))
+    server  = manager.get_server()          # binds the listening socket now
+    threading.Thread(target=_preload, args=(pool, tuple(preload), address),
+                     daemon=True, name="model-preload").start()
+    print(f"Model server listening on {address[0]}:{address[1]} · preloading {list(preload)}",
+          flush=True)
+    server.serve_forever()
+
+
+_client = None
+_client_lock = threading.Lock()
+_retry_at = 0.0
+
+
+def connect(address=None, timeout_s: float = 0.0):
+    """Proxy to the server's ModelPool, or None if no server is reachable.
+
+    With timeout_s > 0, keeps retrying until the server answers — useful
+    right after starting one, while it is still importing torch. After a
+    failed attempt, calls return None without retrying for _RETRY_S, so
+    callers fall back to in-process models without waiting on every call.
+    A wrong or missing key counts as unreachable.
+    """
+    global _client, _retry_at
+    with _client_lock:
+        if _client is not None:
+            return _client
+        if time.monotonic() < _retry_at:
+            return None
+        _ModelServerManager.register("pool")
+        deadline = time.monotonic() + timeout_s
+        while True:
+            key = _authkey()
+            try:
+                if key is None:
+                    raise ConnectionError("no model server key")
+                manager = _ModelServerManager(address=address or DEFAULT_ADDRESS, authkey=key)
+                manager.connect()
+                _client = manager.pool()
+                return _client
+            except (ConnectionError, OSError, EOFError, AuthenticationError):
+                if time.monotonic() >= deadline:
+                    _retry_at = time.monotonic() + _RETRY_S
+                    return None
+                time.sleep(0.5)
+
+
+def connected():
+    """The proxy connect() has opened, or None. Never connects and never waits."""
+    return _client
+
+
+def start_server_process(address=DEFAULT_ADDRESS, budget_mb: int = 4000, preload=("small",),
+                         quantized: bool = False, batch_size: int = 0, batch_wait_ms: float = 50.0):
+    """Spawn serve() in a child process (for starting alongside the app).
+
+    A fresh key is generated here, before the spawn, unless one is
+    configured. The server process and any worker started afterwards then
+    inherit it through the environment.
+    """
+    import multiprocessing
+
+    if not os.environ.get(KEY_ENV):
+        new_authkey()
+    proc = multiprocessing.get_context("spawn").Process(
+        target=serve,
+        args=(address, budget_mb, tuple(preload), quantized, batch_size, batch_wait_ms),
+        name="sublyze-model-server", daemon=True,
+    )
+    proc.start()
+    return proc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve warm Whisper models over local IPC.")
+    parser.add_argument("--address", default=f"{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}")
+    parser.add_argument("--budget-mb", type=int, default=4000)
+    parser.add_argument("--preload", nargs="*", default=["small"])
+    parser.add_argument("--quantize", action="store_true",
+                        help="serve int8 dynamically quantized models")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="batch 30 s windows across concurrent requests (0/1: off)")
+    parser.add_argument("--batch-wait-ms", type=float, default=50.0,
+                        help="how long a window waits for others to join its batch")
+    args = parser.parse_args()
+    serve(parse_address(args.address), args.budget_mb, args.preload, args.quantize,
+          args.batch_size, args.batch_wait_ms)
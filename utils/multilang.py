@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from utils.subtitle_utils import (
+    DEFAULT_PROFILE, burn_subtitles_to_video, generate_srt, mux_subtitles_to_video, save_srt,
+)
+from utils.translation import TRANSLATION_LANGUAGES, translate_chunks
+
+_LANGUAGE_NAMES = {code: name for name, code in TRANSLATION_LANGUAGES.items()}
+
+
+def _default_burn_workers(n_languages: int) -> int:
+    # libx264 already spreads one encode over a few cores; two to four
+    # concurrent burns saturate a typical box without thrashing it.
+    return max(1, min(n_languages, (os.cpu_count() or 2) // 2, 4))
+
+
+def fan_out_languages(
+    video_path: str,
+    original_chunks: list,
+    lang_codes: list,
+    style: dict         = None,
+    text_case: str      = "original",
+    session_id: str     = None,
+    burn: bool          = True,
+    max_burn_workers: int = None,
+    on_progress         = None,
+    source_lang: str    = None,
+    profile: str        = DEFAULT_PROFILE,
+    output_mode: str    = "burn",
+) -> dict:
+    """Translate one transcript into several languages and burn each result.
+
+    All languages are translated concurrently (they share the translation
+    module's rate limiter and cache). As soon as a language is translated its
+    SRT is written and its burn is queued on a bounded process pool, so the
+    first burns start while later languages are still translating.
+
+    Args:
+        style: keyword arguments forwarded to burn_subtitles_to_video
+            (fontsize, color, border_style, …). text_case is applied to both
+            the SRT and the burn.
+        on_progress: optional callback(code, stage, fraction) where stage is
+            one of "translating", "burning", "done" or "failed".
+        source_lang: language of original_chunks; a target equal to it is
+            not translated (translate_chunks returns the chunks as they are).
+        profile: encode profile for every burn (subtitle_utils.ENCODE_PROFILES).
+        output_mode: "burn" (hardcoded) or "soft": each language is muxed
+            as a subtitle track instead, a stream copy that needs no pool.
+
+    Returns:
+        dict keyed by language code. Each value has 'language', 'chunks',
+        'srt_path', 'srt_content', 'video_path' and 'error' (None on success).
+    """
+    unknown = [c for c in lang_codes if c not in _LANGUAGE_NAMES]
+    if unknown:
+        raise ValueError(f"Unsupported language code(s): {', '.join(unknown)}")
+    if output_mode not in ("burn", "soft"):
+        raise ValueError(f"Unsupported output mode {output_mode!r}; use 'burn' or 'soft'.")
+
+    session_id = session_id or uuid.uuid4().hex[:12]
+    style      = dict(style or {})
+    style["text_case"] = text_case
+    style["profile"]   = profile
+    codes      = list(dict.fromkeys(lang_codes))
+    report     = on_progress or (lambda code, stage, fraction: None)
+
+    os.makedirs("data", exist_ok=True)
+    bundle = {
+        code: {"language": _LANGUAGE_NAMES[code], "chunks": None, "srt_path": None,
+               "srt_content": None, "video_path": None, "error": None}
+        for code in codes
+    }
+    if not codes:
+        return bundle
+
+    for code in codes:
+        report(code, "translating", 0.0)
+
+    burn_pool = None
+    if burn and output_mode == "burn":
+        burn_pool = ProcessPoolExecutor(
+            max_workers=max_burn_workers or _default_burn_workers(len(codes)),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    burn_jobs = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(codes)) as translators:
+            pending = {
+                translators.submit(translate_chunks, original_chunks, code,
+                                   source_lang=source_lang): code
+                for code in codes
+            }
+            for fut in as_completed(pending):
+                code  = pending[fut]
+                entry = bundle[code]
+                try:
+                    chunks = fut.result()
+                except Exception as err:
+                    entry["error"] = f"Translation failed: {err}"
+                    report(code, "failed", 1.0)
+                    continue
+                srt_text = generate_srt(chunks, text_case=text_case)
+                entry["chunks"]      = chunks
+                entry["srt_content"] = srt_text
+                entry["srt_path"]    = save_srt(
+                    srt_text, os.path.join("data", f"subtitles_{session_id}_{code}.srt")
+                )
+                if not burn:
+                    report(code, "done", 1.0)
+                    continue
+                if burn_pool is None:
+                    # Soft subtitles: a stream copy takes seconds, mux right here
+                    try:
+                        entry["video_path"] = mux_subtitles_to_video(
+                            video_path, chunks, text_case=text_case,
+                            session_id=f"{session_id}_{code}",
+                        )
+                        report(code, "done", 1.0)
+                    except Exception as err:
+                        entry["error"] = f"Mux failed: {err}"
+                        report(code, "failed", 1.0)
+                    continue
+                report(code, "burning", 0.5)
+                burn_jobs[burn_pool.submit(
+                    burn_subtitles_to_video, video_path, chunks,
+                    session_id=f"{session_id}_{code}", **style,
+                )] = code
+
+        for fut in as_completed(burn_jobs):
+            code = burn_jobs[fut]
+            try:
+                bundle[code]["video_path"] = fut.result()
+                report(code, "done", 1.0)
+            except Exception as err:
+                bundle[code]["error"] = f"Burn failed: {err}"
+                report(code, "failed", 1.0)
+    finally:
+        if burn_pool is not None:
+            burn_pool.shutdown(wait=True)
+
+    return bundle
@@ -0,0 +1,270 @@
+import contextlib
+import glob
+import hashlib
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_STOP = object()
+
+
+# ── Scheduler ─────────────────────────────────────────────────────────────────
+class Stage:
+    """One step of a pipeline: fn(item) -> item, run by `workers` of `kind`.
+
+    kind is "thread" for I/O-bound work, or "process" for CPU-heavy work that
+    should sidestep the GIL. A process stage keeps its pool for the whole run,
+    so per-process state (e.g. a loaded Whisper model) is reused across items.
+    fn must be a module-level function for process stages.
+    """
+
+    def __init__(self, name: str, fn, kind: str = "thread", workers: int = 1):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Stage kind must be 'thread' or 'process', not {kind!r}")
+        self.name    = name
+        self.fn      = fn
+        self.kind    = kind
+        self.workers = max(1, int(workers))
+
+
+class PipelineScheduler:
+    """Run items through stages connected by bounded queues.
+
+    Every stage pulls from its own queue of at most queue_size items, so a
+    slow stage pushes back on the one before it instead of letting work pile
+    up in memory, while different items occupy different stages at the same
+    time. An item that raises is marked with item["error"] and skipped by
+    the remaining stages. After run(), utilization() reports how busy each
+    stage's workers were, which is the number to tune worker counts by.
+    """
+
+    def __init__(self, stages: list, queue_size: int = 2):
+        self.stages     = stages
+        self.queue_size = queue_size
+        self._busy      = {s.name: 0.0 for s in stages}
+        self._waiting   = {s.name: 0.0 for s in stages}
+        self._count     = {s.name: 0 for s in stages}
+        self._lock      = threading.Lock()
+        self._wall      = 0.0
+
+    def _worker(self, stage, inbox, outbox, pool):
+        while True:
+            t_wait = time.perf_counter()
+            item = inbox.get()
+            waited = time.perf_counter() - t_wait
+            if item is _STOP:
+                return
+            t_busy = time.perf_counter()
+            if not item.get("error"):
+                try:
+                    if pool is not None:
+                        item = pool.submit(stage.fn, item).result()
+                    else:
+                        item = stage.fn(item)
+                except Exception as err:
+                    item["error"] = f"{stage.name}: {type(err).__name__}: {err}"
+            busy = time.perf_counter() - t_busy
+            with self._lock:
+                self._busy[stage.name]    += busy
+                self._waiting[stage.name] += waited
+                self._count[stage.name]   += 1
+            outbox.put(item)
+
+    def run(self, items) -> list:
+        """Push every item through all stages; returns items in completion order."""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        queues.append(queue.Queue())  # results: unbounded, drained at the end
+        pools, groups = [], []
+        t_start = time.perf_counter()
+        try:
+            for i, stage in enumerate(self.stages):
+                pool = None
+                if stage.kind == "process":
+                    pool = ProcessPoolExecutor(
+                        max_workers=stage.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    pools.append(pool)
+                threads = [
+                    threading.Thread(target=self._worker, daemon=True,
+                                     args=(stage, queues[i], queues[i + 1], pool),
+                                     name=f"{stage.name}-{n}")
+                    for n in range(stage.workers)
+                ]
+                for t in threads:
+                    t.start()
+                groups.append(threads)
+
+            def _close_downstream():
+                # When every worker of a stage has stopped, stop the next stage.
+                for i, threads in enumerate(groups):
+                    for t in threads:
+                        t.join()
+                    if i + 1 < len(self.stages):
+                        for _ in range(self.stages[i + 1].workers):
+                            queues[i + 1].put(_STOP)
+            closer = threading.Thread(target=_close_downstream, daemon=True)
+            closer.start()
+
+            for item in items:
+                queues[0].put(item)   # blocks while the first stage is saturated
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_STOP)
+            closer.join()
+        finally:
+            for pool in pools:
+                pool.shutdown(wait=True)
+            self._wall = time.perf_counter() - t_start
+
+        results = []
+        while not queues[-1].empty():
+            results.append(queues[-1].get())
+        return results
+
+    def utilization(self) -> dict:
+        """Per stage: items, busy seconds, idle-wait seconds and busy share of capacity."""
+        report = {}
+        for stage in self.stages:
+            capacity = stage.workers * self._wall or 1.0
+            report[stage.name] = {
+                "kind":        stage.kind,
+                "workers":     stage.workers,
+                "items":       self._count[stage.name],
+                "busy_s":      round(self._busy[stage.name], 3),
+                "wait_s":      round(self._waiting[stage.name], 3),
+                "utilization": round(self._busy[stage.name] / capacity, 3),
+            }
+        return report
+
+
+# ── Subtitle pipeline stages ──────────────────────────────────────────────────
+# Items are plain dicts: input, out_dir, name (output path relative to
+# out_dir, without extension; defaults to the input's stem), options (style,
+# text_case, lang, soft, no_burn, chunk_workers, model, task, profile) plus
+# the fields each stage fills in.
+def _output_base(item: dict) -> str:
+    name = item.get("name") or os.path.splitext(os.path.basename(item["input"]))[0]
+    base = os.path.join(item["out_dir"], name)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    return base
+
+
+def extract_stage(item: dict) -> dict:
+    from utils.audio_utils import file_fingerprint, load_audio_array
+
+    t = time.perf_counter()
+    item["fingerprint"] = file_fingerprint(item["input"])
+    item["audio"]       = load_audio_array(item["input"])
+    item["timings"]["extract"] = time.perf_counter() - t
+    return item
+
+
+def transcribe_stage(item: dict) -> dict:
+    from utils.audio_utils import SAMPLE_RATE
+    from utils.subtitle_utils import generate_srt, merge_short_segments, save_srt
+    from utils.transcription import (
+        MODEL_NAME, find_cached_transcript, resolve_model_tier, subtitle_language,
+        transcribe_audio,
+    )
+    from utils.translation import translate_chunks
+
+    opts  = item["options"]
+    t     = time.perf_counter()
+    audio = item.pop("audio")
+    task  = opts.get("task", "transcribe")
+    info  = {}
+    item["model"], cached = find_cached_transcript(item["fingerprint"], opts.get("model", MODEL_NAME),
+                                                   task, info)
+    if cached is not None:
+        chunks = cached[1]
+    else:
+        item["model"] = resolve_model_tier(opts.get("model", MODEL_NAME), len(audio) / SAMPLE_RATE)
+        _, chunks = transcribe_audio(audio, fingerprint=item["fingerprint"],
+                                     model_name=item["model"], task=task, info=info)
+    item["language"] = subtitle_language(info, task)
+    chunks = merge_short_segments(chunks, min_duration=1.5, min_words=2)
+    item["timings"]["transcribe"] = time.perf_counter() - t
+
+    if opts.get("lang"):
+        t = time.perf_counter()
+        chunks = translate_chunks(chunks, opts["lang"], source_lang=item["language"])
+        item["timings"]["translate"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    item["srt"] = save_srt(generate_srt(chunks, text_case=opts["text_case"]),
+                           f"{_output_base(item)}.srt")
+    item["chunks"] = chunks
+    item["timings"]["subtitle"] = time.perf_counter() - t
+    return item
+
+
+def _link_or_copy(src: str, dst: str):
+    """Hard-link a burn-cache file to dst; copy only across filesystems.
+
+    The cache keeps its own link, so evicting the burn later leaves dst
+    intact, and the output costs no second copy of the video on disk.
+    """
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _drop_work_files(session_id: str):
+    """Remove a burn's scratch files from data/: the segment work dir and subs_*.
+
+    They only pay off when the same session re-burns, which a batch run
+    never does.
+    """
+    shutil.rmtree(os.path.join("data", f"segments_{session_id}"), ignore_errors=True)
+    for path in glob.glob(os.path.join("data", f"subs_{glob.escape(session_id)}.*")):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def burn_stage(item: dict) -> dict:
+    from utils.subtitle_utils import burn_subtitles_to_video, mux_subtitles_to_video
+
+    opts = item["options"]
+    if opts.get("no_burn"):
+        return item
+    t = time.perf_counter()
+    session_id = hashlib.sha1(os.path.abspath(item["input"]).encode()).hexdigest()[:12]
+    item["video"] = f"{_output_base(item)}_subtitled.mp4"
+    if opts.get("soft"):
+        produced = mux_subtitles_to_video(item["input"], item["chunks"],
+                                          text_case=opts["text_case"], session_id=session_id)
+        shutil.move(produced, item["video"])
+    else:
+        item["encode"] = {}
+        # Files already burn side by side (burn_workers), so each one is a
+        # single ffmpeg pass unless chunk_workers asks for chunked encodes
+        produced = burn_subtitles_to_video(
+            item["input"], item["chunks"], text_case=opts["text_case"],
+            session_id=session_id, workers=opts.get("chunk_workers") or 1,
+            profile=opts.get("profile", "balanced"), stats=item["encode"], **opts["style"],
+        )
+        _link_or_copy(produced, item["video"])
+    _drop_work_files(session_id)
+    item["timings"]["burn"] = time.perf_counter() - t
+    return item
+
+
+def build_subtitle_pipeline(
+    extract_workers: int    = 2,
+    transcribe_workers: int = 1,
+    burn_workers: int       = 2,
+    queue_size: int         = 2,
+) -> PipelineScheduler:
+    """extract (threads) → transcribe (process, model stays loaded) → burn (process pool)."""
+    return PipelineScheduler([
+        Stage("extract",    extract_stage,    "thread",  extract_workers),
+        Stage("transcribe", transcribe_stage, "process", transcribe_workers),
+        Stage("burn",       burn_stage,       "process", burn_workers),
+    ], queue_size=queue_size)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.media_probe import probe_duration, probe_keyframes
+from utils.subtitle_utils import (
+    DEFAULT_PROFILE,
+    _audio_encode_args, _encoded_frames, _run_ffmpeg, _source_video_args, _thread_args,
+    _video_encode_args, _video_filters, generate_ass, save_ass,
+)
+
+_SEGMENT_TARGET_S = 10.0   # preferred length of one GOP-aligned chunk
+_CHUNK_RETRIES    = 2      # extra attempts per chunk before the burn fails
+
+
+def default_workers() -> int:
+    """Concurrent chunk encodes: one per two cores, libx264 threads the rest."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def chunk_timeout(duration_s: float) -> float:
+    """Per-chunk FFmpeg timeout, scaled to the chunk's length."""
+    return 60 + duration_s * 10
+
+
+# ── Planning ──────────────────────────────────────────────────────────────────
+def plan_segments(video_path: str, target_s: float = _SEGMENT_TARGET_S) -> list:
+    """Split the video into (start, end) ranges that begin on source keyframes.
+
+    Boundaries are the first keyframe at least target_s after the previous
+    boundary, so every range can be seeked to and decoded independently.
+    Falls back to even target_s ranges if the file reports no keyframes.
+    """
+    duration = probe_duration(video_path)
+    if duration <= 0:
+        raise RuntimeError("Could not determine video duration.")
+
+    cuts = [0.0]
+    keyframes = [t for t in probe_keyframes(video_path) if 0.0 < t < duration]
+    if not keyframes:
+        keyframes = [i * target_s for i in range(1, int(duration // target_s) + 1)]
+    for t in keyframes:
+        if t - cuts[-1] >= target_s and duration - t >= target_s / 2:
+            cuts.append(t)
+
+    return [(start, end) for start, end in zip(cuts, cuts[1:] + [duration])]
+
+
+def _chunks_in_range(chunks: list, start: float, end: float) -> list:
+    """Subtitles overlapping [start, end), clipped and shifted to start at 0."""
+    shifted = []
+    for chunk in chunks:
+        s, e = chunk["timestamp"]
+        e = max(float(e), float(s) + 0.5)  # same minimum generate_ass enforces
+        if e <= start or s >= end:
+            continue
+        shifted.append({
+            "timestamp": (max(0.0, s - start), min(end, e) - start),
+            "text": chunk["text"],
+        })
+    return shifted
+
+
+# ── Encoding ──────────────────────────────────────────────────────────────────
+def _burn_range(video_path, start, end, ass_path, out_path, timeout,
+                threads=0, profile=DEFAULT_PROFILE) -> int:
+    """Re-encode one time range of the source with its subtitles burned in.
+
+    Audio is dropped here and muxed once over the stitched result, which
+    avoids AAC priming gaps at every chunk boundary. Ranges without any
+    subtitles (ass_path None) are still re-encoded so every chunk shares the
+    same codec parameters and the concat can stream-copy. Returns the
+    number of frames encoded.
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{start:.6f}",
+        "-i", video_path,
+        "-t", f"{end - start:.6f}",
+        "-an",
+        *_video_filters(profile, ass_path),
+        *_video_encode_args(profile),
+        *_source_video_args(video_path),
+        *_thread_args(profile, threads),
+        out_path,
+    ]
+    result = _run_ffmpeg(cmd, f"chunk burn ({start:.1f}s–{end:.1f}s)", timeout=timeout)
+    return _encoded_frames(result.stderr)
+
+
+def _burn_range_with_retry(video_path, start, end, ass_path, out_path, threads,
+                           profile=DEFAULT_PROFILE) -> int:
+    """Process-pool entry point: burn one range, retrying transient failures."""
+    last_err = None
+    for _ in range(1 + _CHUNK_RETRIES):
+        try:
+            return _burn_range(video_path, start, end, ass_path, out_path,
+                               timeout=chunk_timeout(end - start), threads=threads,
+                               profile=profile)
+        except (RuntimeError, subprocess.TimeoutExpired) as err:
+            last_err = err
+            if os.path.exists(out_path):
+                os.remove(out_path)
+    raise RuntimeError(
+        f"Chunk {start:.1f}s–{end:.1f}s failed after {1 + _CHUNK_RETRIES} attempts: {last_err}"
+    )
+
+
+def _concat(segment_paths: list, video_path: str, list_path: str, output_path: str, timeout,
+            profile=DEFAULT_PROFILE):
+    """Losslessly stitch the burned chunks and mux the source audio back in."""
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", video_path,
+        "-map", "0:v:0", "-map", "1:a?",
+        "-c:v", "copy",
+        *_audio_encode_args(profile, video_path),
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    _run_ffmpeg(cmd, "chunk concat", timeout=timeout)
+
+
+# ── Incremental burn ──────────────────────────────────────────────────────────
+def _source_id(video_path: str) -> list:
+    st = os.stat(video_path)
+    return [os.path.abspath(video_path), st.st_size, st.st_mtime_ns]
+
+
+def _load_manifest(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def burn_segmented(
+    video_path: str,
+    chunks: list,
+    style: dict,
+    text_case: str,
+    session_id: str,
+    output_path: str,
+    workers: int = None,
+    profile: str = DEFAULT_PROFILE,
+    stats: dict  = None,
+) -> str:
+    """Burn subtitles chunk by chunk, re-encoding only chunks whose captions changed.
+
+    The video is split into keyframe-aligned ranges (see plan_segments) and
+    each range is burned into its own file under data/segments_<sid>/. A
+    manifest records, per range, a hash of everything that affects its
+    pixels: the range itself, its ASS script (shifted captions plus the
+    style; `style` is generate_ass's keyword arguments) and the encoder
+    settings. On the next call for the same session and source, the
+    new hashes are diffed against the manifest and only mismatching ranges
+    are re-encoded before the concat demuxer stitches everything back
+    together. Fixing one typo therefore costs one ~10 s chunk plus a
+    stream-copy concat, instead of a full re-encode.
+
+    Chunks that do need encoding run on a process pool of `workers` FFmpeg
+    encodes (default: default_workers()), with the libx264 thread count
+    split between them, so a first burn keeps every core busy. Each chunk
+    has its own duration-scaled timeout and is retried before giving up.
+
+    The encode profile is part of every chunk hash, so switching profiles
+    re-encodes everything once. stats["frames"] receives the number of
+    frames actually encoded by this call (reused chunks count zero).
+    """
+    work_dir = os.path.abspath(os.path.join("data", f"segments_{session_id}"))
+    os.makedirs(work_dir, exist_ok=True)
+    manifest_path = os.path.join(work_dir, "manifest.json")
+    manifest      = _load_manifest(manifest_path)
+    source        = _source_id(video_path)
+
+    if manifest.get("source") == source and manifest.get("segments"):
+        ranges = [(seg["start"], seg["end"]) for seg in manifest["segments"]]
+        previous = {i: seg["sig"] for i, seg in enumerate(manifest["segments"])}
+    else:
+        ranges, previous = plan_segments(video_path), {}
+
+    plan = []
+    for i, (start, end) in enumerate(ranges):
+        in_range = _chunks_in_range(chunks, start, end)
+        ass_text = generate_ass(in_range, text_case=text_case, **style) if in_range else ""
+        sig = hashlib.sha256(json.dumps(
+            [start, end, ass_text,
+             _video_encode_args(profile), _video_filters(profile),
+             _source_video_args(video_path)]
+        ).encode("utf-8")).hexdigest()
+        out   = os.path.join(work_dir, f"seg_{i:04d}.mp4")
+        fresh = previous.get(i) == sig and os.path.exists(out)
+        plan.append((i, start, end, sig, ass_text, out, fresh))
+
+    if not all(p[-1] for p in plan):
+        # Chunk files are about to change; drop the manifest first so an
+        # interrupted run can never pair an old hash with a new file.
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        todo = []
+        for i, start, end, _, ass_text, out, fresh in plan:
+            if fresh:
+                continue
+            ass_path = None
+            if ass_text:
+                ass_path = save_ass(ass_text, os.path.join(work_dir, f"seg_{i:04d}.ass"))
+            todo.append((video_path, start, end, ass_path, out))
+
+        workers = max(1, min(workers or default_workers(), len(todo)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        frames  = 0
+        if workers == 1:
+            for args in todo:
+                frames += _burn_range_with_retry(*args, threads, profile)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                futures = [pool.submit(_burn_range_with_retry, *args, threads, profile)
+                           for args in todo]
+                for fut in futures:
+                    frames += fut.result()
+        if stats is not None:
+            stats["frames"] = frames
+
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": source,
+                "segments": [{"start": p[1], "end": p[2], "sig": p[3]} for p in plan],
+            }, f)
+
+    _concat(
+        [p[5] for p in plan],
+        video_path, os.path.join(work_dir, "concat.txt"), output_path,
+        timeout=max(120, probe_duration(video_path)), profile=profile,
+    )
+    return output_path
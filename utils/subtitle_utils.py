@@ -2,9 +2,18 @@ import os
 import re
 import srt
 import subprocess
+import tempfile
+import threading
+import time
+import unicodedata
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
+from utils.burn_cache import burn_key, get_burn_cache
+from utils.cache import CACHE_DIR, DiskCache, content_key
+from utils.media_probe import probe_content_hash, probe_duration, probe_streams
+
 
 # ── Preset style definitions ──────────────────────────────────────────────────
 PRESET_STYLES = {
@@ -143,6 +152,408 @@ def _hex_to_ass_back(hex_color: str, opacity: float) -> str:
     return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
 
 
+# ── Encode profiles ───────────────────────────────────────────────────────────
+# max_height: downscale after libass has rendered (None keeps the source size)
+# audio_copy: stream-copy the source audio when it is already AAC or MP3
+# pin_threads: fix libx264's thread count to the cores available instead of
+#              letting it pick; slices > 0 adds sliced threading, which keeps
+#              all threads busy on short chunks at a small quality cost
+ENCODE_PROFILES = {
+    "draft": {
+        "label": "Draft", "desc": "Fast preview — 480p, lower quality",
+        "preset": "ultrafast", "crf": 28, "max_height": 480,
+        "audio_copy": True, "audio_bitrate": "96k",
+        "pin_threads": True, "slices": 4,
+    },
+    "balanced": {
+        "label": "Balanced", "desc": "Full resolution, good quality",
+        "preset": "fast", "crf": 23, "max_height": None,
+        "audio_copy": True, "audio_bitrate": "128k",
+        "pin_threads": False, "slices": 0,
+    },
+    "archival": {
+        "label": "Archival", "desc": "Best quality, slowest encode",
+        "preset": "slow", "crf": 18, "max_height": None,
+        "audio_copy": True, "audio_bitrate": "192k",
+        "pin_threads": True, "slices": 0,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+
+def _profile(name: str) -> dict:
+    if name not in ENCODE_PROFILES:
+        raise ValueError(f"Unknown encode profile {name!r}; use one of {sorted(ENCODE_PROFILES)}.")
+    return ENCODE_PROFILES[name]
+
+
+def _video_encode_args(profile: str = DEFAULT_PROFILE) -> list:
+    p = _profile(profile)
+    args = ["-c:v", "libx264", "-preset", p["preset"], "-crf", str(p["crf"])]
+    if p["slices"]:
+        args += ["-x264-params", f"sliced-threads=1:slices={p['slices']}"]
+    return args
+
+
+# Audio codecs stream-copied into the .mp4 outputs. AC-3, E-AC-3 and ALAC
+# are valid in MP4 too, but browsers (the in-app player included) do not
+# play them, so they are re-encoded to AAC like everything else.
+_MP4_AUDIO_COPY = {"aac", "mp3"}
+# Pixel formats libx264 encodes natively; anything else (RGB, 4:1:1, …) goes
+# to yuv420p rather than whatever FFmpeg's format negotiation lands on.
+_X264_PIX_FMTS = {
+    "yuv420p", "yuvj420p", "yuv422p", "yuvj422p", "yuv444p", "yuvj444p",
+    "yuv420p10le", "yuv422p10le", "yuv444p10le", "nv12", "gray",
+}
+
+
+def _audio_encode_args(profile: str = DEFAULT_PROFILE, video_path: str = None) -> list:
+    """Copy mp4-compatible source audio when the profile allows it, else encode AAC."""
+    p = _profile(profile)
+    audio = probe_streams(video_path)["audio"] if video_path else None
+    if p["audio_copy"] and audio and audio["codec"] in _MP4_AUDIO_COPY:
+        return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", p["audio_bitrate"]]
+
+
+def _source_video_args(video_path: str) -> list:
+    """Keep the source's pixel format and (constant) frame rate in the encode.
+
+    Variable-frame-rate sources get no -r, which would resample their
+    timing onto a fixed grid.
+    """
+    video = probe_streams(video_path)["video"]
+    if not video:
+        return []
+    pix_fmt = video["pix_fmt"] if video["pix_fmt"] in _X264_PIX_FMTS else "yuv420p"
+    args = ["-pix_fmt", pix_fmt]
+    if video["constant_fps"]:
+        args += ["-r", video["frame_rate"]]
+    return args
+
+
+def _video_size(video_path: str) -> tuple:
+    """(width, height) as displayed, or (None, None) if the probe has none."""
+    video = probe_streams(video_path)["video"]
+    if not video or not video["width"] or not video["height"]:
+        return None, None
+    return video["width"], video["height"]
+
+
+def _thread_args(profile: str = DEFAULT_PROFILE, threads: int = 0) -> list:
+    """-threads for one encode: pinned profiles get the cores they were given."""
+    if threads or _profile(profile)["pin_threads"]:
+        return ["-threads", str(threads or os.cpu_count() or 1)]
+    return []
+
+
+def _video_filters(profile: str = DEFAULT_PROFILE, ass_path: str = None) -> list:
+    """-vf chain: subtitles first (sized against the source), then any downscale."""
+    filters = [_ass_filter(ass_path)] if ass_path else []
+    max_h = _profile(profile)["max_height"]
+    if max_h:
+        filters.append(f"scale=-2:'min({max_h},ih)'")
+    return ["-vf", ",".join(filters)] if filters else []
+
+
+_FRAME_RE = re.compile(r"frame=\s*(\d+)")
+
+
+def _encoded_frames(stderr: str) -> int:
+    """Frame count from FFmpeg's last progress line (0 if there is none)."""
+    found = _FRAME_RE.findall(stderr or "")
+    return int(found[-1]) if found else 0
+
+
+# ── ASS script generation ─────────────────────────────────────────────────────
+_ASS_CANVAS_H = 288       # sizes below are designed against libass's default 384×288 canvas
+_ASS_CANVAS_W = 384
+_ASS_STYLE_FORMAT = (
+    "Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+    "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, "
+    "Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding"
+)
+_ASS_ALIGNMENT = {"bottom": 2, "center": 5, "top": 8}
+
+
+def _ass_style_fields(
+    fontsize: int       = 18,
+    color: str          = "#FFFFFF",
+    bg_color: str       = "#000000",
+    bg_opacity: float   = 0.6,
+    border_style: str   = "box",
+    stroke_color: str   = "#000000",
+    stroke_width: int   = 0,
+    shadow: int         = 0,
+    position: str       = "bottom",
+    scale: float        = 1.0,
+) -> dict:
+    """The user-facing style settings as ASS style fields, in canvas pixels.
+
+    scale converts from the 288-line design canvas to the script's PlayResY.
+    The 0.55 factor maps the user-facing slider (default 18) to ~37px at 1080p.
+    """
+    primary  = _hex_to_ass_primary(color)
+    shadow_w = round(max(0, min(5, int(shadow))) * scale, 1)
+    fields = {
+        "Fontname":      "Arial",
+        "Fontsize":      max(6, round(fontsize * 0.55 * scale)),
+        "PrimaryColour": primary,
+        "OutlineColour": "&H00000000",
+        "BackColour":    "&H00000000",
+        "Bold":          -1,
+        "BorderStyle":   1,
+        "Outline":       0,
+        "Shadow":        shadow_w,
+        "Alignment":     _ASS_ALIGNMENT.get(position, 2),
+        "MarginLR":      round(10 * scale),
+        "MarginV":       round(10 * scale) if position in ("bottom", "top") else 0,
+    }
+    if border_style == "box":
+        # Renderers disagree on which colour fills a BorderStyle=3 box, so both get it.
+        back = _hex_to_ass_back(bg_color, bg_opacity)
+        fields.update(BorderStyle=3, OutlineColour=back, BackColour=back, Shadow=0)
+    elif border_style == "outline":
+        fields.update(OutlineColour=_hex_to_ass_primary(stroke_color),
+                      Outline=round(max(0, min(8, int(stroke_width))) * scale, 1))
+    return fields
+
+
+def _ass_style_line(name: str, f: dict) -> str:
+    values = [
+        name, f["Fontname"], f["Fontsize"], f["PrimaryColour"], f["PrimaryColour"],
+        f["OutlineColour"], f["BackColour"], f["Bold"], 0, 0, 0, 100, 100, 0, 0,
+        f["BorderStyle"], f"{f['Outline']:g}", f"{f['Shadow']:g}", f["Alignment"],
+        f["MarginLR"], f["MarginLR"], f["MarginV"], 1,
+    ]
+    return "Style: " + ",".join(str(v) for v in values)
+
+
+def _ass_time(seconds: float) -> str:
+    cs = max(0, round(seconds * 100))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+
+def _ass_escape(text: str) -> str:
+    # Braces open override blocks and backslashes start tags (\N, \h, …);
+    # captions are plain text, so neither may reach libass as-is.
+    return text.replace("\\", "\u2216").replace("{", "(").replace("}", ")")
+
+
+# Average advance of one character, in ems of the font size (bold Arial).
+_EM_NARROW, _EM_NARROW_UPPER, _EM_WIDE, _EM_SPACE = 0.55, 0.65, 1.0, 0.28
+
+
+def _is_wide(ch: str) -> bool:
+    """Full-width glyph (CJK ideographs, kana, Hangul, full-width forms)."""
+    return unicodedata.east_asian_width(ch) in ("W", "F")
+
+
+def _text_em(text: str, upper: bool = False) -> float:
+    narrow = _EM_NARROW_UPPER if upper else _EM_NARROW
+    return sum(_EM_SPACE if ch == " " else _EM_WIDE if _is_wide(ch) else narrow for ch in text)
+
+
+def _break_units(text: str) -> list:
+    """Split a caption into (joiner, unit) pairs that a line may break between.
+
+    Words break at spaces (joiner " "). Scripts written without spaces
+    (Chinese, Japanese) break between any two full-width characters
+    (joiner ""), except that punctuation stays on the line it closes.
+    """
+    units = []
+    for w, word in enumerate(text.split()):
+        joiner = " " if w else ""
+        run = ""
+        for ch in word:
+            if _is_wide(ch):
+                if run:
+                    units.append((joiner, run))
+                    joiner, run = "", ""
+                if unicodedata.category(ch).startswith("P") and units and joiner == "":
+                    units[-1] = (units[-1][0], units[-1][1] + ch)
+                else:
+                    units.append((joiner, ch))
+                joiner = ""
+            else:
+                run += ch
+        if run:
+            units.append((joiner, run))
+    return units
+
+
+def _wrap_ass_text(text: str, max_em: float, upper: bool = False) -> str:
+    """Break a caption into evenly long lines of at most ~max_em, joined by \\N.
+
+    Widths are estimated per character (_text_em), with full-width
+    characters counted as 1 em. The breaks are hints only: the script
+    keeps libass's own wrapping on, which measures real glyphs, so a line
+    the estimate got wrong is still wrapped rather than running off-frame.
+    """
+    units = _break_units(text)
+    flat  = "".join(j + u for j, u in units)
+    total = _text_em(flat, upper)
+    if total <= max_em:
+        return flat
+    n_lines = int(-(-total // max_em))
+    target  = total / n_lines
+    lines, current = [], ""
+    for joiner, unit in units:
+        candidate = current + joiner + unit if current else unit
+        width = _text_em(candidate, upper)
+        if current and (width > max_em or (width > target and len(lines) < n_lines - 1)):
+            lines.append(current)
+            current = unit
+        else:
+            current = candidate
+    lines.append(current)
+    return "\\N".join(lines)
+
+
+def generate_ass(
+    chunks,
+    text_case: str      = "original",
+    video_size: tuple   = (None, None),
+    fontsize: int       = 18,
+    color: str          = "#FFFFFF",
+    bg_color: str       = "#000000",
+    bg_opacity: float   = 0.6,
+    border_style: str   = "box",
+    stroke_color: str   = "#000000",
+    stroke_width: int   = 0,
+    shadow: int         = 0,
+    position: str       = "bottom",
+) -> str:
+    """Compile Whisper chunks and a style into a complete ASS script.
+
+    Takes the same style arguments as burn_subtitles_to_video. The canvas
+    (PlayResX/PlayResY) is the real video_size (width, height) when known,
+    so libass renders 1:1 in pixels. [V4+ Styles] holds the requested look
+    as "Default", which every line uses, plus one entry per PRESET_STYLES
+    preset for anyone editing the script afterwards. Lines are pre-broken
+    into balanced lines (_wrap_ass_text), using a width estimated from the
+    font size and canvas width. WrapStyle 0 keeps libass wrapping anything
+    that still does not fit.
+    """
+    width, height = video_size
+    if not height:
+        width, height = _ASS_CANVAS_W, _ASS_CANVAS_H
+    scale = height / _ASS_CANVAS_H
+
+    style = _ass_style_fields(
+        fontsize=fontsize, color=color, bg_color=bg_color, bg_opacity=bg_opacity,
+        border_style=border_style, stroke_color=stroke_color,
+        stroke_width=stroke_width, shadow=shadow, position=position, scale=scale,
+    )
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        f"Format: {_ASS_STYLE_FORMAT}",
+        _ass_style_line("Default", style),
+    ]
+    for preset in PRESET_STYLES.values():
+        lines.append(_ass_style_line(preset["label"], _ass_style_fields(
+            fontsize=preset["font_size"], color=preset["color"],
+            bg_color=preset["bg_color"], bg_opacity=preset["bg_opacity"],
+            border_style=preset["border_style"], stroke_color=preset["stroke_color"],
+            stroke_width=preset["stroke_width"], shadow=preset["shadow"],
+            position=preset["position"], scale=scale,
+        )))
+    lines += [
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+
+    max_em = max(6.0, (width - 2 * style["MarginLR"]) / style["Fontsize"])
+    upper  = text_case == "upper"
+    for chunk in chunks:
+        start_ts, end_ts = chunk.get("timestamp", (None, None))
+        if start_ts is None or end_ts is None:
+            continue
+        text = _apply_case(chunk.get("text", "").strip(), text_case)
+        if not text:
+            continue
+        end_ts = max(float(end_ts), float(start_ts) + 0.5)   # same minimum as generate_srt
+        lines.append(
+            f"Dialogue: 0,{_ass_time(float(start_ts))},{_ass_time(end_ts)},Default,,0,0,0,,"
+            f"{_wrap_ass_text(_ass_escape(text), max_em, upper)}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def save_ass(ass_text: str, output_path: str) -> str:
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(ass_text)
+    return output_path
+
+
+# ── Compiled-script cache ─────────────────────────────────────────────────────
+_ASS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_ass_cache = None
+_ass_cache_lock = threading.Lock()
+
+
+def get_ass_cache() -> DiskCache:
+    """Process-wide on-disk cache of compiled ASS scripts, keyed by content."""
+    global _ass_cache
+    with _ass_cache_lock:
+        if _ass_cache is None:
+            _ass_cache = DiskCache(os.path.join(CACHE_DIR, "ass.sqlite"),
+                                   max_bytes=_ASS_CACHE_MAX_BYTES)
+    return _ass_cache
+
+
+def compile_ass(chunks, text_case: str = "original", **style) -> str:
+    """generate_ass, cached on disk by a content key of the captions and style.
+
+    A style preview runs in the app process and the burn that follows it
+    runs in a job worker, but both compile the same captions and style. The
+    burn, and any later preview or re-burn of that style, reads the script
+    back instead of wrapping every line again.
+    """
+    key = content_key(
+        "ass", text_case, sorted(style.items()),
+        [(float(c["timestamp"][0]), float(c["timestamp"][1]), c["text"]) for c in chunks],
+    )
+    cache    = get_ass_cache()
+    ass_text = cache.get(key)
+    if ass_text is None:
+        ass_text = generate_ass(chunks, text_case=text_case, **style)
+        cache.set(key, ass_text)
+    return ass_text
+
+
+# ── FFmpeg helpers ────────────────────────────────────────────────────────────
+def _ass_filter(ass_path: str) -> str:
+    """FFmpeg -vf expression that renders a compiled ASS script through libass."""
+    ass_filter_path = os.path.abspath(ass_path).replace("\\", "/").replace(":", "\\:")
+    return f"ass='{ass_filter_path}'"
+
+
+def _run_ffmpeg(cmd: list, what: str, timeout: float = 300):
+    """Run an FFmpeg command, raising RuntimeError with the stderr tail on failure."""
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"FFmpeg {what} failed (exit {result.returncode}).\n\n"
+            f"{result.stderr[-2000:]}"
+        )
+    return result
+
+
+def burn_timeout(duration_s: float) -> float:
+    """Whole-file FFmpeg timeout: generous for slow boxes, scaled to length."""
+    return max(300, 60 + duration_s * 4)
+
+
 # ── Core burn function ────────────────────────────────────────────────────────
 def burn_subtitles_to_video(
     video_path: str,
@@ -158,87 +569,224 @@ def burn_subtitles_to_video(
     position: str       = "bottom",   # "top" | "center" | "bottom"
     text_case: str      = "original", # "original" | "upper" | "lower"
     session_id: str     = None,
+    incremental: bool   = False,
+    workers: int        = 1,
+    profile: str        = DEFAULT_PROFILE,
+    stats: dict         = None,
 ) -> str:
-    """Burn subtitles into a video using FFmpeg's native subtitles filter (libass).
+    """Burn subtitles into a video with FFmpeg's ass filter (libass).
 
     Supports six visual modes via border_style:
       box     — semi/fully opaque coloured rectangle (Netflix/YouTube)
       outline — text stroke with optional drop shadow (TikTok/cinematic)
       none    — drop shadow only, no background (minimalist)
 
-    libass virtual canvas is PlayResY=288, so actual pixel height is:
-      pixel_height = (ass_fontsize / 288) * video_height
-    The 0.55 factor maps the user-facing slider (default 18) to ~37px at 1080p.
+    The captions and style are compiled into one ASS script (generate_ass)
+    on a canvas of the source's real resolution, as probed by
+    media_probe.probe_streams, with the lines already wrapped. libass then
+    only has to draw them. The burn also keeps the source's pixel format
+    and constant frame rate, and stream-copies audio the .mp4 can carry.
+
+    With incremental=True the burn is kept as keyframe-aligned chunks per
+    session (see utils.segment_burn), and later calls only re-encode the
+    chunks whose subtitles or style changed. workers > 1 (or None for one
+    per two cores) encodes those chunks in parallel; it implies the chunked
+    path even without incremental.
+
+    Finished burns go to a content-addressed cache (utils.burn_cache) keyed
+    by the source's content hash and the compiled ASS script, which holds
+    both the captions and the style. A burn that has been made before is
+    therefore returned instantly, for any session. Flipping back to an earlier preset, or
+    reverting a translation, is one example. The returned path is unique
+    per key and is never overwritten.
+
+    `profile` names an entry of ENCODE_PROFILES: draft, balanced or
+    archival. If a `stats` dict is passed, it is filled with the profile,
+    the encoded frame count, the wall time and the measured encode fps, or
+    with cached=True on a cache hit.
     """
+    _profile(profile)
+    stats = {} if stats is None else stats
+    stats.update(profile=profile, cached=False, frames=0, seconds=0.0, encode_fps=None)
     if session_id is None:
         session_id = uuid.uuid4().hex[:12]
 
     os.makedirs("data", exist_ok=True)
-    srt_text   = generate_srt(chunks, text_case=text_case)
-    srt_path   = os.path.abspath(os.path.join("data", f"subs_{session_id}.srt"))
     output_path = os.path.abspath(os.path.join("data", f"burned_{session_id}.mp4"))
-    save_srt(srt_text, srt_path)
-
-    primary      = _hex_to_ass_primary(color)
-    ass_fontsize = max(6, round(fontsize * 0.55))
-
-    # ── Alignment / position ──────────────────────────────────────────────────
-    alignment_map = {"bottom": 2, "center": 5, "top": 8}
-    alignment = alignment_map.get(position, 2)
-    margin_v  = 10 if position in ("bottom", "top") else 0
-
-    # ── Build force_style string ──────────────────────────────────────────────
-    base = (
-        f"Fontname=Arial,"
-        f"Fontsize={ass_fontsize},"
-        f"PrimaryColour={primary},"
-        f"Alignment={alignment},"
-        f"MarginV={margin_v},"
-        f"Bold=-1"
+
+    style = dict(
+        fontsize=fontsize, color=color, bg_color=bg_color, bg_opacity=bg_opacity,
+        border_style=border_style, stroke_color=stroke_color,
+        stroke_width=stroke_width, shadow=shadow, position=position,
+        video_size=_video_size(video_path),
     )
+    ass_text = compile_ass(chunks, text_case=text_case, **style)
+    cache    = get_burn_cache()
+    audio    = _audio_encode_args(profile, video_path)
+    source   = _source_video_args(video_path)
+    key      = burn_key(probe_content_hash(video_path), ass_text,
+                        _video_encode_args(profile) + _video_filters(profile) + source + audio)
+    cached   = cache.get(key)
+    if cached is not None:
+        stats["cached"] = True
+        return cached
+
+    t_start = time.perf_counter()
+    if incremental or workers is None or workers > 1:
+        from utils.segment_burn import burn_segmented  # imports this module
+        burn_segmented(video_path, chunks, style, text_case,
+                       session_id, output_path, workers=workers,
+                       profile=profile, stats=stats)
+    else:
+        ass_path = save_ass(ass_text, os.path.abspath(os.path.join("data", f"subs_{session_id}.ass")))
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", video_path,
+            *_video_filters(profile, ass_path),
+            *_video_encode_args(profile),
+            *source,
+            *_thread_args(profile),
+            *audio,
+            output_path,
+        ]
+        result = _run_ffmpeg(cmd, "subtitle burn", timeout=burn_timeout(probe_duration(video_path)))
+        stats["frames"] = _encoded_frames(result.stderr)
+
+    stats["seconds"] = round(time.perf_counter() - t_start, 3)
+    if stats["frames"] and stats["seconds"]:
+        stats["encode_fps"] = round(stats["frames"] / stats["seconds"], 1)
+    return cache.put(key, output_path)
+
+
+# ── Soft-subtitle mux ─────────────────────────────────────────────────────────
+_SOFT_SUB_CODECS = {"mp4": "mov_text", "mkv": "ass"}
+
+
+def mux_subtitles_to_video(
+    video_path: str,
+    chunks: list,
+    text_case: str  = "original",
+    session_id: str = None,
+    container: str  = "mp4",          # "mp4" (mov_text) | "mkv" (ASS)
+    language: str   = None,           # ISO 639-2 tag, e.g. "eng"
+) -> str:
+    """Attach subtitles as a selectable track without re-encoding the video.
 
-    if border_style == "box":
-        back = _hex_to_ass_back(bg_color, bg_opacity)
-        style_extra = f"BackColour={back},BorderStyle=3,Outline=0,Shadow=0"
-    elif border_style == "outline":
-        outline_col = _hex_to_ass_primary(stroke_color)
-        clamped_w   = max(0, min(8, int(stroke_width)))
-        style_extra = (
-            f"OutlineColour={outline_col},"
-            f"BorderStyle=1,"
-            f"Outline={clamped_w},"
-            f"Shadow={max(0, min(5, int(shadow)))}"
-        )
-    else:  # none
-        style_extra = (
-            f"BorderStyle=1,"
-            f"Outline=0,"
-            f"Shadow={max(0, min(5, int(shadow)))}"
-        )
+    Video and audio are stream-copied, so this runs in seconds regardless of
+    length. Players render the captions themselves, so style settings do not
+    apply. Audio an .mp4 cannot carry (e.g. PCM from a .mov) is re-encoded to
+    AAC up front, according to the probe; if a copy still fails, the mux is
+    retried with AAC. The video is always copied.
+    """
+    if container not in _SOFT_SUB_CODECS:
+        raise ValueError(f"Unsupported container {container!r}; use 'mp4' or 'mkv'.")
+    if session_id is None:
+        session_id = uuid.uuid4().hex[:12]
 
-    force_style = f"{base},{style_extra}"
+    os.makedirs("data", exist_ok=True)
+    srt_path    = os.path.abspath(os.path.join("data", f"subs_{session_id}.srt"))
+    output_path = os.path.abspath(os.path.join("data", f"muxed_{session_id}.{container}"))
+    save_srt(generate_srt(chunks, text_case=text_case), srt_path)
+
+    def _cmd(audio_codec):
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", video_path,
+            "-i", srt_path,
+            "-map", "0:v:0", "-map", "0:a?", "-map", "1:0",
+            "-c:v", "copy",
+            "-c:a", audio_codec,
+            "-c:s", _SOFT_SUB_CODECS[container],
+            "-disposition:s:0", "default",
+        ]
+        if language:
+            cmd += ["-metadata:s:s:0", f"language={language}"]
+        if container == "mp4":
+            cmd += ["-movflags", "+faststart"]
+        return cmd + [output_path]
+
+    audio = probe_streams(video_path)["audio"]
+    if container == "mp4" and audio and audio["codec"] not in _MP4_AUDIO_COPY:
+        _run_ffmpeg(_cmd("aac"), "subtitle mux", timeout=300)
+        return output_path
+    try:
+        _run_ffmpeg(_cmd("copy"), "subtitle mux", timeout=120)
+    except RuntimeError:
+        _run_ffmpeg(_cmd("aac"), "subtitle mux", timeout=300)
+    return output_path
 
-    # Escape the SRT path for FFmpeg subtitles filter
-    srt_filter_path = srt_path.replace("\\", "/").replace(":", "\\:")
 
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", video_path,
-        "-vf", f"subtitles='{srt_filter_path}':force_style='{force_style}'",
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",
-        "-c:a", "aac",
-        "-b:a", "128k",
-        output_path,
-    ]
+# ── Style preview ─────────────────────────────────────────────────────────────
+_PREVIEW_WIDTH = 640      # frames are scaled down after libass has rendered
 
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
 
-    if result.returncode != 0:
+def _preview_picks(chunks: list, n: int) -> list:
+    """Up to n chunks spread evenly over the transcript (first and last included)."""
+    usable = [c for c in chunks if c.get("text", "").strip()]
+    if len(usable) <= n:
+        return usable
+    step = (len(usable) - 1) / max(1, n - 1)
+    return [usable[round(i * step)] for i in range(n)]
+
+
+def _render_preview_frame(video_path: str, at_s: float, ass_path: str) -> bytes:
+    """One PNG of video_path at at_s with the ASS script burned in via libass."""
+    # -copyts keeps the seeked frame on its original timestamp, so the full
+    # script shows whichever caption is on screen at at_s.
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-ss", f"{at_s:.3f}", "-copyts", "-i", video_path,
+        "-frames:v", "1",
+        "-vf", f"{_ass_filter(ass_path)},scale='min({_PREVIEW_WIDTH},iw)':-2",
+        "-f", "image2pipe", "-c:v", "png", "pipe:1",
+    ]
+    result = subprocess.run(cmd, capture_output=True, timeout=30)
+    if result.returncode != 0 or not result.stdout:
         raise RuntimeError(
-            f"FFmpeg subtitle burn failed (exit {result.returncode}).\n\n"
-            f"{result.stderr[-2000:]}"
+            f"FFmpeg style preview failed (exit {result.returncode}).\n\n"
+            f"{result.stderr.decode('utf-8', 'replace')[-2000:]}"
         )
+    return result.stdout
 
-    return output_path
+
+def render_style_preview(
+    video_path: str,
+    chunks: list,
+    fontsize: int       = 18,
+    color: str          = "#FFFFFF",
+    bg_color: str       = "#000000",
+    bg_opacity: float   = 0.6,
+    border_style: str   = "box",
+    stroke_color: str   = "#000000",
+    stroke_width: int   = 0,
+    shadow: int         = 0,
+    position: str       = "bottom",
+    text_case: str      = "original",
+    max_frames: int     = 3,
+) -> list:
+    """Render a few real frames with the given style; returns PNG bytes per frame.
+
+    Takes the same style arguments as burn_subtitles_to_video and compiles
+    the same ASS script (compile_ass), so what the user sees here is
+    exactly what the burn will produce, and the burn reuses the script. One subtitle is sampled per frame,
+    spread over the transcript. Each frame is a single-frame FFmpeg call
+    that seeks straight to the subtitle's midpoint. The calls run
+    concurrently and share one script file, so a preview takes well under
+    a second instead of a full re-encode.
+    """
+    picks = _preview_picks(chunks, max_frames)
+    if not picks:
+        return []
+    ass_text = compile_ass(
+        chunks, text_case=text_case, video_size=_video_size(video_path),
+        fontsize=fontsize, color=color, bg_color=bg_color, bg_opacity=bg_opacity,
+        border_style=border_style, stroke_color=stroke_color,
+        stroke_width=stroke_width, shadow=shadow, position=position,
+    )
+
+    with tempfile.TemporaryDirectory(prefix="sublyze_preview_") as tmp:
+        ass_path = save_ass(ass_text, os.path.join(tmp, "preview.ass"))
+        times = [(float(c["timestamp"][0]) + float(c["timestamp"][1])) / 2 for c in picks]
+        with ThreadPoolExecutor(max_workers=len(times)) as pool:
+            return list(pool.map(lambda t: _render_preview_frame(video_path, t, ass_path), times))
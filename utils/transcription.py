@@ -1,34 +1,287 @@
+import difflib
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
 import streamlit as st
 import whisper
 
+from utils.audio_utils import SAMPLE_RATE, iter_audio_blocks, pack_regions, split_on_silence
+from utils.cache import CACHE_DIR, DiskCache, content_key
+from utils.media_probe import probe_duration
+from utils.model_server import (
+    connect as connect_model_server, connected as connected_model_server, parse_address,
+)
+
+MODEL_NAME  = "small"                              # default tier
+MODEL_TIERS = ("tiny", "base", "small", "medium")   # fastest → most accurate
+
+# Rough CPU compute seconds per second of audio for each tier (fp32,
+# 4–8 cores). Only used to rank tiers against a latency target.
+_TIER_RTF = {"tiny": 0.06, "base": 0.12, "small": 0.35, "medium": 1.1}
+
+# Opt-in int8 dynamic quantization of the Linear layers (see quantize_model).
+# Measure on your own clips first: benchmarks/quantization.py.
+QUANTIZE = os.environ.get("SUBLYZE_QUANTIZE", "0") == "1"
+
+_STREAM_WINDOW_S = 120.0   # audio buffered from FFmpeg before it is split and transcribed
+_CUT_SEARCH_S    = 5.0     # look this far back from a window's end for a pause
+_PACK_WINDOW_S   = 29.0    # speech packed per Whisper call (its input is 30 s)
+# How long a process waits for a configured model server to come up (it may
+# still be importing torch) before running Whisper in-process instead.
+_SERVER_WAIT_S   = float(os.environ.get("SUBLYZE_MODEL_SERVER_WAIT_S", "60"))
+
+
+def quantize_model(model):
+    """Apply dynamic int8 quantization to every Linear layer of a Whisper model.
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    the attention and MLP matmuls run on int8 kernels (fbgemm on x86), which
+    cuts memory and usually CPU time for base and larger. Whisper wraps its
+    layers in its own Linear subclass (it only casts weights to the input
+    dtype), which quantize_dynamic does not recognise by exact type; on a
+    CPU fp32 model that cast is a no-op, so the layers are first turned back
+    into plain nn.Linear. Convolutions and embeddings stay fp32.
+
+    The model is quantized in place: each Linear is swapped for its int8
+    version as it is converted, instead of building a deep copy of the
+    whole fp32 model first.
+    """
+    import torch
+    from torch import nn
+
+    for module in model.modules():
+        if isinstance(module, nn.Linear) and type(module) is not nn.Linear:
+            module.__class__ = nn.Linear
+    return torch.quantization.quantize_dynamic(model.cpu().eval(), {nn.Linear},
+                                               dtype=torch.qint8, inplace=True)
+
+
+def load_model(model_name: str = MODEL_NAME, quantized: bool = QUANTIZE):
+    """whisper.load_model on the CPU, int8-quantized when asked."""
+    model = whisper.load_model(model_name, device="cpu")
+    return quantize_model(model) if quantized else model
+
+
+def model_variant(model_name: str, quantized: bool) -> str:
+    """Name of the weights a result came from, e.g. "small" or "small-int8"."""
+    return f"{model_name}-int8" if quantized else model_name
+
 
 @st.cache_resource(show_spinner=False)
-def load_whisper_model():
-    """Load Whisper-small once and cache it across all sessions.
+def load_whisper_model(model_name: str = MODEL_NAME, quantized: bool = QUANTIZE):
+    """Load a Whisper model once per tier and cache it across all sessions.
 
     Uses the openai-whisper package which downloads from Azure CDN
     (openaipublic.azureedge.net) — no HuggingFace Hub required.
     Model is cached to ~/.cache/whisper after first download.
     """
-    return whisper.load_model("small")
+    return load_model(model_name, quantized)
 
 
-def transcribe_audio(audio_path):
-    """Transcribe an audio file with Whisper and return segment-level chunks.
+# ── Model tier selection ──────────────────────────────────────────────────────
+def choose_model_tier(
+    duration_s: float,
+    queue_depth: int         = 0,
+    latency_target_s: float  = 120.0,
+) -> str:
+    """Pick the most accurate tier expected to finish within latency_target_s.
 
-    openai-whisper returns segments with guaranteed start/end timestamps —
-    no None values, no zero-length segments — so no extra validation needed.
+    The estimate is duration × the tier's real-time factor, multiplied by
+    the number of jobs ahead of this one plus one, since they share the same
+    CPUs. Short social clips therefore get small/medium when the box is
+    idle, while long uploads or a busy queue fall back to base/tiny. This
+    trades accuracy for latency, so it only runs when "auto" is requested;
+    the default tier is MODEL_NAME.
+    """
+    load = max(0, int(queue_depth)) + 1
+    for tier in reversed(MODEL_TIERS):
+        if duration_s * _TIER_RTF[tier] * load <= latency_target_s:
+            return tier
+    return MODEL_TIERS[0]
 
-    Returns:
-        transcript (str): Full concatenated transcript text.
-        chunks (list[dict]): Each item is {'timestamp': (float, float), 'text': str}.
+
+def resolve_model_tier(tier: str, duration_s: float, queue_depth: int = 0,
+                       latency_target_s: float = 120.0) -> str:
+    """Validate an explicit tier, apply choose_model_tier for "auto" (opt-in),
+    and fall back to MODEL_NAME when no tier is given."""
+    if tier in (None, ""):
+        return MODEL_NAME
+    if tier == "auto":
+        return choose_model_tier(duration_s, queue_depth, latency_target_s)
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier {tier!r}; use one of {MODEL_TIERS} or 'auto'.")
+    return tier
+
+
+# ── Transcript cache ──────────────────────────────────────────────────────────
+_TRANSCRIPT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+
+def get_transcript_cache() -> DiskCache:
+    """Process-wide on-disk cache of Whisper segments, keyed by upload content."""
+    global _transcript_cache
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            _transcript_cache = DiskCache(
+                os.path.join(CACHE_DIR, "transcripts.sqlite"),
+                max_bytes=_TRANSCRIPT_CACHE_MAX_BYTES,
+            )
+    return _transcript_cache
+
+
+def _transcript_key(fingerprint: str, variant: str, task: str = "transcribe") -> str:
+    # int8 output can differ slightly from fp32, so the two never share entries
+    if task != "transcribe":
+        variant = f"{variant}:{task}"
+    return content_key("transcript", variant, fingerprint)
+
+
+def cached_transcript(fingerprint: str, model_name: str = MODEL_NAME,
+                      task: str = "transcribe", info: dict = None, variant: str = None):
+    """(transcript, chunks) previously produced for this content and model, or None.
+
+    `fingerprint` is a content hash of the upload (audio_utils.file_fingerprint),
+    so a re-upload after a page refresh hits even though the file name and
+    session are new. Chunks are the raw, unmerged Whisper segments, so
+    merge_short_segments and generate_srt re-run from them as usual. On a
+    hit, the stored spoken language is written to info["language"].
+
+    variant defaults to whisper_variant(model_name), the weights a call
+    would run on right now.
     """
-    model = load_whisper_model()
-    result = model.transcribe(audio_path, verbose=False)
+    if not fingerprint:
+        return None
+    variant = variant or whisper_variant(model_name)
+    hit = get_transcript_cache().get(_transcript_key(fingerprint, variant, task))
+    if hit is None:
+        return None
+    if info is not None:
+        info["language"] = hit.get("language")
+    chunks = [{"timestamp": (s, e), "text": text} for s, e, text in hit["segments"]]
+    return hit["text"], chunks
 
-    transcript = result.get("text", "").strip()
-    segments   = result.get("segments", [])
 
+def find_cached_transcript(fingerprint: str, tier: str = MODEL_NAME,
+                           task: str = "transcribe", info: dict = None) -> tuple:
+    """(model, (transcript, chunks)) cached for a requested tier, or (None, None).
+
+    Entries are keyed by the model that actually ran. An explicit tier only
+    matches its own entry. "auto" resolves differently depending on
+    duration and queue depth, so it accepts any tier's entry, most
+    accurate first. A re-upload of the same file therefore hits the cache
+    even when the queue is now shorter or longer than it was.
+    """
+    if not fingerprint:
+        return None, None
+    tiers     = reversed(MODEL_TIERS) if tier == "auto" else [tier or MODEL_NAME]
+    quantized = _serving_quantized()
+    for model in tiers:
+        hit = cached_transcript(fingerprint, model, task, info, model_variant(model, quantized))
+        if hit is not None:
+            return model, hit
+    return None, None
+
+
+def store_transcript(fingerprint: str, transcript: str, chunks: list,
+                     variant: str, task: str = "transcribe", language: str = None):
+    """Remember the raw segments (and detected language) of a finished transcription.
+
+    variant is the model_variant the result reports it ran on; None (e.g.
+    windows of one file that ran on different weights) stores nothing.
+    """
+    if not fingerprint or not variant:
+        return
+    get_transcript_cache().set(_transcript_key(fingerprint, variant, task), {
+        "text":     transcript,
+        "language": language,
+        "segments": [[c["timestamp"][0], c["timestamp"][1], c["text"]] for c in chunks],
+    })
+
+
+def subtitle_language(info: dict, task: str = "transcribe") -> str:
+    """Language the subtitle text is in: English for task="translate",
+    otherwise the spoken language Whisper detected (None if unknown)."""
+    return "en" if task == "translate" else (info or {}).get("language")
+
+
+def _model_server():
+    """Proxy to the configured model server's pool, or None to run in-process.
+
+    SUBLYZE_MODEL_SERVER=host:port selects utils.model_server; unset or
+    "off" means no server. A server that is still starting is waited for,
+    up to _SERVER_WAIT_S, rather than duplicated.
+    """
+    address = os.environ.get("SUBLYZE_MODEL_SERVER", "off")
+    if address == "off":
+        return None
+    return connect_model_server(parse_address(address), timeout_s=_SERVER_WAIT_S)
+
+
+_server_quantized = None     # the model server's --quantize, once this process knows it
+
+
+def _serving_quantized() -> bool:
+    """Whether transcribe calls run on int8 weights, for cache keys.
+
+    The model server runs with its own --quantize setting, which need not
+    match this process's SUBLYZE_QUANTIZE. It is learnt once per process,
+    from the first server result or from stats() on an open proxy. A
+    lookup never connects or waits for the server; until the setting is
+    known, the local one is assumed. A wrong guess only costs a cache miss:
+    the transcribe that follows stores its result under the variant that
+    really ran.
+    """
+    global _server_quantized
+    if os.environ.get("SUBLYZE_MODEL_SERVER", "off") == "off":
+        return QUANTIZE
+    if _server_quantized is None:
+        pool = connected_model_server()
+        if pool is None:
+            return QUANTIZE
+        try:
+            _server_quantized = pool.stats()["quantized"]
+        except (ConnectionError, OSError, EOFError):
+            return QUANTIZE
+    return _server_quantized
+
+
+def whisper_variant(model_name: str = MODEL_NAME) -> str:
+    """model_variant that _run_whisper would use for model_name now."""
+    return model_variant(model_name, _serving_quantized())
+
+
+def _run_whisper(audio, model_name: str = MODEL_NAME, **options) -> dict:
+    """model.transcribe, on the shared warm model server when one is configured.
+
+    Routing through the server (see _model_server) loads the model once per
+    machine instead of once per process. Without one, or if it does not
+    answer in time, the model is loaded in this process as before. The
+    result's "variant" names the weights that actually ran (model_variant).
+
+    We only run on CPU, where fp16 decoding is unsupported; passing
+    fp16=False up front skips Whisper's fallback and its warning.
+    """
+    global _server_quantized
+    options.setdefault("fp16", False)
+    pool = _model_server()
+    if pool is not None:
+        result = pool.transcribe(audio, model_name, **options)
+        _server_quantized = result["variant"] == model_variant(model_name, True)
+        return result
+    result = load_whisper_model(model_name).transcribe(audio, **options)
+    result["variant"] = model_variant(model_name, QUANTIZE)
+    return result
+
+
+def _segments_to_chunks(segments, offset: float = 0.0) -> list:
     chunks = []
     for seg in segments:
         start = float(seg.get("start", 0.0))
@@ -36,6 +289,410 @@ def transcribe_audio(audio_path):
         text  = seg.get("text", "").strip()
         if not text:
             continue
-        chunks.append({"timestamp": (start, end), "text": text})
+        chunks.append({"timestamp": (start + offset, end + offset), "text": text})
+    return chunks
+
+
+def transcribe_audio(audio, fingerprint: str = None, model_name: str = MODEL_NAME,
+                     task: str = "transcribe", info: dict = None):
+    """Transcribe audio with Whisper and return segment-level chunks.
+
+    `audio` is either a file path or a float32 16 kHz mono NumPy array (see
+    utils.audio_utils.load_audio_array); an array skips Whisper's own FFmpeg
+    pass over the file.
+
+    openai-whisper returns segments with guaranteed start/end timestamps —
+    no None values, no zero-length segments — so no extra validation needed.
+
+    With a content `fingerprint` the transcript cache is consulted first and
+    filled afterwards, so the same upload is only ever transcribed once.
+
+    task="translate" has Whisper translate into English in the same pass.
+    The spoken language Whisper detected is written to info["language"]
+    when an `info` dict is passed.
+
+    Returns:
+        transcript (str): Full concatenated transcript text.
+        chunks (list[dict]): Each item is {'timestamp': (float, float), 'text': str}.
+    """
+    info = {} if info is None else info
+    hit  = cached_transcript(fingerprint, model_name, task, info)
+    if hit is not None:
+        return hit
+
+    result = _run_whisper(audio, model_name, verbose=False, task=task)
+
+    transcript = result.get("text", "").strip()
+    chunks     = _segments_to_chunks(result.get("segments", []))
+    info["language"] = result.get("language")
+    store_transcript(fingerprint, transcript, chunks, result.get("variant"), task,
+                     info["language"])
+    return transcript, chunks
+
+
+def _quietest_cut(buffer: np.ndarray) -> int:
+    """Sample index of the quietest 100 ms frame in the buffer's last few seconds."""
+    frame  = SAMPLE_RATE // 10
+    search = buffer[-int(_CUT_SEARCH_S * SAMPLE_RATE):]
+    n      = len(search) // frame
+    if n == 0:
+        return len(buffer)
+    energy = (search[: n * frame].reshape(n, frame) ** 2).mean(axis=1)
+    quiet  = int(np.argmin(energy))
+    return len(buffer) - len(search) + quiet * frame + frame // 2
+
+
+def _prefetch(blocks):
+    """Drain a block generator on a background thread so its producer never stalls."""
+    q, done = queue.Queue(), object()
+
+    def _pump():
+        try:
+            for block in blocks:
+                q.put(block)
+        except BaseException as err:  # re-raised in the consumer
+            q.put(err)
+        q.put(done)
+
+    threading.Thread(target=_pump, daemon=True).start()
+    while True:
+        item = q.get()
+        if item is done:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+def _speech_regions(audio: np.ndarray) -> list:
+    """split_on_silence, with no region longer than one Whisper window."""
+    return split_on_silence(audio, max_piece_s=_PACK_WINDOW_S)
+
+
+def _transcribe_regions(audio, regions, offset, state):
+    """Transcribe each (start, end) sample range of `audio`, yielding chunks.
+
+    Callers pass windows from pack_regions. `state` holds the model tier
+    and task. It also carries the previous window's text, which becomes
+    the next call's initial_prompt, so spelling and style stay consistent
+    across windows. The language detected on the first window is kept in
+    state["language"] and passed to every later call. That skips Whisper's
+    per-call detection pass and keeps one language throughout.
+    """
+    for start, end in regions:
+        result = _run_whisper(
+            audio[start:end], state["model"],
+            verbose=False, initial_prompt=state.get("prompt"),
+            task=state.get("task", "transcribe"), language=state.get("language"),
+        )
+        state["language"] = state.get("language") or result.get("language")
+        variant = result.get("variant")
+        if state.setdefault("variant", variant) != variant:
+            state["variant"] = None   # windows ran on different weights: don't cache the mix
+        text = result.get("text", "").strip()
+        if text:
+            state["prompt"] = text[-200:]
+        yield from _segments_to_chunks(
+            result.get("segments", []), (offset + start) / SAMPLE_RATE,
+        )
+
+
+def iter_transcribe(audio: np.ndarray, on_progress=None, model_name: str = MODEL_NAME,
+                    task: str = "transcribe", info: dict = None):
+    """Transcribe an in-memory clip window by window, yielding chunks as they finish.
+
+    The clip is split at silences with split_on_silence and the speech is
+    packed into ≤30 s windows (pack_regions). Long silences between
+    windows are never sent to the model. on_progress(fraction) is called
+    after each window with the share of speech audio processed so far. The
+    language detected on the first window ends up in info["language"].
+    """
+    regions = pack_regions(_speech_regions(audio))
+    total   = sum(e - s for s, e in regions) or 1
+    done    = 0
+    state   = {"model": model_name, "task": task}
+    for region in regions:
+        yield from _transcribe_regions(audio, [region], 0, state)
+        if info is not None:
+            info["language"] = state.get("language")
+        done += region[1] - region[0]
+        if on_progress:
+            on_progress(done / total)
+
+
+def iter_transcribe_video(
+    video_path,
+    on_progress         = None,
+    window_s: float     = _STREAM_WINDOW_S,
+    fingerprint: str    = None,
+    model_name: str     = MODEL_NAME,
+    task: str           = "transcribe",
+    info: dict          = None,
+):
+    """Transcribe a video's audio while FFmpeg is still decoding it.
+
+    Audio is piped from FFmpeg in memory (no WAV file, no second FFmpeg
+    spawn inside Whisper) while a background thread keeps draining the
+    pipe so decoding never waits on the model. Each time window_s seconds
+    have buffered, the window is split at silences with split_on_silence.
+    Completed speech regions are packed into ≤30 s Whisper windows
+    (pack_regions) and transcribed, and long silences between them are
+    skipped. The region still in progress at the buffer's end is carried
+    into the next buffer, so no word is cut in half.
+
+    Yields {'timestamp', 'text'} chunks with global offsets as soon as they
+    are ready. on_progress(fraction) reports the share of the file handled.
+    With a content `fingerprint`, a cached transcript is replayed instantly
+    and a fresh one is stored once the whole file has been transcribed.
+    info["language"] is set as soon as the first window has been detected.
+    """
+    info = {} if info is None else info
+    hit  = cached_transcript(fingerprint, model_name, task, info)
+    if hit is not None:
+        yield from hit[1]
+        if on_progress:
+            on_progress(1.0)
+        return
+
+    produced = []
+    state    = {"model": model_name, "task": task}
+    for chunk in _iter_transcribe_video(video_path, on_progress, window_s, state):
+        info["language"] = state.get("language")
+        produced.append(chunk)
+        yield chunk
+    info["language"] = state.get("language")
+    store_transcript(fingerprint, " ".join(c["text"] for c in produced), produced,
+                     state.get("variant"), task, info["language"])
+
+
+def _iter_transcribe_video(video_path, on_progress, window_s, state):
+    window   = int(window_s * SAMPLE_RATE)
+    total    = max(1, int(probe_duration(video_path) * SAMPLE_RATE))
+    pending, buffered, offset = [], 0, 0
+
+    def _report():
+        if on_progress:
+            on_progress(min(1.0, offset / total))
+
+    for block in _prefetch(iter_audio_blocks(video_path)):
+        pending.append(block)
+        buffered += len(block)
+        if buffered < window:
+            continue
+        buffer  = np.concatenate(pending)
+        regions = _speech_regions(buffer)
+        cut = len(buffer)
+        if regions and regions[-1][1] >= len(buffer):
+            # Speech runs into the window's end: carry that region forward.
+            cut, regions = regions[-1][0], regions[:-1]
+            if cut == 0:
+                cut = _quietest_cut(buffer)
+                regions = [(0, cut)]
+        yield from _transcribe_regions(buffer, pack_regions(regions), offset, state)
+        offset  += cut
+        pending  = [buffer[cut:]]
+        buffered = len(pending[0])
+        _report()
+
+    if buffered:
+        buffer = np.concatenate(pending)
+        yield from _transcribe_regions(buffer, pack_regions(_speech_regions(buffer)),
+                                       offset, state)
+    offset = total
+    _report()
+
+
+def transcribe_video_stream(video_path, on_progress=None, fingerprint: str = None,
+                            model_name: str = MODEL_NAME, task: str = "transcribe",
+                            info: dict = None):
+    """Collect iter_transcribe_video into the (transcript, chunks) pair
+    returned by transcribe_audio."""
+    chunks = list(iter_transcribe_video(video_path, on_progress=on_progress,
+                                        fingerprint=fingerprint, model_name=model_name,
+                                        task=task, info=info))
+    return " ".join(c["text"] for c in chunks), chunks
+
+
+# ── Process-pool parallel transcription ──────────────────────────────────────
+_PARALLEL_WINDOW_S  = 60.0
+_PARALLEL_OVERLAP_S = 5.0
+
+_worker_model = None
+
+_parallel_pool = None        # (config, ProcessPoolExecutor), kept between calls
+_parallel_pool_lock = threading.Lock()
+
+
+def _transcribe_pool(model_name: str, workers: int, threads: int) -> ProcessPoolExecutor:
+    """This process's pool of Whisper worker processes, created on first use.
+
+    Spawning the workers and loading a model in each can take longer than
+    transcribing a short clip, so the pool outlives the call. The next
+    transcribe_parallel with the same model and worker count reuses the
+    loaded models. A different configuration replaces the pool, so at most
+    one set of worker models is resident per process. Job workers run one
+    job at a time, so a pool is never replaced while in use.
+    """
+    global _parallel_pool
+    config = (model_name, workers, threads, QUANTIZE)
+    with _parallel_pool_lock:
+        if _parallel_pool is not None and _parallel_pool[0] != config:
+            _parallel_pool[1].shutdown(wait=True)
+            _parallel_pool = None
+        if _parallel_pool is None:
+            _parallel_pool = (config, ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_transcribe_worker,
+                initargs=(model_name, threads, QUANTIZE),
+            ))
+        return _parallel_pool[1]
+
+
+def _discard_transcribe_pool(pool: ProcessPoolExecutor):
+    """Forget a pool whose worker died, so the next call starts a fresh one."""
+    global _parallel_pool
+    with _parallel_pool_lock:
+        if _parallel_pool is not None and _parallel_pool[1] is pool:
+            _parallel_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_transcribe_worker(model_name: str, torch_threads: int, quantized: bool = False):
+    """Pool initializer: pin torch threads and load one model per process."""
+    import torch
+    global _worker_model
+    torch.set_num_threads(torch_threads)
+    _worker_model = load_model(model_name, quantized)
+
+
+def _detect_window_language(samples: np.ndarray) -> str:
+    """Spoken language of the first 30 s of samples, detected as transcribe does."""
+    if not _worker_model.is_multilingual:
+        return "en"
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(samples), _worker_model.dims.n_mels)
+    _, probs = _worker_model.detect_language(mel.to(_worker_model.device))
+    return max(probs, key=probs.get)
+
+
+def _transcribe_window(samples: np.ndarray, offset_s: float, task: str = "transcribe",
+                       language: str = None) -> list:
+    result = _worker_model.transcribe(samples, verbose=False, fp16=False, task=task,
+                                      language=language)
+    return _segments_to_chunks(result.get("segments", []), offset_s)
+
+
+def _merge_repeat(previous: dict, chunk: dict):
+    """Merge two chunks that transcribe the same stretch of speech, or None.
+
+    Overlapping windows hear the same words twice; they show up as chunks
+    that overlap in time and share most of the shorter one's text. The
+    merge keeps the earlier chunk's text up to the shared run and the later
+    chunk's text from it onwards, so words cut off by either window's edge
+    are recovered from the other side.
+    """
+    if chunk["timestamp"][0] >= previous["timestamp"][1]:
+        return None
+    a, b = previous["text"], chunk["text"]
+    m = difflib.SequenceMatcher(None, a.lower(), b.lower(), autojunk=False).find_longest_match(
+        0, len(a), 0, len(b)
+    )
+    if m.size < 0.5 * min(len(a), len(b)):
+        return None
+    return {
+        "timestamp": (previous["timestamp"][0], max(previous["timestamp"][1], chunk["timestamp"][1])),
+        "text": (a[:m.a] + b[m.b:]).strip(),
+    }
+
+
+def _stitch_windows(windows: list, boundaries: list) -> list:
+    """Merge per-window chunks, handing each overlap over at its midpoint.
+
+    windows[i] is the chunk list of window i; boundaries[i] is the time at
+    which window i+1 takes over. A chunk belongs to the window that owns its
+    midpoint; duplicates across a seam are folded together by _merge_repeat.
+    """
+    stitched = []
+    for i, chunks in enumerate(windows):
+        lo = boundaries[i - 1] if i > 0 else float("-inf")
+        hi = boundaries[i] if i < len(boundaries) else float("inf")
+        for chunk in chunks:
+            mid = (chunk["timestamp"][0] + chunk["timestamp"][1]) / 2
+            if not lo <= mid < hi:
+                continue
+            merged = _merge_repeat(stitched[-1], chunk) if stitched else None
+            if merged:
+                stitched[-1] = merged
+            else:
+                stitched.append(chunk)
+    return stitched
+
+
+def transcribe_parallel(
+    audio: np.ndarray,
+    workers: int        = None,
+    window_s: float     = _PARALLEL_WINDOW_S,
+    overlap_s: float    = _PARALLEL_OVERLAP_S,
+    model_name: str     = MODEL_NAME,
+    on_progress         = None,
+    fingerprint: str    = None,
+    task: str           = "transcribe",
+    info: dict          = None,
+):
+    """Transcribe one long clip across a process pool of Whisper models.
+
+    The clip is cut into window_s windows that overlap by overlap_s, each
+    worker process loads its own model (torch threads are divided between
+    workers so they do not oversubscribe the CPU), and the windows are
+    stitched back together with _stitch_windows. Wall-clock time drops
+    roughly with the number of workers, at the cost of one model's memory
+    per worker. The pool and its models stay up for later calls (see
+    _transcribe_pool).
+
+    Returns the same (transcript, chunks) pair as transcribe_audio, and
+    shares its transcript cache when a content `fingerprint` is given.
+    The language is detected once, on the first window, before the windows
+    are submitted. Every window then decodes in that language, as the
+    sequential paths do (see _transcribe_regions). It is reported in
+    info["language"].
+    """
+    info    = {} if info is None else info
+    variant = model_variant(model_name, QUANTIZE)   # workers load their own models
+    hit     = cached_transcript(fingerprint, model_name, task, info, variant)
+    if hit is not None:
+        if on_progress:
+            on_progress(1.0)
+        return hit
+
+    workers = workers or max(1, (os.cpu_count() or 1) // 4)
+    window  = int(window_s * SAMPLE_RATE)
+    step    = max(1, window - int(overlap_s * SAMPLE_RATE))
+    starts  = list(range(0, max(1, len(audio) - int(overlap_s * SAMPLE_RATE)), step))
+    boundaries = [(s + (window - step) / 2) / SAMPLE_RATE for s in starts[1:]]
+
+    windows = [None] * len(starts)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    pool    = _transcribe_pool(model_name, workers, threads)
+    try:
+        # One encoder pass; without it each window guesses its own language
+        language = pool.submit(_detect_window_language, audio[:window]).result()
+        futures  = {
+            pool.submit(_transcribe_window, audio[s:s + window], s / SAMPLE_RATE,
+                        task, language): i
+            for i, s in enumerate(starts)
+        }
+        done = 0
+        for fut in as_completed(futures):
+            windows[futures[fut]] = fut.result()
+            done += 1
+            if on_progress:
+                on_progress(done / len(starts))
+    except BrokenProcessPool:
+        _discard_transcribe_pool(pool)
+        raise
 
-    return transcript, chunks
\ No newline at end of file
+    chunks     = _stitch_windows(windows, boundaries)
+    transcript = " ".join(c["text"] for c in chunks)
+    info["language"] = language
+    store_transcript(fingerprint, transcript, chunks, variant, task, language)
+    return transcript, chunks
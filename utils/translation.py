@@ -1,7 +1,12 @@
 import json
+import os
+import threading
 import time
 import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import CACHE_DIR, DiskCache, content_key, normalize_text
 
 # Languages users actually care about, ordered by global usage
 TRANSLATION_LANGUAGES = {
@@ -29,42 +34,204 @@ TRANSLATION_LANGUAGES = {
     "🇺🇦 Ukrainian":             "uk",
 }
 
-_BATCH_SIZE = 15
+# Whisper reports ISO 639-1 codes ("zh", "he"); the translate endpoint uses
+# its own legacy/regional ones ("zh-CN", "iw"). Both sides are mapped onto
+# one base code before comparing.
+_LANGUAGE_ALIASES = {"iw": "he", "jw": "jv", "fil": "tl", "in": "id", "ji": "yi"}
+
+
+def normalize_language(code: str) -> str:
+    """Base language code for comparisons: "zh-CN" → "zh", "iw" → "he"."""
+    base = (code or "").strip().lower().replace("_", "-").split("-")[0]
+    return _LANGUAGE_ALIASES.get(base, base)
+
+
+def same_language(a: str, b: str) -> bool:
+    return bool(a and b) and normalize_language(a) == normalize_language(b)
+
+
+_ENDPOINT = os.environ.get(
+    "SUBLYZE_TRANSLATE_URL",
+    "https://translate.googleapis.com/translate_a/single",
+)
+_BATCH_SIZE      = 15      # segments per request
+_BATCH_MAX_CHARS = 4500    # endpoint rejects bodies much past 5k chars
+_MAX_WORKERS     = 4       # concurrent requests in flight
+_RATE_PER_SEC    = 8.0     # sustained requests per second across all workers
+_DELIMITER       = "\n"    # newlines survive translation one-for-one
 _HEADERS = {"User-Agent": "Mozilla/5.0"}
 
 
-def _google_translate(text: str, target: str) -> str:
-    """Call Google Translate's free endpoint with stdlib urllib only."""
-    url = (
-        "https://translate.googleapis.com/translate_a/single"
-        f"?client=gtx&sl=auto&tl={target}&dt=t&q={urllib.parse.quote(text)}"
+# ── Rate limiting ─────────────────────────────────────────────────────────────
+class _TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate     = float(rate)
+        self.capacity = float(capacity)
+        self._tokens  = float(capacity)
+        self._stamp   = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp  = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_bucket = _TokenBucket(_RATE_PER_SEC, capacity=_MAX_WORKERS)
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+_CACHE_MAX_ENTRIES = 200_000
+_CACHE_MAX_BYTES   = 64 * 1024 * 1024
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> DiskCache:
+    """Process-wide on-disk translation cache, shared by every session."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache(
+                os.path.join(CACHE_DIR, "translations.sqlite"),
+                max_entries=_CACHE_MAX_ENTRIES,
+                max_bytes=_CACHE_MAX_BYTES,
+            )
+    return _cache
+
+
+def _cache_key(text: str, target: str) -> str:
+    return content_key("translate", target, normalize_text(text))
+
+
+# ── Endpoint ──────────────────────────────────────────────────────────────────
+def _fetch_translation(text: str, target: str) -> str:
+    """Call Google Translate's free endpoint with stdlib urllib only.
+
+    The text goes in a POST body so delimiter-joined batches are not capped
+    by URL length. Set SUBLYZE_TRANSLATE_URL to point at a local stub server.
+    """
+    query = urllib.parse.urlencode({"client": "gtx", "sl": "auto", "tl": target, "dt": "t"})
+    body  = urllib.parse.urlencode({"q": text}).encode("utf-8")
+    req = urllib.request.Request(
+        f"{_ENDPOINT}?{query}", data=body,
+        headers={**_HEADERS, "Content-Type": "application/x-www-form-urlencoded;charset=utf-8"},
     )
-    req = urllib.request.Request(url, headers=_HEADERS)
+    _bucket.acquire()
     with urllib.request.urlopen(req, timeout=15) as resp:
         data = json.loads(resp.read())
     return "".join(part[0] for part in data[0] if part[0])
 
 
-def translate_chunks(chunks: list, target_lang_code: str) -> list:
+def _google_translate(text: str, target: str) -> str:
+    """Translate one string, going through the on-disk cache first."""
+    cache = get_translation_cache()
+    key   = _cache_key(text, target)
+    hit   = cache.get(key)
+    if hit is not None:
+        return hit
+    translated = _fetch_translation(text, target)
+    cache.set(key, translated)
+    return translated
+
+
+# ── Batching ──────────────────────────────────────────────────────────────────
+def _make_batches(indexed_texts: list) -> list:
+    """Group (index, text) pairs into batches bounded by count and characters."""
+    batches, current, size = [], [], 0
+    for idx, text in indexed_texts:
+        if current and (len(current) >= _BATCH_SIZE or size + len(text) > _BATCH_MAX_CHARS):
+            batches.append(current)
+            current, size = [], 0
+        current.append((idx, text))
+        size += len(text) + len(_DELIMITER)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _translate_batch(batch: list, target: str) -> dict:
+    """Translate one batch, returning {index: translated_text} for successes.
+
+    The batch is sent as a single delimiter-joined request. If the endpoint
+    merges or splits lines, the batch is retried one segment at a time.
+    Segments that still fail are left out so the caller keeps the original
+    text and nothing wrong is written to the cache.
+    """
+    joined = _DELIMITER.join(text for _, text in batch)
+    try:
+        parts = _fetch_translation(joined, target).split(_DELIMITER)
+        if len(parts) == len(batch):
+            return {idx: part.strip() for (idx, _), part in zip(batch, parts) if part.strip()}
+    except Exception:
+        pass  # fall through to per-segment retry
+
+    results = {}
+    for idx, text in batch:
+        try:
+            translated = _fetch_translation(text, target).strip()
+        except Exception:
+            continue
+        if translated:
+            results[idx] = translated
+    return results
+
+
+def translate_chunks(
+    chunks: list,
+    target_lang_code: str,
+    max_workers: int = _MAX_WORKERS,
+    source_lang: str = None,
+) -> list:
     """Translate subtitle chunks to target language.
 
-    Translates each segment individually. Uses stdlib urllib — no extra
-    packages required. Falls back to the original text on any error.
+    When source_lang (the language Whisper detected, see
+    utils.transcription) is already the target, the chunks are returned as
+    they are without a cache lookup or any request.
+
+    Segments already in the on-disk cache are answered locally; the rest are
+    packed into delimiter-joined batches of up to _BATCH_SIZE, and the
+    batches run on a bounded thread pool behind a shared token-bucket rate
+    limiter. Results are mapped back to each segment's timestamp, so the
+    output lines up one-for-one with the input. Falls back to the original
+    text on any error.
     """
     if not chunks:
         return chunks
+    if same_language(source_lang, target_lang_code):
+        return [{"timestamp": c["timestamp"], "text": c.get("text", "")} for c in chunks]
 
-    translated = []
-    for i, chunk in enumerate(chunks):
-        text = chunk.get("text", "").strip()
-        if text:
-            try:
-                text = _google_translate(text, target_lang_code)
-                if i < len(chunks) - 1:
-                    time.sleep(0.05)   # gentle rate-limit
-            except Exception:
-                pass  # keep original on failure
-        translated.append({"timestamp": chunk["timestamp"], "text": text})
+    texts = [chunk.get("text", "").strip() for chunk in chunks]
+    keys  = [_cache_key(t, target_lang_code) if t else None for t in texts]
+    cache = get_translation_cache()
+    hits  = cache.get_many(k for k in keys if k)
 
-    return translated
+    translated_texts = [hits.get(k, t) if k else t for t, k in zip(texts, keys)]
+    batches = _make_batches([
+        (i, t) for i, (t, k) in enumerate(zip(texts, keys)) if k and k not in hits
+    ])
+
+    if batches:
+        workers = max(1, min(max_workers, len(batches)))
+        fresh = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(lambda b: _translate_batch(b, target_lang_code), batches):
+                for idx, text in result.items():
+                    translated_texts[idx] = text
+                    fresh[keys[idx]] = text
+        cache.set_many(fresh)
 
+    return [
+        {"timestamp": chunk["timestamp"], "text": text}
+        for chunk, text in zip(chunks, translated_texts)
+    ]